@@ -68,9 +68,63 @@ core_opts = [
     cfg.IntOpt('datasource_sync_period', default=60,
                help='The number of seconds to wait between synchronizing '
                     'datasource config from the database'),
+    cfg.IntOpt('datasource_poll_concurrency', default=4, min=1,
+               help='The maximum number of tables a polling datasource '
+                    'updates at once while polling. The poll_concurrency '
+                    'config of a datasource overrides it.'),
+    cfg.BoolOpt('adaptive_polling', default=False,
+                help='Set the flag to True to poll each table of polling '
+                     'datasources on a schedule of its own, which doubles '
+                     'the time between its polls while it does not change, '
+                     'and halves it while it does.'),
+    cfg.FloatOpt('adaptive_poll_min_factor', default=0.5, min=0.1,
+                 help='With adaptive polling, the shortest time between the '
+                      'polls of a table, as a multiple of the poll_time of '
+                      'its datasource.'),
+    cfg.FloatOpt('adaptive_poll_max_factor', default=8, min=1,
+                 help='With adaptive polling, the longest time between the '
+                      'polls of a table, as a multiple of the poll_time of '
+                      'its datasource.'),
     cfg.BoolOpt('enable_execute_action', default=True,
                 help='Set the flag to False if you don\'t want Congress '
                      'to execute actions.'),
+    cfg.BoolOpt('incremental_trigger_evaluation', default=False,
+                help='Set the flag to True to compute changes to policy '
+                     'tables watched by triggers from the incoming data '
+                     'changes instead of recomputing those tables before '
+                     'and after every update.'),
+    cfg.StrOpt('fact_storage', default='tuple', choices=['tuple', 'array'],
+               help='How the policy engine stores the facts of policies. '
+                    '"tuple" keeps each fact as a Python tuple. "array" '
+                    'interns values and stores facts in columnar arrays, '
+                    'using much less memory for large tables at some '
+                    'cost in speed.'),
+    cfg.BoolOpt('tabled_evaluation', default=False,
+                help='Set the flag to True to have each policy query '
+                     'remember the answers to the subgoals on tables '
+                     'defined by rules, instead of proving them again '
+                     'every time they are reached with the same '
+                     'arguments.'),
+    cfg.StrOpt('materialized_maintenance', default='proofs',
+               choices=['proofs', 'counting'],
+               help='How materialized policies maintain the rows of the '
+                    'tables defined by rules. "proofs" records every '
+                    'derivation of each row, which explanations use. '
+                    '"counting" only counts the derivations, which is '
+                    'faster and uses less memory.'),
+    cfg.FloatOpt('update_batch_window', default=0, min=0,
+                 help='The number of seconds the policy engine collects the '
+                      'changes to datasource tables it receives, before '
+                      'applying them in a single update. 0 applies each '
+                      'change as it arrives.'),
+    cfg.IntOpt('update_batch_size', default=10000, min=1,
+               help='The number of changed rows after which the changes to '
+                    'datasource tables collected by the policy engine are '
+                    'applied before the end of update_batch_window.'),
+    cfg.BoolOpt('cache_table_rows', default=False,
+                help='Set the flag to True to cache the rows of policy '
+                     'tables returned by the API until a table they '
+                     'depend on changes.'),
     cfg.BoolOpt('replicated_policy_engine', default=False,
                 help='Set the flag to use congress with replicated policy '
                      'engines.'),
@@ -101,6 +155,20 @@ dse_opts = [
     cfg.IntOpt('execute_action_retry_timeout', default=600,
                help='The number of seconds to retry execute action before '
                     'giving up. Zero or negative value means never give up.'),
+    cfg.StrOpt('wire_format', default='json', choices=['json', 'msgpack'],
+               help='The format in which subscribers on this node ask '
+                    'publishers to send table data. "msgpack" packs the rows '
+                    'in a compact binary encoding. Publishers broadcast a '
+                    'table in it only while every node subscribing to the '
+                    'table asks for it, and send JSON otherwise.'),
+    cfg.BoolOpt('wire_compression', default=True,
+                help='Set the flag to True to compress large publications '
+                     'in the msgpack wire format with zlib.'),
+    cfg.IntOpt('snapshot_chunk_size', default=10000, min=0,
+               help='The maximum number of rows of a table snapshot that '
+                    'subscribers on this node ask publishers to send in one '
+                    'message. Larger snapshots are sent in chunks. 0 means '
+                    'no limit.'),
 ]
 
 # Register dse opts
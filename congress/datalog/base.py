@@ -33,6 +33,7 @@ MATERIALIZED_POLICY_TYPE = 'materialized'
 DELTA_POLICY_TYPE = 'delta'
 DATASOURCE_POLICY_TYPE = 'datasource'
 Z3_POLICY_TYPE = 'z3'
+BOTTOMUP_POLICY_TYPE = 'bottomup'
 
 
 class Tracer(object):
@@ -117,6 +118,9 @@ class EventQueue(object):
     def dequeue(self):
         return self.queue.popleft()
 
+    def peek(self):
+        return self.queue[0]
+
     def __len__(self):
         return len(self.queue)
 
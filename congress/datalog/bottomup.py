@@ -0,0 +1,276 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+from oslo_log import log as logging
+import six
+from six.moves import range
+
+from congress.datalog import base
+from congress.datalog import builtin
+from congress.datalog import compile
+from congress.datalog import database
+from congress.datalog import nonrecursive
+
+LOG = logging.getLogger(__name__)
+
+
+class BottomUpTheory(nonrecursive.NonrecursiveRuleTheory):
+    """A non-recursive collection of Rules evaluated bottom-up.
+
+    Stores rules exactly like NonrecursiveRuleTheory, but answers queries
+    set-at-a-time: the full extension of each table a query needs is
+    computed once, after the tables it depends on, by hash joins over the
+    rows of the tables in rule bodies.  Queries on modal tables, theories
+    with includes and traced queries are answered top-down.
+    """
+
+    def __init__(self, name=None, abbr=None,
+                 schema=None, theories=None, desc=None, owner=None):
+        super(BottomUpTheory, self).__init__(
+            name=name, abbr=abbr, theories=theories, schema=schema,
+            desc=desc, owner=owner)
+        self.kind = base.BOTTOMUP_POLICY_TYPE
+
+    def select(self, query, find_all=True):
+        """Return list of instances of QUERY that are true.
+
+        If FIND_ALL is False, the return list has at most 1 element.
+        """
+        assert compile.is_datalog(query), "Query must be atom/rule"
+        if compile.is_atom(query):
+            literals = [query]
+        else:
+            literals = query.body
+        if not self._bottom_up_supported(literals, set()):
+            return super(BottomUpTheory, self).select(query, find_all)
+        variables = list(query.variables())
+        answers = set()
+        for binding in self._join(literals, {}):
+            answers.add(tuple(binding[var] for var in variables))
+            if not find_all:
+                break
+        results = [query.plug(dict(zip(variables, answer)))
+                   for answer in answers]
+        if results:
+            self.log(query.tablename(), "Found answer %s",
+                     "[" + ",".join(str(x) for x in results) + "]")
+        return results
+
+    def extension(self, table, extensions=None):
+        """Return the set of tuples of values of the rows of TABLE.
+
+        EXTENSIONS caches the extensions computed so far, keyed by policy
+        name and table.
+        """
+        if extensions is None:
+            extensions = {}
+        key = (self.name, table)
+        if key in extensions:
+            return extensions[key]
+        rows = set(tuple(fact) for fact in self.rules.get_facts(table))
+        for rule in self.rules.get_nonfact_rules(table):
+            heads = [head for head in rule.heads
+                     if head.table.table == table]
+            for binding in self._join(rule.body, extensions):
+                for head in heads:
+                    rows.add(tuple(binding[arg] if arg.is_variable()
+                                   else arg.name
+                                   for arg in head.arguments))
+        extensions[key] = rows
+        return rows
+
+    def _bottom_up_supported(self, literals, seen):
+        """Return True if LITERALS can be evaluated bottom-up.
+
+        SEEN is the set of the (policy, table) pairs already checked.
+        """
+        if self.includes:
+            return False
+        for lit in literals:
+            if self.tracer.is_traced(lit.tablename()):
+                return False
+            if lit.table.modal is not None or lit.is_update():
+                return False
+            if lit.is_builtin() or lit.tablename() in ('true', 'false'):
+                continue
+            if lit.table.service not in (None, self.name):
+                if self.theories is None:
+                    return False
+                theory = self.theories.get(lit.table.service)
+            else:
+                theory = self
+            if not isinstance(theory, BottomUpTheory):
+                # a policy without rules or an unknown one, whose rows
+                #   are looked up like top-down evaluation would
+                continue
+            key = (theory.name, lit.table.table)
+            if key in seen:
+                continue
+            seen.add(key)
+            for rule in theory.rules.get_nonfact_rules(lit.table.table):
+                if any(head.table.service not in (None, theory.name) or
+                       head.table.modal is not None for head in rule.heads):
+                    return False
+                if not theory._bottom_up_supported(rule.body, seen):
+                    return False
+        return True
+
+    def _relation(self, lit, extensions):
+        """Return the set of tuples of values of the table of LIT."""
+        if lit.table.service in (None, self.name):
+            theory = self
+        else:
+            theory = self.theories.get(lit.table.service)
+        if theory is None:
+            return set()
+        table = lit.table.table
+        if isinstance(theory, BottomUpTheory):
+            return theory.extension(table, extensions)
+        key = (theory.name, table)
+        if key not in extensions:
+            extensions[key] = theory_rows(theory, table, len(lit.arguments))
+        return extensions[key]
+
+    def _join(self, literals, extensions):
+        """Return the bindings of the variables that make LITERALS true."""
+        return join(literals, [{}],
+                    lambda lit: self._relation(lit, extensions))
+
+
+def theory_rows(theory, table, arity):
+    """Return the collection of tuples of values of TABLE in THEORY."""
+    if isinstance(theory, database.Database):
+        return theory.data.get(table, {})
+    if (isinstance(theory, nonrecursive.RuleHandlingMixin) and
+            not theory.rules.get_nonfact_rules(table)):
+        return set(tuple(fact) for fact in theory.rules.get_facts(table))
+    query = compile.Literal(
+        table, [compile.Variable("x" + str(i)) for i in range(arity)])
+    return set(tuple(arg.name for arg in answer.arguments)
+               for answer in theory.select(query))
+
+
+def join(literals, bindings, relation):
+    """Return the extensions of BINDINGS that make LITERALS true.
+
+    Evaluates LITERALS in order, which must be safe given the variables
+    of BINDINGS, joining the bindings so far with each positive literal
+    through a hash index on the columns of the variables they share.
+    Each binding is a dict from Variable to value, and all of BINDINGS
+    bind the same variables.  RELATION maps a literal to the collection
+    of tuples of values of its table.
+    """
+    bound = set(bindings[0]) if bindings else set()
+    for lit in literals:
+        if not bindings:
+            break
+        if lit.tablename() == 'true':
+            continue
+        if lit.tablename() == 'false':
+            return []
+        if lit.is_builtin():
+            bindings = _join_builtin(lit, bindings)
+        elif lit.is_negated():
+            rows = relation(lit)
+            bindings = [binding for binding in bindings
+                        if _values(lit, binding) not in rows]
+        else:
+            bindings = _join_positive(lit, relation(lit), bindings, bound)
+        bound |= lit.variables()
+    return bindings
+
+
+def _values(lit, binding):
+    return tuple(binding[arg] if arg.is_variable() else arg.name
+                 for arg in lit.arguments)
+
+
+def _join_positive(lit, rows, bindings, bound):
+    """Join BINDINGS with the ROWS of the positive literal LIT."""
+    constants = []   # (position, value)
+    keys = []        # (position, variable) of bound variables
+    outputs = []     # (position, variable) of the new variables
+    repeated = []    # (position, earlier position) of new variables
+    new_positions = {}
+    for i, arg in enumerate(lit.arguments):
+        if not arg.is_variable():
+            constants.append((i, arg.name))
+        elif arg in bound:
+            keys.append((i, arg))
+        elif arg in new_positions:
+            repeated.append((i, new_positions[arg]))
+        else:
+            new_positions[arg] = i
+            outputs.append((i, arg))
+    index = {}
+    for row in rows:
+        if len(row) != len(lit.arguments):
+            continue
+        if any(row[i] != value for i, value in constants):
+            continue
+        if any(row[i] != row[j] for i, j in repeated):
+            continue
+        key = tuple(row[i] for i, _ in keys)
+        if key in index:
+            index[key].append(row)
+        else:
+            index[key] = [row]
+    results = []
+    for binding in bindings:
+        matches = index.get(tuple(binding[var] for _, var in keys), ())
+        for row in matches:
+            new = dict(binding)
+            for i, var in outputs:
+                new[var] = row[i]
+            results.append(new)
+    return results
+
+
+def _join_builtin(lit, bindings):
+    """Extend BINDINGS with the outputs of the builtin LIT."""
+    built = builtin.builtin_registry.builtin(lit.table)
+    inputs = lit.arguments[:built.num_inputs]
+    outputs = lit.arguments[built.num_inputs:]
+    results = []
+    for binding in bindings:
+        args = [binding[arg] if arg.is_variable() else arg.name
+                for arg in inputs]
+        try:
+            result = built.code(*args)
+        except Exception:
+            continue
+        if built.num_outputs == 0:
+            if result:
+                results.append(binding)
+            continue
+        if isinstance(result, (six.integer_types, float, six.string_types)):
+            result = [result]
+        result = list(result)
+        if len(result) != len(outputs):
+            continue
+        new = dict(binding)
+        for arg, value in zip(outputs, result):
+            if not arg.is_variable():
+                if arg.name != value:
+                    break
+            elif arg not in new:
+                new[arg] = value
+            elif new[arg] != value:
+                break
+        else:
+            results.append(new)
+    return results
@@ -20,6 +20,7 @@ import argparse
 import collections
 import copy
 import functools
+import re
 
 import six
 from six.moves import range
@@ -58,6 +59,9 @@ LOG = logging.getLogger(__name__)
 
 PERMITTED_MODALS = ['execute']
 
+# parse strings with FastDatalogSyntax where it supports them
+FAST_PARSER = True
+
 
 ##############################################################################
 # Internal representation of policy language
@@ -363,6 +367,17 @@ class ObjectConstant (Term):
     def __ne__(self, other):
         return not self == other
 
+    @classmethod
+    def type_of(cls, value):
+        """Return the type an ObjectConstant for python VALUE would have."""
+        if isinstance(value, six.string_types):
+            return cls.STRING
+        elif isinstance(value, six.integer_types):
+            return cls.INTEGER
+        elif isinstance(value, float):
+            return cls.FLOAT
+        return None
+
     def is_variable(self):
         return False
 
@@ -387,6 +402,7 @@ class Fact (tuple):
 
     def __init__(self, table, values):
         self.table = table
+        self._hash = None
 
     def __lt__(self, other):
         if self.SORT_RANK != other.SORT_RANK:
@@ -403,7 +419,10 @@ class Fact (tuple):
         return super(Fact, self).__eq__(other)
 
     def __hash__(self):
-        return hash((self.SORT_RANK, self.table, super(Fact, self).__hash__()))
+        if self._hash is None:
+            self._hash = hash((self.SORT_RANK, self.table,
+                               super(Fact, self).__hash__()))
+        return self._hash
 
 
 @functools.total_ordering
@@ -1576,6 +1595,46 @@ def reorder_for_safety(rule):
     return rule
 
 
+def reorder_for_cost(literals, bound_vars, estimate):
+    """Reorder LITERALS so that cheaper joins are evaluated first.
+
+    BOUND_VARS are the names of the variables bound before evaluating
+    LITERALS.  ESTIMATE is a function from a literal and the set of its
+    argument positions that are bound to the estimated number of rows
+    evaluating the literal returns, or None if unknown.
+    Only runs of consecutive positive literals with a known estimate are
+    reordered, greedily picking the literal with the fewest estimated rows
+    given the variables bound so far.  Since a run binds the same variables
+    whatever its order, the safety of the rest of the body is preserved.
+    """
+    bound = set(bound_vars)
+    result = []
+    run = []
+
+    def bound_positions(lit):
+        return frozenset(i for i, arg in enumerate(lit.arguments)
+                         if not arg.is_variable() or arg.name in bound)
+
+    def flush_run():
+        while run:
+            costs = [(estimate(lit, bound_positions(lit)), i)
+                     for i, lit in enumerate(run)]
+            lit = run.pop(min(costs)[1])
+            result.append(lit)
+            bound.update(lit.variable_names())
+
+    for lit in literals:
+        if (not lit.is_negated() and not lit.is_builtin() and
+                estimate(lit, bound_positions(lit)) is not None):
+            run.append(lit)
+            continue
+        flush_run()
+        result.append(lit)
+        bound.update(lit.variable_names())
+    flush_run()
+    return result
+
+
 def fact_errors(atom, theories=None, theory=None):
     """Checks if ATOM has any errors.
 
@@ -1905,6 +1964,13 @@ class Compiler (object):
 
     def read_source(self, input, input_string=False, theories=None,
                     use_modules=True):
+        if input_string and FAST_PARSER:
+            try:
+                self.theory = FastDatalogSyntax(use_modules).parse(input)
+                return
+            except FastDatalogSyntax.Unsupported:
+                # DatalogSyntax handles the rest, and reports the errors
+                pass
         syntax = DatalogSyntax(theories, use_modules)
         # parse input file and convert to internal representation
         self.raw_syntax_tree = syntax.parse_file(
@@ -2271,6 +2337,244 @@ class DatalogSyntax(object):
         return "".join([child.getText() for child in antlr.children])
 
 
+class FastDatalogSyntax(object):
+    """Recursive-descent parser for Datalog syntax.
+
+    Builds the same formulas as DatalogSyntax, many times faster, but
+    only accepts the syntax most policies use: e.g. no triple-quoted,
+    prefixed or adjacent strings, and no numbers other than decimal ones.
+    Raises Unsupported on any other input, including all syntax errors,
+    so that DatalogSyntax parses it and reports its errors.
+    """
+
+    class Unsupported(Exception):
+        pass
+
+    _TOKEN_RE = re.compile(r"""
+        (?P<ws>[ \t\r\n]+)
+        | (?P<comment>(?://|\#)[^\r\n]*\r?\n|/\*.*?\*/)
+        | (?P<float>[1-9][0-9]*\.[0-9]+(?:[eE][+-]?[0-9]+)?
+                    |0\.[0-9]+(?:[eE][+-]?[0-9]+)?
+                    |[1-9][0-9]*[eE][+-]?[0-9]+)
+        | (?P<int>[1-9][0-9]*|0)
+        | (?P<id>[a-zA-Z_][a-zA-Z0-9_.]*)
+        | (?P<string>'(?:\\.|[^\\\r\n'])*'|"(?:\\.|[^\\\r\n"])*")
+        | (?P<punct>:-|[()\[\],:=+\-;!.])
+        """, re.VERBOSE | re.DOTALL)
+
+    # characters that may not follow a token, for the lexer of the
+    #   ANTLR grammar would split the input differently
+    _ID_CHARS = frozenset(
+        'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_.')
+    _QUOTES = frozenset('\'"')
+
+    _KEYWORDS = {'not': 'not', 'NOT': 'not', 'insert': 'insert',
+                 'delete': 'delete', 'execute': 'execute'}
+
+    def __init__(self, use_modules=True):
+        self.use_modules = use_modules
+        self.tokens = None
+        self.pos = 0
+
+    def parse(self, text):
+        """Return the list of formulas in TEXT."""
+        self.tokens = self.tokenize(text)
+        self.pos = 0
+        formulas = []
+        while self.tokens[self.pos][0] != 'eof':
+            formulas.append(self.statement())
+        return formulas
+
+    def tokenize(self, text):
+        """Return the list of (type, text, line, col) tokens of TEXT."""
+        tokens = []
+        match = self._TOKEN_RE.match
+        pos = 0
+        end = len(text)
+        line = 1
+        line_start = 0
+        while pos < end:
+            m = match(text, pos)
+            if m is None:
+                raise self.Unsupported()
+            kind = m.lastgroup
+            value = m.group(kind)
+            next_pos = m.end()
+            if kind == 'ws' or kind == 'comment' or kind == 'string':
+                newlines = value.count('\n')
+                if newlines:
+                    if kind == 'string':
+                        raise self.Unsupported()
+                    line += newlines
+                    line_start = text.rindex('\n', pos, next_pos) + 1
+                if kind != 'string':
+                    pos = next_pos
+                    continue
+            following = text[next_pos:next_pos + 1]
+            if kind == 'id':
+                if following in self._QUOTES:
+                    raise self.Unsupported()
+                kind = self._KEYWORDS.get(value, 'id')
+            elif kind == 'punct':
+                if value == '.' and following in self._ID_CHARS:
+                    raise self.Unsupported()
+                kind = value
+            elif kind == 'string':
+                if following in self._QUOTES:
+                    raise self.Unsupported()
+            elif following in self._ID_CHARS:
+                raise self.Unsupported()
+            tokens.append((kind, value, line, pos - line_start))
+            pos = next_pos
+        # a 2nd end token to look ahead by 2 from anywhere
+        tokens.extend([('eof', '', line, pos - line_start)] * 2)
+        return tokens
+
+    def peek(self, offset=0):
+        return self.tokens[self.pos + offset][0]
+
+    def expect(self, kind):
+        token = self.tokens[self.pos]
+        if token[0] != kind:
+            raise self.Unsupported()
+        self.pos += 1
+        return token
+
+    def statement(self):
+        if self.peek() in ('insert', 'delete') and self.peek(1) == '[' and (
+                self.is_event()):
+            formula = self.event()
+        else:
+            heads = self.literal_list()
+            if self.peek() == ':-':
+                self.pos += 1
+                formula = Rule(heads, self.literal_list(),
+                               location=utils.Location(line=0, col=-1))
+            elif len(heads) == 1 and not heads[0].negated:
+                formula = heads[0]
+            else:
+                raise self.Unsupported()
+        if self.peek() in (';', '.'):
+            self.pos += 1
+        return formula
+
+    def is_event(self):
+        """Return True if the brackets after the modal hold a rule."""
+        depth = 0
+        for token in self.tokens[self.pos + 1:]:
+            kind = token[0]
+            if kind == '[':
+                depth += 1
+            elif kind == ']':
+                depth -= 1
+                if depth == 0:
+                    return False
+            elif kind == ':-' and depth == 1:
+                return True
+            elif kind == 'eof':
+                return False
+        return False
+
+    def event(self):
+        insert = self.tokens[self.pos][0] == 'insert'
+        self.pos += 2
+        heads = self.literal_list()
+        self.expect(':-')
+        rule = Rule(heads, self.literal_list(),
+                    location=utils.Location(line=0, col=-1))
+        policy = None
+        if self.peek() in (';', '.'):
+            self.pos += 1
+            policy = self.expect('string')[1][1:-1]
+        self.expect(']')
+        return Event(formula=rule, insert=insert, target=policy)
+
+    def literal_list(self):
+        literals = [self.literal()]
+        while self.peek() == ',':
+            self.pos += 1
+            literals.append(self.literal())
+        return literals
+
+    def literal(self):
+        negated = self.peek() == 'not' or self.peek() == '!'
+        if negated:
+            self.pos += 1
+        kind = self.peek()
+        if kind in ('execute', 'insert', 'delete'):
+            modal = self.tokens[self.pos][1]
+            self.pos += 1
+            self.expect('[')
+            lit = self.atom(modal)
+            self.expect(']')
+        else:
+            lit = self.atom(None)
+        lit.negated = negated
+        return lit
+
+    def atom(self, modal):
+        names = [self.expect('id')[1]]
+        while self.peek() == ':':
+            self.pos += 1
+            names.append(self.expect('id')[1])
+        tablename = ':'.join(names)
+        if self.peek() in ('+', '-'):
+            tablename += self.tokens[self.pos][1]
+            self.pos += 1
+        args = []
+        named = {}
+        if self.peek() == '(':
+            self.pos += 1
+            if self.peek() != ')':
+                self.parameter(args, named)
+                while self.peek() == ',':
+                    self.pos += 1
+                    self.parameter(args, named)
+            self.expect(')')
+        table = Tablename.create_from_tablename(
+            tablename, use_modules=self.use_modules)
+        table.modal = modal
+        return Literal(table, args, location=utils.Location(line=0, col=-1),
+                       use_modules=self.use_modules, named_arguments=named)
+
+    def parameter(self, args, named):
+        """Add the next parameter to ARGS or to NAMED."""
+        if self.peek(1) == '=' and self.peek() in ('id', 'int'):
+            kind, name = self.tokens[self.pos][:2]
+            self.pos += 2
+            if kind == 'int':
+                name = int(name)
+                if name < len(args):
+                    raise self.Unsupported()
+            if name in named:
+                raise self.Unsupported()
+            named[name] = self.term()
+        elif named:
+            # a positional parameter after a reference parameter
+            raise self.Unsupported()
+        else:
+            args.append(self.term())
+
+    def term(self):
+        kind, value, line, col = self.tokens[self.pos]
+        location = utils.Location(line=line, col=col)
+        if kind == 'id':
+            term = Variable(value, location=location)
+        elif kind == 'int':
+            term = ObjectConstant(int(value), ObjectConstant.INTEGER,
+                                  location=location)
+        elif kind == 'float':
+            term = ObjectConstant(float(value), ObjectConstant.FLOAT,
+                                  location=location)
+        elif kind == 'string':
+            term = ObjectConstant(value[1:-1], ObjectConstant.STRING,
+                                  location=location)
+        else:
+            raise self.Unsupported()
+        self.pos += 1
+        return term
+
+
 def print_antlr(tree):
     """Print an antlr Tree."""
     print_tree(
@@ -2312,9 +2616,9 @@ def string_is_servicename(name):
 
 def parse(policy_string, theories=None, use_modules=True):
     """Run compiler on policy string and return the parsed formulas."""
-    compiler = get_compiler(
-        [policy_string, '--input_string'], theories=theories,
-        use_modules=use_modules)
+    compiler = Compiler()
+    compiler.read_source(policy_string, input_string=True,
+                         theories=theories, use_modules=use_modules)
     return compiler.theory
 
 
@@ -2323,6 +2627,45 @@ def parse1(policy_string, theories=None, use_modules=True):
     return parse(policy_string, theories=theories, use_modules=use_modules)[0]
 
 
+# formulas parsed by parse_query, least recently used first
+_query_cache = collections.OrderedDict()
+QUERY_CACHE_SIZE = 1000
+
+
+def parse_query(query_string, use_modules=True):
+    """Return the formula parsed from QUERY_STRING, a single statement.
+
+    Remembers the formulas of the QUERY_CACHE_SIZE most recently parsed
+    strings.  The formula returned is shared by every caller parsing the
+    same string, so it must not be changed.
+    """
+    key = (query_string, use_modules)
+    try:
+        formula = _query_cache.pop(key)
+    except KeyError:
+        formulas = parse(query_string, use_modules=use_modules)
+        if len(formulas) != 1:
+            raise exception.PolicyException(
+                "Queries can have only 1 statement: {}".format(
+                    [str(x) for x in formulas]))
+        formula = formulas[0]
+        if len(_query_cache) >= QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+    _query_cache[key] = formula
+    return formula
+
+
+def table_query(tablename, arity, modal=None, use_modules=True):
+    """Return the literal querying every row of TABLENAME.
+
+    The literal has ARITY distinct variables x0, x1, ... as arguments.
+    """
+    table = Tablename.create_from_tablename(tablename,
+                                            use_modules=use_modules)
+    table.modal = modal
+    return Literal(table, [Variable("x" + str(i)) for i in range(arity)])
+
+
 def parse_file(filename, theories=None):
     """Compile the file.
 
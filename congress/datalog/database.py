@@ -158,6 +158,8 @@ class Database(topdown.TopDownTheory):
         super(Database, self).__init__(
             name=name, abbr=abbr, theories=theories, schema=schema,
             desc=desc, owner=owner)
+        # dictionary from table name to dictionary from the tuple of values
+        #   of each row to its DBTuple
         self.data = {}
         self.kind = base.DATABASE_POLICY_TYPE
 
@@ -173,7 +175,7 @@ class Database(topdown.TopDownTheory):
             for key in h:
                 s = "{} : ".format(key)
                 s += '['
-                s += ', '.join([str(val) for val in h[key]])
+                s += ', '.join([str(val) for val in h[key].values()])
                 s += ']'
                 strings.append(s)
             return '{' + ", ".join(strings) + '}'
@@ -195,18 +197,18 @@ class Database(topdown.TopDownTheory):
         results = []
         for table in self.data:
             if table not in other.data:
-                for dbtuple in self.data[table]:
+                for dbtuple in self.data[table].values():
                     add_tuple(table, dbtuple)
             else:
-                for dbtuple in self.data[table]:
-                    if dbtuple not in other.data[table]:
+                for dbtuple in self.data[table].values():
+                    if dbtuple.tuple not in other.data[table]:
                         add_tuple(table, dbtuple)
         return results
 
     def __or__(self, other):
         def add_db(db):
             for table in db.data:
-                for dbtuple in db.data[table]:
+                for dbtuple in db.data[table].values():
                     result.insert(compile.Literal.create_from_table_tuple(
                         table, dbtuple.tuple), proofs=dbtuple.proofs)
         result = Database()
@@ -216,7 +218,7 @@ class Database(topdown.TopDownTheory):
 
     def __getitem__(self, key):
         # KEY must be a tablename
-        return self.data[key]
+        return list(self.data[key].values())
 
     def content(self, tablenames=None):
         """Return a sequence of Literals representing all the table data."""
@@ -226,7 +228,7 @@ class Database(topdown.TopDownTheory):
         for table in tablenames:
             if table not in self.data:
                 continue
-            for dbtuple in self.data[table]:
+            for dbtuple in self.data[table].values():
                 results.append(compile.Literal.create_from_table_tuple(
                     table, dbtuple.tuple))
         return results
@@ -241,12 +243,10 @@ class Database(topdown.TopDownTheory):
             noop = False
         if event.formula.table.table not in self.data:
             return not noop
-        event_data = self.data[event.formula.table.table]
         raw_tuple = tuple(event.formula.argument_names())
-        for dbtuple in event_data:
-            if dbtuple.tuple == raw_tuple:
-                if event.proofs <= dbtuple.proofs:
-                    return noop
+        dbtuple = self.data[event.formula.table.table].get(raw_tuple)
+        if dbtuple is not None and event.proofs <= dbtuple.proofs:
+            return noop
         return not noop
 
     def __contains__(self, formula):
@@ -254,17 +254,16 @@ class Database(topdown.TopDownTheory):
             return False
         if formula.table.table not in self.data:
             return False
-        event_data = self.data[formula.table.table]
         raw_tuple = tuple(formula.argument_names())
-        return any((dbtuple.tuple == raw_tuple for dbtuple in event_data))
+        return raw_tuple in self.data[formula.table.table]
 
     def explain(self, atom):
         if atom.table.table not in self.data or not atom.is_ground():
             return self.ProofCollection([])
         args = tuple([x.name for x in atom.arguments])
-        for dbtuple in self.data[atom.table.table]:
-            if dbtuple.tuple == args:
-                return dbtuple.proofs
+        dbtuple = self.data[atom.table.table].get(args)
+        if dbtuple is not None:
+            return dbtuple.proofs
 
     def tablenames(self, body_only=False, include_builtin=False,
                    include_modal=True):
@@ -281,7 +280,22 @@ class Database(topdown.TopDownTheory):
     def head_index(self, table, match_literal=None):
         if table not in self.data:
             return []
-        return self.data[table]
+        if match_literal is not None and match_literal.is_ground():
+            dbtuple = self.data[table].get(
+                tuple(match_literal.argument_names()))
+            if dbtuple is None:
+                return []
+            return [dbtuple]
+        return self.data[table].values()
+
+    def index_stats(self):
+        """Return the number of facts and index statistics for each table.
+
+        Same format as NonrecursiveRuleTheory.index_stats().  A Database
+        keeps no indexes, so only the number of facts is interesting.
+        """
+        return dict((table, {'facts': len(tuples), 'indexes': {}})
+                    for table, tuples in self.data.items())
 
     def head(self, thing):
         return thing
@@ -361,18 +375,15 @@ class Database(topdown.TopDownTheory):
         table, dbtuple = self.atom_to_internal(atom, proofs)
         self.log(table, "Insert: %s", atom)
         if table not in self.data:
-            self.data[table] = [dbtuple]
+            self.data[table] = {dbtuple.tuple: dbtuple}
             self.log(atom.table.table, "First tuple in table %s", table)
             return
+        existingtuple = self.data[table].get(dbtuple.tuple)
+        if existingtuple is None:
+            self.data[table][dbtuple.tuple] = dbtuple
         else:
-            for existingtuple in self.data[table]:
-                assert existingtuple.proofs is not None
-                if existingtuple.tuple == dbtuple.tuple:
-                    assert existingtuple.proofs is not None
-                    existingtuple.proofs |= dbtuple.proofs
-                    assert existingtuple.proofs is not None
-                    return
-            self.data[table].append(dbtuple)
+            assert existingtuple.proofs is not None
+            existingtuple.proofs |= dbtuple.proofs
 
     def delete_actual(self, atom, proofs=None):
         """Workhorse for deleting ATOM from the DB.
@@ -384,13 +395,11 @@ class Database(topdown.TopDownTheory):
         table, dbtuple = self.atom_to_internal(atom, proofs)
         if table not in self.data:
             return
-        for i in range(0, len(self.data[table])):
-            existingtuple = self.data[table][i]
-            if existingtuple.tuple == dbtuple.tuple:
-                existingtuple.proofs -= dbtuple.proofs
-                if len(existingtuple.proofs) == 0:
-                    del self.data[table][i]
-                return
+        existingtuple = self.data[table].get(dbtuple.tuple)
+        if existingtuple is not None:
+            existingtuple.proofs -= dbtuple.proofs
+            if len(existingtuple.proofs) == 0:
+                del self.data[table][dbtuple.tuple]
 
     def policy(self):
         """Return the policy for this theory.
@@ -404,7 +413,7 @@ class Database(topdown.TopDownTheory):
             return None
         if len(self.data[tablename]) == 0:
             return None
-        return len(self.data[tablename][0].tuple)
+        return len(next(iter(self.data[tablename])))
 
     def content_string(self):
         s = ""
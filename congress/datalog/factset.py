@@ -17,7 +17,12 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 
-from congress.datalog import utility
+import array
+import itertools
+
+from six.moves import range
+
+from congress.datalog import compile
 
 
 class FactSet(object):
@@ -27,13 +32,22 @@ class FactSet(object):
     given a partial or full match.  Expects that all facts are the same width.
     """
 
+    # replace() rebuilds the FactSet when the number of facts changed times
+    #   this ratio is at least the number of facts in the result.
+    REBUILD_RATIO = 4
+
     def __init__(self):
-        self._facts = utility.OrderedSet()
+        # dict from fact to None, used as an insertion-ordered set
+        self._facts = {}
 
         # key is a sorted tuple of column indices, values are dict mapping a
         # specific value for the key to a set of Facts.
         self._indicies = {}
 
+        # key is a sorted tuple of column indices, value is the number of
+        # times find() used the index on those columns.
+        self._index_hits = {}
+
     def __contains__(self, fact):
         return fact in self._facts
 
@@ -50,16 +64,17 @@ class FactSet(object):
         fact, otherwise returns False.
         """
         assert isinstance(fact, tuple)
-        changed = self._facts.add(fact)
-        if changed:
-            # Add the fact to the indicies
-            try:
-                for index in self._indicies.keys():
-                    self._add_fact_to_index(fact, index)
-            except Exception:
-                self._facts.discard(fact)
-                raise
-        return changed
+        if fact in self._facts:
+            return False
+        self._facts[fact] = None
+        # Add the fact to the indicies
+        try:
+            for index in self._indicies.keys():
+                self._add_fact_to_index(fact, index)
+        except Exception:
+            del self._facts[fact]
+            raise
+        return True
 
     def remove(self, fact):
         """Remove a fact from the FactSet
@@ -67,16 +82,61 @@ class FactSet(object):
         Returns True if the fact is in this FactSet and removes the fact,
         otherwise returns False.
         """
-        changed = self._facts.discard(fact)
-        if changed:
-            # Remove from indices
-            try:
-                for index in self._indicies.keys():
-                    self._remove_fact_from_index(fact, index)
-            except Exception:
-                self._facts.add(fact)
-                raise
-        return changed
+        if fact not in self._facts:
+            return False
+        del self._facts[fact]
+        # Remove from indices
+        try:
+            for index in self._indicies.keys():
+                self._remove_fact_from_index(fact, index)
+        except Exception:
+            self._facts[fact] = None
+            raise
+        return True
+
+    def difference(self, facts):
+        """Compare the FactSet with the iterable FACTS
+
+        Returns the pair of sets of the facts in FACTS but not in self and
+        of the facts in self but not in FACTS.
+        """
+        return self._difference(dict.fromkeys(facts))
+
+    def _difference(self, new_facts):
+        added = set(f for f in new_facts if f not in self._facts)
+        if len(new_facts) - len(added) == len(self._facts):
+            # every current fact is kept
+            return added, set()
+        return added, set(f for f in self._facts if f not in new_facts)
+
+    def replace(self, facts):
+        """Replace the contents of the FactSet with the iterable FACTS
+
+        When most facts change, the facts and all the existing indexes are
+        rebuilt in one pass each instead of being updated fact by fact.
+        Returns the pair of sets of the facts added and removed.
+        """
+        new_facts = dict.fromkeys(facts)
+        added, removed = self._difference(new_facts)
+        if (len(added) + len(removed)) * self.REBUILD_RATIO < len(new_facts):
+            for fact in removed:
+                self.remove(fact)
+            for fact in added:
+                self.add(fact)
+            return added, removed
+        indicies = {}
+        for columns in self._indicies:
+            index = {}
+            for fact in new_facts:
+                k = self._compute_key(columns, fact)
+                if k in index:
+                    index[k].add(fact)
+                else:
+                    index[k] = set((fact,))
+            indicies[columns] = index
+        self._facts = new_facts
+        self._indicies = indicies
+        return added, removed
 
     def create_index(self, columns):
         """Create an index
@@ -92,6 +152,8 @@ class FactSet(object):
         if columns in self._indicies:
             return
 
+        self._indicies[columns] = {}
+        self._index_hits[columns] = 0
         for f in self._facts:
             self._add_fact_to_index(f, columns)
 
@@ -106,11 +168,42 @@ class FactSet(object):
         assert sorted(columns) == list(columns)
         if columns in self._indicies:
             del self._indicies[columns]
+            self._index_hits.pop(columns, None)
 
     def has_index(self, columns):
         """Returns True if the index exists."""
         return columns in self._indicies
 
+    def indexes(self):
+        """Returns the column tuples of all the existing indexes."""
+        return list(self._indicies.keys())
+
+    def index_stats(self):
+        """Returns usage statistics for the existing indexes.
+
+        The result maps each tuple of indexed columns to a dictionary with
+        the number of distinct 'keys' in the index, the number of 'entries'
+        it holds (one per fact) and the number of 'hits' find() made on it.
+        """
+        return dict((columns, {'keys': len(index),
+                               'entries': len(self._facts),
+                               'hits': self._index_hits.get(columns, 0)})
+                    for columns, index in self._indicies.items())
+
+    def estimate_selectivity(self, columns, sample_size=1000):
+        """Estimate the fraction of facts a find() on COLUMNS returns.
+
+        The estimate is 1 over the number of distinct values the columns
+        take in the first SAMPLE_SIZE facts, so it is only a lower bound on
+        the number of distinct values for bigger FactSets.  Returns 1.0
+        when the FactSet is empty.
+        """
+        keys = set(self._compute_key(columns, f)
+                   for f in itertools.islice(self._facts, sample_size))
+        if not keys:
+            return 1.0
+        return 1.0 / len(keys)
+
     def find(self, partial_fact, iterations=None):
         """Find Facts given a partial fact
 
@@ -128,6 +221,7 @@ class FactSet(object):
         index = tuple([i for i, v in partial_fact])
         k = tuple([v for i, v in partial_fact])
         if index in self._indicies:
+            self._index_hits[index] += 1
             if iterations is not None:
                 iterations.append(1)
             if k in self._indicies[index]:
@@ -169,3 +263,347 @@ class FactSet(object):
         self._indicies[index][k].remove(fact)
         if not len(self._indicies[index][k]):
             del self._indicies[index][k]
+
+
+class ValueInterner(object):
+    """ValueInterner
+
+    Maps the values stored in facts to small integer ids and back, so that
+    each distinct value is stored once however many facts contain it.  Ids
+    are reference counted and reused once no fact refers to them anymore.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._values = []
+        self._refcounts = array.array('q')
+        self._free = []
+
+    def __len__(self):
+        return len(self._ids)
+
+    @staticmethod
+    def _key(value):
+        # 1, 1.0 and True are equal and hash the same, but are different
+        #   values for datalog.
+        if type(value) in (str, int):
+            return value
+        return (type(value), value)
+
+    def lookup(self, value):
+        """Returns the id of VALUE or None if VALUE is not interned."""
+        return self._ids.get(self._key(value))
+
+    def intern(self, value):
+        """Returns the id of VALUE, interning it if needed.
+
+        Each call must be matched by a call to release() once the caller
+        no longer refers to the id.
+        """
+        key = self._key(value)
+        id_ = self._ids.get(key)
+        if id_ is None:
+            if self._free:
+                id_ = self._free.pop()
+                self._values[id_] = value
+                self._refcounts[id_] = 0
+            else:
+                id_ = len(self._values)
+                self._values.append(value)
+                self._refcounts.append(0)
+            self._ids[key] = id_
+        self._refcounts[id_] += 1
+        return id_
+
+    def release(self, id_):
+        """Drops a reference to ID_, forgetting its value if unused."""
+        self._refcounts[id_] -= 1
+        if self._refcounts[id_] == 0:
+            del self._ids[self._key(self._values[id_])]
+            self._values[id_] = None
+            self._free.append(id_)
+
+    def value(self, id_):
+        return self._values[id_]
+
+
+class ArrayFactSet(object):
+    """ArrayFactSet
+
+    Same interface as FactSet, but with a compact representation meant for
+    large tables.  Values are interned into integer ids, possibly shared
+    with other ArrayFactSets through INTERNER.  Rows are stored in one
+    array of ids per column and indexes map keys to arrays of row numbers.
+    Facts are rebuilt when they are returned, and are not returned in
+    insertion order.  Expects that all facts are the same width.
+    """
+
+    def __init__(self, interner=None):
+        if interner is None:
+            interner = ValueInterner()
+        self._interner = interner
+        # table of the Facts to return; None to return plain tuples
+        self._table = None
+        self._width = None
+        # one array of value ids per column
+        self._columns = []
+        # map from the hash of the value ids of a row to its row number,
+        #   or to a list of row numbers on collisions
+        self._rows = {}
+        self._count = 0
+        # 1 for the row numbers in use, 0 for the free ones
+        self._live = bytearray()
+        self._free_rows = []
+
+        # key is a sorted tuple of column indices, values are dict mapping
+        # the value ids for the key to an array of row numbers.
+        self._indicies = {}
+        self._index_hits = {}
+
+    def __contains__(self, fact):
+        return self._find_row(self._lookup_ids(fact)) is not None
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for row in self._live_rows():
+            yield self._fact(row)
+
+    def add(self, fact):
+        """Add a fact to the ArrayFactSet
+
+        Returns True if the fact is absent from this ArrayFactSet and adds
+        the fact, otherwise returns False.
+        """
+        assert isinstance(fact, tuple)
+        if self._width is None:
+            self._width = len(fact)
+            self._columns = [array.array('q') for _ in range(self._width)]
+            if isinstance(fact, compile.Fact):
+                self._table = fact.table
+        elif len(fact) != self._width:
+            raise ValueError("Fact %s does not have width %d" %
+                             (str(fact), self._width))
+        if fact in self:
+            return False
+
+        ids = [self._interner.intern(value) for value in fact]
+        if self._free_rows:
+            row = self._free_rows.pop()
+            for column, id_ in zip(self._columns, ids):
+                column[row] = id_
+            self._live[row] = 1
+        else:
+            row = len(self._live)
+            for column, id_ in zip(self._columns, ids):
+                column.append(id_)
+            self._live.append(1)
+        self._add_row_hash(hash(tuple(ids)), row)
+        self._count += 1
+        for columns, index in self._indicies.items():
+            key = self._index_key(columns, row)
+            if key not in index:
+                index[key] = array.array('q')
+            index[key].append(row)
+        return True
+
+    def remove(self, fact):
+        """Remove a fact from the ArrayFactSet
+
+        Returns True if the fact is in this ArrayFactSet and removes the
+        fact, otherwise returns False.
+        """
+        ids = self._lookup_ids(fact)
+        row = self._find_row(ids)
+        if row is None:
+            return False
+        self._remove_row_hash(hash(tuple(ids)), row)
+        self._count -= 1
+        for columns, index in self._indicies.items():
+            key = self._index_key(columns, row)
+            index[key].remove(row)
+            if not len(index[key]):
+                del index[key]
+        self._live[row] = 0
+        self._free_rows.append(row)
+        for id_ in ids:
+            self._interner.release(id_)
+        return True
+
+    def difference(self, facts):
+        """Compare with the iterable FACTS, as FactSet.difference()."""
+        new_facts = set(facts)
+        return (set(f for f in new_facts if f not in self),
+                set(f for f in self if f not in new_facts))
+
+    def replace(self, facts):
+        """Replace the contents with the iterable FACTS
+
+        Same contract as FactSet.replace(), except that rows are written
+        only for the facts that changed and indexes are updated row by row.
+        """
+        added, removed = self.difference(facts)
+        width = self._width
+        for fact in added:
+            if width is None:
+                width = len(fact)
+            elif len(fact) != width:
+                raise ValueError("Fact %s does not have width %d" %
+                                 (str(fact), width))
+        for fact in removed:
+            self.remove(fact)
+        for fact in added:
+            self.add(fact)
+        return added, removed
+
+    def create_index(self, columns):
+        """Create an index
+
+        Same contract as FactSet.create_index().
+        """
+        assert sorted(columns) == list(columns)
+        assert len(columns)
+
+        if columns in self._indicies:
+            return
+
+        if self._width is not None and columns[-1] >= self._width:
+            raise IndexError("Index %s out of range for width %d" %
+                             (str(columns), self._width))
+        index = {}
+        for row in self._live_rows():
+            key = self._index_key(columns, row)
+            if key not in index:
+                index[key] = array.array('q')
+            index[key].append(row)
+        self._indicies[columns] = index
+        self._index_hits[columns] = 0
+
+    def remove_index(self, columns):
+        """Remove an index
+
+        Same contract as FactSet.remove_index().
+        """
+        assert sorted(columns) == list(columns)
+        if columns in self._indicies:
+            del self._indicies[columns]
+            self._index_hits.pop(columns, None)
+
+    def has_index(self, columns):
+        """Returns True if the index exists."""
+        return columns in self._indicies
+
+    def indexes(self):
+        """Returns the column tuples of all the existing indexes."""
+        return list(self._indicies.keys())
+
+    def index_stats(self):
+        """Returns usage statistics, as FactSet.index_stats()."""
+        return dict((columns, {'keys': len(index),
+                               'entries': self._count,
+                               'hits': self._index_hits.get(columns, 0)})
+                    for columns, index in self._indicies.items())
+
+    def estimate_selectivity(self, columns, sample_size=1000):
+        """Estimate the fraction of facts a find() on COLUMNS returns.
+
+        Same contract as FactSet.estimate_selectivity().
+        """
+        keys = set(self._index_key(columns, row)
+                   for row in itertools.islice(self._live_rows(),
+                                               sample_size))
+        if not keys:
+            return 1.0
+        return 1.0 / len(keys)
+
+    def find(self, partial_fact, iterations=None):
+        """Find Facts given a partial fact
+
+        Same contract as FactSet.find().
+        """
+        index = tuple([i for i, v in partial_fact])
+        ids = [self._interner.lookup(v) for i, v in partial_fact]
+        if index in self._indicies:
+            self._index_hits[index] += 1
+            if iterations is not None:
+                iterations.append(1)
+            if None in ids:
+                return set()
+            if len(ids) == 1:
+                key = ids[0]
+            else:
+                key = tuple(ids)
+            rows = self._indicies[index].get(key, ())
+            return set(self._fact(row) for row in rows)
+
+        if iterations is not None:
+            iterations.append(self._count)
+        if None in ids:
+            return set()
+        # There is no index, so iterate.
+        matches = set()
+        selection = [(self._columns[i], id_)
+                     for (i, v), id_ in zip(partial_fact, ids)]
+        for row in self._live_rows():
+            for column, id_ in selection:
+                if column[row] != id_:
+                    break
+            else:
+                matches.add(self._fact(row))
+        return matches
+
+    def _live_rows(self):
+        return (row for row, live in enumerate(self._live) if live)
+
+    def _lookup_ids(self, fact):
+        return [self._interner.lookup(value) for value in fact]
+
+    def _find_row(self, ids):
+        if len(ids) != self._width or None in ids:
+            return None
+        rows = self._rows.get(hash(tuple(ids)))
+        if rows is None:
+            return None
+        if not isinstance(rows, list):
+            rows = [rows]
+        for row in rows:
+            if all(column[row] == id_
+                   for column, id_ in zip(self._columns, ids)):
+                return row
+        return None
+
+    def _add_row_hash(self, key, row):
+        rows = self._rows.get(key)
+        if rows is None:
+            self._rows[key] = row
+        elif isinstance(rows, list):
+            rows.append(row)
+        else:
+            self._rows[key] = [rows, row]
+
+    def _remove_row_hash(self, key, row):
+        rows = self._rows[key]
+        if not isinstance(rows, list):
+            del self._rows[key]
+        else:
+            rows.remove(row)
+            if len(rows) == 1:
+                self._rows[key] = rows[0]
+
+    def _index_key(self, columns, row):
+        if len(columns) == 1:
+            return self._columns[columns[0]][row]
+        return tuple([self._columns[i][row] for i in columns])
+
+    def _fact(self, row):
+        interned = self._interner._values
+        values = tuple([interned[column[row]] for column in self._columns])
+        if self._table is None:
+            return values
+        return compile.Fact(self._table, values)
+
+
+# Backends for storing facts, selected by name.
+FACTSET_BACKENDS = {'tuple': FactSet,
+                    'array': ArrayFactSet}
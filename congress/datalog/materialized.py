@@ -21,10 +21,13 @@ from oslo_log import log as logging
 from six.moves import range
 
 from congress.datalog import base
+from congress.datalog import bottomup
+from congress.datalog import builtin
 from congress.datalog import compile
 from congress.datalog import database
 from congress.datalog import topdown
 from congress.datalog import utility
+from congress import exception
 
 
 LOG = logging.getLogger(__name__)
@@ -309,9 +312,18 @@ class MaterializedViewTheory(topdown.TopDownTheory):
 
     Relies on included theories to define the contents of those
     tables not defined by the rules of the theory.
-    Recursive rules are allowed.
+    Recursive rules are allowed, except with counting maintenance.
+
+    Consecutive changes to the same table are propagated as a batch:
+    each delta rule triggered by the table is evaluated once for the
+    whole batch, by hash joins over the tables in its body.
     """
 
+    # ways of maintaining the rows of views: PROOFS records every
+    #   derivation of a row, COUNTING only how many there are
+    PROOFS = 'proofs'
+    COUNTING = 'counting'
+
     def __init__(self, name=None, abbr=None, theories=None, schema=None,
                  desc=None, owner=None):
         super(MaterializedViewTheory, self).__init__(
@@ -334,6 +346,22 @@ class MaterializedViewTheory(topdown.TopDownTheory):
         # rules that dictate how database changes in response to events
         self.delta_rules = DeltaRuleTheory(name=delta_name, abbr=delta_abbr)
         self.kind = base.MATERIALIZED_POLICY_TYPE
+        self.maintenance = self.PROOFS
+        # dictionary from view atom to its number of derivations, for
+        #   counting maintenance
+        self.counts = {}
+
+    def set_maintenance(self, maintenance):
+        """Maintain the rows of views as described by MAINTENANCE.
+
+        With COUNTING, rows of views record no proofs, so explain reports
+        them like base facts.  Must be called before inserting anything.
+        """
+        if maintenance not in (self.PROOFS, self.COUNTING):
+            raise exception.PolicyException(
+                "Unknown maintenance for materialized views: %s" %
+                maintenance)
+        self.maintenance = maintenance
 
     def set_tracer(self, tracer):
         if isinstance(tracer, base.Tracer):
@@ -391,6 +419,12 @@ class MaterializedViewTheory(topdown.TopDownTheory):
             else:
                 errors.extend(compile.rule_errors(
                     event.formula, self.theories, self.name))
+        if self.maintenance == self.COUNTING:
+            rules = [event.formula for event in events
+                     if event.insert and not event.formula.is_atom()]
+            if rules and compile.is_recursive(list(self.policy()) + rules):
+                errors.append(exception.PolicyException(
+                    "Counting maintenance requires nonrecursive rules"))
         return errors
 
     def explain(self, query, tablenames, find_all):
@@ -506,24 +540,160 @@ class MaterializedViewTheory(topdown.TopDownTheory):
                     self.process_new_bindings(bindings, event.formula.head,
                                               event.insert, event.formula)
             else:
-                self.propagate(event)
-                history.extend(self.database.modify(event))
+                events = [event]
+                while (len(self.queue) > 0 and
+                       self.is_same_batch(event, self.queue.peek())):
+                    events.append(self.queue.dequeue())
+                history.extend(self.process_batch(events))
             self.log(event.tablename(), "History: %s",
                      utility.iterstr(history))
         return history
 
+    @staticmethod
+    def is_same_batch(event, other):
+        """Return True if OTHER can be processed in a batch with EVENT.
+
+        Both must insert, or both delete, atoms of the same table.
+        """
+        return (other.formula.is_atom() and
+                other.insert == event.insert and
+                other.formula.table.table == event.formula.table.table)
+
+    def process_batch(self, events):
+        """Apply EVENTS and propagate the rows they add or remove.
+
+        EVENTS all insert, or all delete, atoms of the same table.
+        Returns the list of events that were not noops.
+        """
+        table = events[0].formula.table.table
+        changes = []
+        # atoms whose row was added or removed
+        atoms = []
+        for event in events:
+            present = event.formula in self.database
+            changes.extend(self.database.modify(event))
+            if present != (event.formula in self.database):
+                atoms.append(event.formula)
+        if atoms:
+            self.propagate_atoms(table, atoms, events[0].insert)
+        return changes
+
     def propagate(self, event):
         """Propagate event.
 
         Computes and enqueue events generated by EVENT and the DELTA_RULES.
         """
-        self.log(event.formula.table.table, "Processing event: %s", event)
-        applicable_rules = self.delta_rules.rules_with_trigger(
-            event.formula.table.table)
+        self.propagate_atoms(event.formula.table.table, [event.formula],
+                             event.insert)
+
+    def propagate_atoms(self, table, atoms, insert):
+        """Propagate the insertion or deletion of ATOMS from TABLE.
+
+        Computes and enqueues the events generated by ATOMS and the
+        DELTA_RULES.
+        """
+        self.log(table, "Processing %s atoms", len(atoms))
+        applicable_rules = self.delta_rules.rules_with_trigger(table)
         if len(applicable_rules) == 0:
-            self.log(event.formula.table.table, "No applicable delta rule")
+            self.log(table, "No applicable delta rule")
         for delta_rule in applicable_rules:
-            self.propagate_rule(event, delta_rule)
+            self.propagate_rule_batch(atoms, insert, delta_rule)
+
+    def propagate_rule_batch(self, atoms, insert, delta_rule):
+        """Propagate the insertion or deletion of ATOMS with DELTA_RULE.
+
+        Joins all of ATOMS with the body of DELTA_RULE at once, unless the
+        body cannot be evaluated that way, and enqueues the new events.
+        """
+        body = self._join_order(delta_rule.body,
+                                delta_rule.trigger.variables())
+        if body is None:
+            for atom in atoms:
+                self.propagate_rule(
+                    compile.Event(formula=atom, insert=insert), delta_rule)
+            return
+        self.log(delta_rule.trigger.table.table,
+                 "Processing %s atoms with rule %s", len(atoms), delta_rule)
+        bindings = bottomup.join(
+            body, self._trigger_bindings(delta_rule.trigger, atoms),
+            self._relation)
+        bindings = [dict((var, compile.Term.create_from_python(value))
+                         for var, value in binding.items())
+                    for binding in bindings]
+        if delta_rule.trigger.is_negated():
+            insert_delete = not insert
+        else:
+            insert_delete = insert
+        self.process_new_bindings(bindings, delta_rule.head,
+                                  insert_delete, delta_rule.original)
+
+    @staticmethod
+    def _trigger_bindings(trigger, atoms):
+        """Return the bindings of the variables of TRIGGER to ATOMS."""
+        bindings = []
+        for atom in atoms:
+            if len(atom.arguments) != len(trigger.arguments):
+                continue
+            binding = {}
+            for arg, value in zip(trigger.arguments, atom.arguments):
+                if not arg.is_variable():
+                    if arg.name != value.name:
+                        break
+                elif binding.setdefault(arg, value.name) != value.name:
+                    break
+            else:
+                bindings.append(binding)
+        return bindings
+
+    @staticmethod
+    def _join_order(literals, bound):
+        """Return LITERALS in an order safe to join given BOUND variables.
+
+        Builtins and negated literals come as soon as their variables are
+        bound.  Returns None if LITERALS cannot be joined bottom-up.
+        """
+        bound = set(bound)
+        remaining = list(literals)
+        ordered = []
+        while remaining:
+            for lit in remaining:
+                if lit.table.modal is not None or lit.is_update():
+                    return None
+                if lit.is_builtin():
+                    built = builtin.builtin_registry.builtin(lit.table)
+                    if all(not arg.is_variable() or arg in bound
+                           for arg in lit.arguments[:built.num_inputs]):
+                        break
+                elif lit.is_negated() and lit.variables() <= bound:
+                    break
+            else:
+                lit = next((lit for lit in remaining
+                            if not lit.is_negated() and
+                            not lit.is_builtin()), None)
+                if lit is None:
+                    return None
+            remaining.remove(lit)
+            ordered.append(lit)
+            bound |= lit.variables()
+        return ordered
+
+    def _relation(self, lit):
+        """Return the collection of tuples of values of the table of LIT."""
+        service = lit.table.service
+        if (self.theories is not None and service is not None and
+                service != self.name):
+            theory = self.theories.get(service)
+            if theory is None:
+                return ()
+            return bottomup.theory_rows(theory, lit.table.table,
+                                        len(lit.arguments))
+        rows = self.database.data.get(lit.table.table, {})
+        if self.includes:
+            rows = set(rows)
+            for theory in self.includes:
+                rows |= set(bottomup.theory_rows(
+                    theory, lit.table.table, len(lit.arguments)))
+        return rows
 
     def propagate_rule(self, event, delta_rule):
         """Propagate event and delta_rule.
@@ -568,6 +738,9 @@ class MaterializedViewTheory(topdown.TopDownTheory):
         For each of BINDINGS, apply to ATOM, and enqueue it as an insert if
         INSERT is True and as a delete otherwise.
         """
+        if self.maintenance == self.COUNTING:
+            self._count_new_bindings(bindings, atom, insert)
+            return
         # for each binding, compute generated tuple and group bindings
         #    by the tuple they generated
         new_atoms = {}
@@ -590,6 +763,28 @@ class MaterializedViewTheory(topdown.TopDownTheory):
                          proofs=new_atoms[new_atom],
                          insert=insert))
 
+    def _count_new_bindings(self, bindings, atom, insert):
+        """Count the derivations of ATOM given by BINDINGS.
+
+        Adds them to the counts of the derived atoms if INSERT is True and
+        subtracts them otherwise, and enqueues an insert or delete for the
+        atoms whose count became or stopped being zero.
+        """
+        deltas = {}
+        for binding in set(frozenset(binding.items())
+                           for binding in bindings):
+            new_atom = atom.plug(dict(binding))
+            deltas[new_atom] = deltas.get(new_atom, 0) + 1
+        for new_atom, delta in deltas.items():
+            old = self.counts.get(new_atom, 0)
+            new = old + delta if insert else old - delta
+            if new > 0:
+                self.counts[new_atom] = new
+            else:
+                self.counts.pop(new_atom, None)
+            if (old > 0) != (new > 0):
+                self.enqueue(compile.Event(formula=new_atom, insert=insert))
+
     def is_view(self, x):
         """Return True if the table X is defined by the theory."""
         return self.delta_rules.is_view(x)
@@ -17,6 +17,8 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 
+import itertools
+
 from oslo_log import log as logging
 
 from congress.datalog import base
@@ -40,28 +42,72 @@ class RuleHandlingMixin(object):
         @facts must be an iterable containing compile.Fact objects.
         """
         LOG.info("initialize_tables")
-        cleared_tables = set(tablenames)
-        for t in tablenames:
-            self.rules.clear_table(t)
+        count = 0
+        changes = 0
+        for table, table_facts in self._group_facts(tablenames,
+                                                    facts).items():
+            added, removed = self.rules.initialize_table(table, table_facts)
+            count += len(self.rules.facts[table])
+            changes += len(added) + len(removed)
+            if self.schema:
+                # only the net change matters to the schema counts
+                net = len(added) - len(removed)
+                for f in itertools.islice(removed, max(-net, 0)):
+                    self.schema.update(f, False)
+                for f in itertools.islice(added, max(net, 0)):
+                    self.schema.update(f, True)
+        LOG.info("initialized %d tables with %d facts (%d changed)",
+                 len(set(tablenames)), count, changes)
 
+    def initialize_tables_events(self, tablenames, facts, max_events=None):
+        """Return the events initialize_tables() would make.
+
+        The events insert the facts of FACTS that are not in the theory
+        and delete the facts of TABLENAMES that are not in FACTS.  Returns
+        None if there are more than MAX_EVENTS of them.
+        """
+        differences = []
         count = 0
+        for table, table_facts in self._group_facts(tablenames,
+                                                    facts).items():
+            if table in self.rules.facts:
+                added, removed = self.rules.facts[table].difference(
+                    table_facts)
+            else:
+                added, removed = set(table_facts), ()
+            differences.append((table, added, removed))
+            count += len(added) + len(removed)
+            if max_events is not None and count > max_events:
+                return None
+        events = []
+        for table, added, removed in differences:
+            events.extend(
+                compile.Event(formula=compile.Literal.create_from_table_tuple(
+                    table, tuple(f)), insert=False, target=self.name)
+                for f in removed)
+            events.extend(
+                compile.Event(formula=compile.Literal.create_from_table_tuple(
+                    table, tuple(f)), insert=True, target=self.name)
+                for f in added)
+        return events
+
+    @staticmethod
+    def _group_facts(tablenames, facts):
+        """Group FACTS by table, ignoring those not in TABLENAMES."""
+        grouped = dict((t, []) for t in tablenames)
         extra_tables = set()
         ignored_facts = 0
         for f in facts:
-            if f.table not in cleared_tables:
+            if f.table in grouped:
+                grouped[f.table].append(f)
+            else:
                 extra_tables.add(f.table)
                 ignored_facts += 1
-            else:
-                self.rules.add_rule(f.table, f)
-                count += 1
-                if self.schema:
-                    self.schema.update(f, True)
         if ignored_facts > 0:
             LOG.error("initialize_tables ignored %d facts for tables "
                       "%s not included in the list of tablenames %s",
-                      ignored_facts, extra_tables, cleared_tables)
-        LOG.info("initialized %d tables with %d facts",
-                 len(cleared_tables), count)
+                      ignored_facts, extra_tables, set(tablenames))
+        return grouped
 
     def insert(self, rule):
         changes = self.update([compile.Event(formula=rule, insert=True)])
@@ -235,6 +281,14 @@ class RuleHandlingMixin(object):
                 results.extend(self.rules.get_rules(table))
         return results
 
+    def index_stats(self):
+        """Return the number of facts and index statistics for each table."""
+        return self.rules.index_stats()
+
+    def set_fact_storage(self, fact_storage):
+        """Store facts with the FactSet backend named FACT_STORAGE."""
+        self.rules.set_fact_storage(fact_storage)
+
 
 class NonrecursiveRuleTheory(RuleHandlingMixin, topdown.TopDownTheory):
     """A non-recursive collection of Rules."""
@@ -266,6 +320,23 @@ class NonrecursiveRuleTheory(RuleHandlingMixin, topdown.TopDownTheory):
             return self.rules.get_rules(table, match_literal)
         return []
 
+    def fact_index(self, table, match_literal=None):
+        return self.rules.get_facts(table, match_literal)
+
+    def rule_index(self, table, match_literal=None):
+        return self.rules.get_nonfact_rules(table)
+
+    def _delete_actual(self, rule):
+        """Delete RULE and return True if there was a change."""
+        self.join_plans.pop(rule, None)
+        return super(NonrecursiveRuleTheory, self)._delete_actual(rule)
+
+    def table_cardinality(self, table):
+        return self.rules.cardinality(table)
+
+    def table_indexes(self, table):
+        return self.rules.index_keys(table)
+
     def arity(self, table, modal=None):
         """Return the number of arguments TABLENAME takes.
 
@@ -382,6 +453,7 @@ class MultiModuleNonrecursiveRuleTheory(NonrecursiveRuleTheory):
         if compile.is_atom(rule):
             rule = compile.Rule(rule, [], rule.location)
         self.log(rule.head.table.table, "Delete: %s", rule)
+        self.join_plans.pop(rule, None)
         return self.rules.discard_rule(rule.head.table.table, rule)
 
     # def update_would_cause_errors(self, events):
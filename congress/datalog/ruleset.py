@@ -17,6 +17,8 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 
+import collections
+
 from congress.datalog import compile
 from congress.datalog import factset
 from congress.datalog import utility
@@ -34,13 +36,57 @@ class RuleSet(object):
     #
     #  An index_key looks like this: (p, (2, 'abc'), (4, 'def'))
 
-    def __init__(self):
+    # Maximum number of fact entries held by all the indexes of the RuleSet.
+    #   When creating an index exceeds it, the least recently used indexes
+    #   are dropped.  None means unbounded.
+    INDEX_BUDGET = 2000000
+    # An index is not built when a lookup on it is estimated to return
+    #   more than this fraction of the facts of its table...
+    MAX_INDEX_SELECTIVITY = 0.1
+    # ... unless the table has fewer facts than this.
+    MIN_FACTS_FOR_SELECTIVITY = 100
+
+    def __init__(self, index_budget=INDEX_BUDGET,
+                 max_index_selectivity=MAX_INDEX_SELECTIVITY,
+                 fact_storage='tuple'):
         self.rules = {}
         self.facts = {}
+        self.fact_storage = fact_storage
+        # shared by the ArrayFactSets of all the tables
+        self._interner = factset.ValueInterner()
+        self.index_budget = index_budget
+        self.max_index_selectivity = max_index_selectivity
+        # index names, least recently used first
+        self._index_lru = collections.OrderedDict()
+        # index name to the table size when the index was rejected
+        self._rejected_indexes = {}
 
     def __str__(self):
         return str(self.rules) + " " + str(self.facts)
 
+    def _new_factset(self):
+        if self.fact_storage == 'array':
+            return factset.ArrayFactSet(self._interner)
+        return factset.FactSet()
+
+    def set_fact_storage(self, fact_storage):
+        """Store facts with the FactSet backend named FACT_STORAGE.
+
+        Existing facts are moved to the new backend.
+        """
+        if fact_storage not in factset.FACTSET_BACKENDS:
+            raise ValueError("Unknown fact storage: %s" % fact_storage)
+        if fact_storage == self.fact_storage:
+            return
+        self.fact_storage = fact_storage
+        self._interner = factset.ValueInterner()
+        self._index_lru = collections.OrderedDict()
+        self._rejected_indexes = {}
+        for key, facts in self.facts.items():
+            self.facts[key] = self._new_factset()
+            for fact in facts:
+                self.facts[key].add(fact)
+
     def add_rule(self, key, rule):
         """Add a rule to the Ruleset
 
@@ -50,7 +96,7 @@ class RuleSet(object):
         if isinstance(rule, compile.Fact):
             # If the rule is a Fact, then add it to self.facts.
             if key not in self.facts:
-                self.facts[key] = factset.FactSet()
+                self.facts[key] = self._new_factset()
             return self.facts[key].add(rule)
 
         elif len(rule.body) == 0 and not rule.head.is_negated():
@@ -58,7 +104,7 @@ class RuleSet(object):
             # convert the Rule to a Fact to a Fact and add to self.facts.
             f = compile.Fact(key, (a.name for a in rule.head.arguments))
             if key not in self.facts:
-                self.facts[key] = factset.FactSet()
+                self.facts[key] = self._new_factset()
             return self.facts[key].add(f)
 
         else:
@@ -126,51 +172,147 @@ class RuleSet(object):
             return key in self.rules and rule in self.rules[key]
 
     def get_rules(self, key, match_literal=None):
-        facts = []
+        # Convert native tuples to Rule objects.  Top-down evaluation uses
+        # get_facts() and get_nonfact_rules() instead so that it can unify
+        # against the Facts natively.
+        fact_rules = []
+        for fact in self.get_facts(key, match_literal):
+            # Setting use_modules=False so we don't split up tablenames.
+            #   This allows us to choose at compile-time whether to split
+            #   the tablename up.
+            literal = compile.Literal(
+                key, [compile.Term.create_from_python(x) for x in fact],
+                use_modules=False)
+            fact_rules.append(compile.Rule(literal, ()))
+
+        return fact_rules + self.get_nonfact_rules(key)
+
+    def get_facts(self, key, match_literal=None):
+        """Return the Facts for KEY, without converting them to Rules.
 
-        if (match_literal and not match_literal.is_negated() and
-                key in self.facts):
+        If MATCH_LITERAL is given, only the Facts agreeing with its ground
+        arguments are returned, using an index on those columns.
+        """
+        if key not in self.facts:
+            return []
+
+        if match_literal and not match_literal.is_negated():
             # If the caller supplies a literal to match against, then use an
             # index to find the matching rules.
-            bound_arguments = tuple([i for i, arg
-                                     in enumerate(match_literal.arguments)
-                                     if not arg.is_variable()])
-            if (bound_arguments and
-                    not self.facts[key].has_index(bound_arguments)):
-                # The index does not exist, so create it.
-                self.facts[key].create_index(bound_arguments)
-
             partial_fact = tuple(
                 [(i, arg.name)
                  for i, arg in enumerate(match_literal.arguments)
                  if not arg.is_variable()])
-            facts = list(self.facts[key].find(partial_fact))
-        else:
-            # There is no usable match_literal, so get all facts for the
-            # table.
-            facts = list(self.facts.get(key, ()))
+            if partial_fact:
+                self._use_index(key, tuple([i for i, _ in partial_fact]))
+                return list(self.facts[key].find(partial_fact))
 
-        # Convert native tuples to Rule objects.
+        # There is no usable match_literal, so get all facts for the
+        # table.
+        return list(self.facts[key])
 
-        # TODO(alex): This is inefficient because it creates Literal and Rule
-        # objects.  It would be more efficient to change the TopDownTheory and
-        # unifier to handle Facts natively.
-        fact_rules = []
-        for fact in facts:
-            # Setting use_modules=False so we don't split up tablenames.
-            #   This allows us to choose at compile-time whether to split
-            #   the tablename up.
-            literal = compile.Literal(
-                key, [compile.Term.create_from_python(x) for x in fact],
-                use_modules=False)
-            fact_rules.append(compile.Rule(literal, ()))
+    def get_nonfact_rules(self, key):
+        """Return the Rules with a body or negated head for KEY."""
+        return list(self.rules.get(key, ()))
+
+    def _use_index(self, key, columns):
+        """Record a lookup of KEY on COLUMNS, creating the index if useful.
 
-        return fact_rules + list(self.rules.get(key, ()))
+        Creating an index may drop the least recently used indexes of the
+        RuleSet to stay within the index budget.
+        """
+        name = (key, columns)
+        facts = self.facts[key]
+        if facts.has_index(columns):
+            # mark as most recently used
+            self._index_lru.pop(name, None)
+            self._index_lru[name] = True
+            return
+        size = len(facts)
+        rejected_size = self._rejected_indexes.get(name)
+        if rejected_size is not None and size < 2 * rejected_size:
+            return
+        if (size >= self.MIN_FACTS_FOR_SELECTIVITY and
+                facts.estimate_selectivity(columns) >
+                self.max_index_selectivity):
+            self._rejected_indexes[name] = size
+            return
+        self._rejected_indexes.pop(name, None)
+        # The index does not exist, so create it.
+        facts.create_index(columns)
+        self._index_lru[name] = True
+        self._enforce_index_budget()
+
+    def _enforce_index_budget(self):
+        """Drop least recently used indexes until within the budget.
+
+        The most recently used index is always kept.
+        """
+        if self.index_budget is None:
+            return
+        live = [(name, len(self.facts[name[0]]))
+                for name in self._index_lru
+                if name[0] in self.facts and
+                self.facts[name[0]].has_index(name[1])]
+        self._index_lru = collections.OrderedDict(
+            (name, True) for name, _ in live)
+        total = sum(size for _, size in live)
+        for name, size in live[:-1]:
+            if total <= self.index_budget:
+                break
+            self.facts[name[0]].remove_index(name[1])
+            del self._index_lru[name]
+            total -= size
+
+    def cardinality(self, key):
+        """Return the number of facts for KEY or None if KEY has rules."""
+        if self.rules.get(key):
+            return None
+        if key in self.facts:
+            return len(self.facts[key])
+        return 0
+
+    def index_keys(self, key):
+        """Return a map from the indexed columns of KEY to #keys."""
+        if key not in self.facts:
+            return {}
+        return dict((columns, stats['keys']) for columns, stats
+                    in self.facts[key].index_stats().items())
+
+    def index_stats(self):
+        """Return the number of facts and index statistics for each table.
+
+        The result maps each table with facts to a dictionary with its
+        number of 'facts' and the 'indexes' on it, as returned by
+        FactSet.index_stats().
+        """
+        return dict((key, {'facts': len(facts),
+                           'indexes': facts.index_stats()})
+                    for key, facts in self.facts.items())
 
     def clear(self):
         self.rules = {}
         self.facts = {}
+        if self.fact_storage == 'array':
+            self._interner = factset.ValueInterner()
+        self._index_lru = collections.OrderedDict()
+        self._rejected_indexes = {}
 
     def clear_table(self, table):
         self.rules[table] = utility.OrderedSet()
-        self.facts[table] = factset.FactSet()
+        if self.fact_storage == 'array' and table in self.facts:
+            # release the interned values of the facts dropped
+            self.facts[table].replace([])
+        self.facts[table] = self._new_factset()
+
+    def initialize_table(self, table, facts):
+        """Replace the contents of TABLE with the Facts FACTS.
+
+        Unlike clear_table() followed by add_rule() for each fact, the
+        facts and existing indexes of TABLE are rebuilt in one pass.
+        Returns the pair of sets of the facts added and removed.
+        """
+        self.rules[table] = utility.OrderedSet()
+        if table not in self.facts:
+            self.facts[table] = self._new_factset()
+        return self.facts[table].replace(facts)
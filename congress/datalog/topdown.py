@@ -80,7 +80,7 @@ class TopDownTheory(base.Theory):
         """
 
         def __init__(self, variables, binding, theory,
-                     find_all=True, save=None):
+                     find_all=True, save=None, tables=None):
             # an iterable of variable objects
             self.variables = variables
             # a bi-unifier
@@ -97,6 +97,8 @@ class TopDownTheory(base.Theory):
             self.save = save
             # A variable used to store explanations as they are constructed
             self.support = []
+            # a TopDownTables for tabled evaluation or None
+            self.tables = tables
 
         def __str__(self):
             return (
@@ -106,6 +108,26 @@ class TopDownTheory(base.Theory):
                     str(self.find_all), utility.iterstr(self.results),
                     repr(self.save), utility.iterstr(self.support)))
 
+    class TopDownTables(object):
+        """Answers to the subgoals proven during one tabled evaluation.
+
+        ANSWERS maps the key of a subgoal to the list of tuples of values
+        of its true instances.  At most MAX_ANSWERS answers are kept.
+        """
+        def __init__(self, max_answers):
+            self.answers = {}
+            self.size = 0
+            self.max_answers = max_answers
+            self.hits = 0
+
+        def __str__(self):
+            return "TopDownTables<subgoals={}, size={}, hits={}>".format(
+                len(self.answers), self.size, self.hits)
+
+    # Maximum number of answers tabled evaluation keeps for one query.
+    #   Once reached, new subgoals are evaluated without tabling.
+    MAX_TABLED_ANSWERS = 100000
+
     #########################################
     # External interface
 
@@ -115,6 +137,12 @@ class TopDownTheory(base.Theory):
             name=name, abbr=abbr, theories=theories, schema=schema,
             desc=desc, owner=owner)
         self.includes = []
+        # map from rule to a dictionary from the argument positions of
+        #   the head bound when calling it to its join plan
+        self.join_plans = {}
+        # whether queries remember the answers to the subgoals on derived
+        #   tables instead of proving them again
+        self.tabling = False
 
     def select(self, query, find_all=True):
         """Return list of instances of QUERY that are true.
@@ -250,8 +278,12 @@ class TopDownTheory(base.Theory):
         """
         if binding is None:
             binding = self.new_bi_unifier()
+        tables = None
+        if self.tabling and save is None:
+            tables = self.TopDownTables(self.MAX_TABLED_ANSWERS)
         caller = self.TopDownCaller(variables, binding, self,
-                                    find_all=find_all, save=save)
+                                    find_all=find_all, save=save,
+                                    tables=tables)
         if len(literals) == 0:
             self._top_down_finish(None, caller)
         else:
@@ -305,7 +337,7 @@ class TopDownTheory(base.Theory):
                 self, context.depth + 1)
             new_caller = self.TopDownCaller(caller.variables, caller.binding,
                                             caller.theory, find_all=False,
-                                            save=None)
+                                            save=None, tables=caller.tables)
             # Make sure new_caller has find_all=False, so we stop as soon
             #    as we can.
             # Ensure save=None so that abduction does not save anything.
@@ -435,8 +467,98 @@ class TopDownTheory(base.Theory):
         the call was made and all the included theories.
         """
         # return self._top_down_th(context, caller)
+        # the tables of the caller reach theories that do not table
+        if (self.tabling and caller.tables is not None and
+                caller.save is None):
+            return self._top_down_tabled(context, caller)
         return self._top_down_includes(context, caller)
 
+    def _top_down_tabled(self, context, caller):
+        """Top-down evaluation reusing the answers to proven subgoals.
+
+        Subgoals on tables defined by rules are proven once per query for
+        each pattern of bound arguments; later calls unify with the
+        answers recorded in CALLER.tables.
+        """
+        lit = context.literals[context.literal_index]
+        # the literals of the query itself are only proven once
+        if (context.depth == 0 or lit.table.modal is not None or
+                lit.is_update() or not self._is_derived(lit.table.table)):
+            return self._top_down_includes(context, caller)
+        tables = caller.tables
+        plugged = lit.plug(context.binding)
+        key = self._subgoal_key(plugged)
+        answers = tables.answers.get(key)
+        if answers is not None:
+            tables.hits += 1
+        elif not caller.find_all:
+            # stopping at the first proof is cheaper than finding all
+            return self._top_down_includes(context, caller)
+        else:
+            answers = self._subgoal_answers(plugged, context, caller)
+            if answers is None:
+                return self._top_down_includes(context, caller)
+            if tables.size + len(answers) <= tables.max_answers:
+                tables.answers[key] = answers
+                tables.size += len(answers)
+        self._print_call(lit, context.binding, context.depth)
+        if self.tracer.is_traced(lit.tablename()):
+            self._print_note(lit, context.binding, context.depth,
+                             "Tabled %d answers" % len(answers))
+        for answer in answers:
+            undo = unify.bi_unify_fact(answer, lit, context.binding)
+            if undo is None:  # no unifier
+                continue
+            if self._top_down_finish(context, caller):
+                unify.undo_all(undo)
+                if not caller.find_all:
+                    return True
+            else:
+                unify.undo_all(undo)
+        self._print_fail(lit, context.binding, context.depth)
+        return False
+
+    def _is_derived(self, table):
+        """Return True if TABLE may have rows not stored as facts."""
+        return any(th.table_cardinality(table) is None
+                   for th in [self] + self.includes)
+
+    def _subgoal_key(self, plugged):
+        """Return the key of PLUGGED in the table of answers.
+
+        Literals equal up to the renaming of their variables have the
+        same key.  The tables are shared by the theories a query reaches,
+        so the key includes the name of this theory.
+        """
+        variables = {}
+        args = []
+        for arg in plugged.arguments:
+            if arg.is_object():
+                args.append(arg)
+            else:
+                args.append(variables.setdefault(arg.name, len(variables)))
+        return (self.name, plugged.table.table, tuple(args))
+
+    def _subgoal_answers(self, plugged, context, caller):
+        """Return the values of all the true instances of PLUGGED.
+
+        Returns None if some instance is not ground.
+        """
+        binding = self.new_bi_unifier()
+        new_caller = self.TopDownCaller(plugged.variables(), binding,
+                                        caller.theory, find_all=True,
+                                        save=None, tables=caller.tables)
+        new_context = self.TopDownContext(
+            [plugged], 0, binding, None, self, context.depth + 1)
+        self._top_down_includes(new_context, new_caller)
+        answers = []
+        for result in new_caller.results:
+            instance = plugged.plug(result.binding)
+            if not instance.is_ground():
+                return None
+            answers.append(tuple(arg.name for arg in instance.arguments))
+        return list(set(answers))
+
     def _top_down_includes(self, context, caller):
         """Top-down evaluation of all the theories included in this theory."""
         is_true = self._top_down_th(context, caller)
@@ -453,8 +575,22 @@ class TopDownTheory(base.Theory):
         # LOG.debug("%s._top_down_th(%s)", self.name, context)
         lit = context.literals[context.literal_index]
         self._print_call(lit, context.binding, context.depth)
-        for rule in self.head_index(lit.table.table,
-                                    lit.plug(context.binding)):
+        plugged = lit.plug(context.binding)
+        if lit.table.modal is None and lit.table.service in (None, self.name):
+            for fact in self.fact_index(lit.table.table, plugged):
+                if self.tracer.is_traced(lit.tablename()):
+                    self._print_note(lit, context.binding, context.depth,
+                                     "Trying %s" % (fact,))
+                undo = unify.bi_unify_fact(fact, lit, context.binding)
+                if undo is None:  # no unifier
+                    continue
+                if self._top_down_finish(context, caller):
+                    unify.undo_all(undo)
+                    if not caller.find_all:
+                        return True
+                else:
+                    unify.undo_all(undo)
+        for rule in self.rule_index(lit.table.table, plugged):
             unifier = self.new_bi_unifier()
             self._print_note(lit, context.binding, context.depth,
                              "Trying %s" % rule)
@@ -471,8 +607,13 @@ class TopDownTheory(base.Theory):
                 else:
                     unify.undo_all(undo)
             else:
+                if caller.save is None:
+                    body = self._join_plan(rule, plugged)
+                else:
+                    # keep the order of the support for abduction
+                    body = self.body(rule)
                 new_context = self.TopDownContext(
-                    rule.body, 0, unifier, context, self, context.depth + 1)
+                    body, 0, unifier, context, self, context.depth + 1)
                 if self._top_down_eval(new_context, caller):
                     unify.undo_all(undo)
                     if not caller.find_all:
@@ -522,6 +663,110 @@ class TopDownTheory(base.Theory):
                                  context.binding, context.depth)
             return finished
 
+    #########################################
+    # Join planning
+
+    # Fraction of the rows of a table assumed to match one bound column
+    #   when there is no index to tell.
+    DEFAULT_COLUMN_SELECTIVITY = 0.1
+    # A join plan is recomputed once the cardinality of one of its tables
+    #   is more than CARDINALITY_SHIFT_FACTOR times bigger or smaller than
+    #   when it was computed, and changed by more than CARDINALITY_SLACK.
+    CARDINALITY_SHIFT_FACTOR = 2
+    CARDINALITY_SLACK = 10
+
+    def _join_plan(self, rule, plugged):
+        """Return the body of RULE ordered for evaluation.
+
+        PLUGGED is the literal RULE's head was unified with.  Plans are
+        cached per rule and per set of bound head arguments, and recomputed
+        when the cardinalities of the tables they were based on shift.
+        """
+        body = self.body(rule)
+        plans = self.join_plans.get(rule)
+        if plans is None:
+            if len([lit for lit in body
+                    if not lit.is_negated() and not lit.is_builtin()]) < 2:
+                # nothing to reorder
+                self.join_plans[rule] = False
+                return body
+            plans = self.join_plans[rule] = {}
+        elif plans is False:
+            return body
+        bound = tuple(i for i, arg in enumerate(plugged.arguments)
+                      if arg.is_object())
+        cardinalities = self._literal_cardinalities(body)
+        plan = plans.get(bound)
+        if (plan is not None and not
+                self._cardinalities_shifted(plan[1], cardinalities)):
+            return plan[0]
+        head = self.head(rule)
+        bound_vars = [head.arguments[i].name for i in bound
+                      if head.arguments[i].is_variable()]
+        ordered = compile.reorder_for_cost(body, bound_vars,
+                                           self._estimate_rows)
+        plans[bound] = (ordered, cardinalities)
+        return ordered
+
+    def _literal_theory(self, lit):
+        """Return the theory that stores LIT's table or None if unclear."""
+        if lit.table.modal is not None:
+            return None
+        service = lit.table.service
+        if service is None or service == self.name:
+            theory = self
+        elif self.theories is not None:
+            theory = self.theories.get(service)
+        else:
+            return None
+        if not isinstance(theory, TopDownTheory) or theory.includes:
+            return None
+        return theory
+
+    def _literal_cardinalities(self, literals):
+        results = []
+        for lit in literals:
+            theory = self._literal_theory(lit)
+            if theory is not None and not lit.is_negated():
+                results.append(theory.table_cardinality(lit.table.table))
+        return results
+
+    def _cardinalities_shifted(self, old, new):
+        for old_card, new_card in zip(old, new):
+            if old_card is None or new_card is None:
+                if old_card != new_card:
+                    return True
+                continue
+            low, high = sorted((old_card, new_card))
+            if (high > self.CARDINALITY_SHIFT_FACTOR * low and
+                    high - low > self.CARDINALITY_SLACK):
+                return True
+        return False
+
+    def _estimate_rows(self, lit, bound_positions):
+        """Estimate the rows evaluating LIT returns or None if unknown.
+
+        BOUND_POSITIONS is the set of argument positions that are bound.
+        """
+        theory = self._literal_theory(lit)
+        if theory is None:
+            return None
+        cardinality = theory.table_cardinality(lit.table.table)
+        if cardinality is None:
+            return None
+        default = (cardinality *
+                   self.DEFAULT_COLUMN_SELECTIVITY ** len(bound_positions))
+        estimates = [
+            float(cardinality) / keys *
+            self.DEFAULT_COLUMN_SELECTIVITY ** (
+                len(bound_positions) - len(columns))
+            for columns, keys in theory.table_indexes(
+                lit.table.table).items()
+            if keys and bound_positions.issuperset(columns)]
+        if estimates:
+            return min(estimates)
+        return default
+
     def _print_call(self, literal, binding, depth):
         msg = "{}Call: %s".format("| " * depth)
         self.log(literal.tablename(), msg, literal.plug(binding))
@@ -571,6 +816,32 @@ class TopDownTheory(base.Theory):
         """
         raise NotImplementedError
 
+    def fact_index(self, table, match_literal=None):
+        """Return fact index.
+
+        This routine returns the native Facts for TABLE that top-down
+        evaluation unifies against directly, without building a Rule
+        for each of them.  Facts returned here must not also be returned
+        by rule_index().
+        """
+        return []
+
+    def rule_index(self, table, match_literal=None):
+        """Return the formulas for TABLE not returned by fact_index()."""
+        return self.head_index(table, match_literal)
+
+    def table_cardinality(self, table):
+        """Return the number of rows stored for TABLE.
+
+        Returns None when the rows of TABLE are not all stored, e.g. when
+        TABLE is defined by rules, or when the count is unknown.
+        """
+        return None
+
+    def table_indexes(self, table):
+        """Return a map from the indexed columns of TABLE to #keys."""
+        return {}
+
     def head(self, formula):
         """Given the output from head_index(), return the formula head.
 
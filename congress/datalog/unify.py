@@ -267,6 +267,31 @@ def bi_unify_lists(iter1, unifier1, iter2, unifier2):
             return None
     return changes
 
+
+def bi_unify_fact(fact, atom, unifier):
+    """Unify a Fact with an atom.
+
+    If possible, modify BiUnifier UNIFIER so that ATOM.plug(UNIFIER) has
+    exactly the values of the native tuple FACT as arguments.  Returns None
+    if not possible; otherwise, returns a list of changes to unifiers that
+    can be undone with undo-all.  Does not check the table of ATOM, and
+    only creates Terms for the values that end up bound to variables.
+    """
+    if len(fact) != len(atom.arguments):
+        return None
+    changes = []
+    for value, arg in zip(fact, atom.arguments):
+        val, binding = unifier.apply_full(arg)
+        if val.is_variable():
+            changes.append(binding.add(
+                val, compile.Term.create_from_python(value), None))
+        elif not (val.name == value and
+                  val.type == compile.ObjectConstant.type_of(value)):
+            undo_all(changes)
+            return None
+    return changes
+
+
 # def plug(atom, binding, withtable=False):
 #     """ Returns a tuple representing the arguments to ATOM after having
 #         applied BINDING to the variables in ATOM. """
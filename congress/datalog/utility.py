@@ -57,6 +57,14 @@ class Graph(object):
         self.edges = {}   # dict from node to list of nodes
         self.nodes = {}   # dict from node to info about node
         self._cycles = None
+        # dict from node to dict from source node to number of edges
+        self._sources = {}
+        # True if the graph has no cycles, False if it has one and None
+        #   if unknown.  While True, self._order maps each node to its
+        #   position in a topological order of the graph.
+        self._acyclic = True
+        self._order = {}
+        self._next_position = 0
 
     def __or__(self, other):
         # do this the simple way so that subclasses get this code for free
@@ -96,6 +104,10 @@ class Graph(object):
         """Add node VAL to graph."""
         if val not in self.nodes:  # preserve old node info
             self.nodes[val] = None
+            if self._acyclic:
+                # a node without edges can go last
+                self._order[val] = self._next_position
+                self._next_position += 1
             return True
         return False
 
@@ -103,9 +115,13 @@ class Graph(object):
         """Delete node VAL from graph and all edges."""
         try:
             del self.nodes[val]
-            del self.edges[val]
+            for edge in self.edges.pop(val):
+                self._delete_source(edge.node, val)
         except KeyError:
             assert val not in self.edges
+        self._order.pop(val, None)
+        if self._acyclic is False:
+            self._acyclic = None
 
     def add_edge(self, val1, val2, label=None):
         """Add edge from VAL1 to VAL2 with label LABEL to graph.
@@ -116,10 +132,16 @@ class Graph(object):
         self.add_node(val1)
         self.add_node(val2)
         val = self.edge_data(node=val2, label=label)
-        try:
-            self.edges[val1].add(val)
-        except KeyError:
-            self.edges[val1] = set([val])
+        if val1 not in self.edges:
+            self.edges[val1] = set()
+        elif val in self.edges[val1]:
+            return
+        self.edges[val1].add(val)
+        sources = self._sources.setdefault(val2, {})
+        sources[val1] = sources.get(val1, 0) + 1
+        if self._acyclic and not self._reorder(val1, val2):
+            self._acyclic = False
+            self._order = {}
 
     def delete_edge(self, val1, val2, label=None):
         """Delete edge from VAL1 to VAL2 with label LABEL.
@@ -133,6 +155,86 @@ class Graph(object):
             # KeyError either because val1 or edge
             return
         self._cycles = None
+        self._delete_source(val2, val1)
+        if self._acyclic is False:
+            self._acyclic = None
+
+    def _delete_source(self, node, source):
+        """Record the deletion of an edge from SOURCE to NODE."""
+        sources = self._sources[node]
+        sources[source] -= 1
+        if sources[source] == 0:
+            del sources[source]
+            if not sources:
+                del self._sources[node]
+
+    def _reorder(self, val1, val2):
+        """Restore the topological order after adding an edge.
+
+        Implements the algorithm of Pearce and Kelly: only the nodes
+        whose positions lie between those of VAL2 and VAL1 are visited.
+        Returns False, leaving the order unchanged, if the edge from VAL1
+        to VAL2 closes a cycle.
+        """
+        lower = self._order[val2]
+        upper = self._order[val1]
+        if lower > upper:
+            return True
+        if lower == upper:
+            return False
+        # nodes reachable from VAL2 that must move after VAL1
+        forward = set([val2])
+        stack = [val2]
+        while stack:
+            node = stack.pop()
+            for edge in self.edges.get(node, ()):
+                position = self._order.get(edge.node)
+                if position is None or edge.node in forward:
+                    continue
+                if position == upper:
+                    return False
+                if position < upper:
+                    forward.add(edge.node)
+                    stack.append(edge.node)
+        # nodes that reach VAL1 and must move before VAL2
+        backward = set([val1])
+        stack = [val1]
+        while stack:
+            node = stack.pop()
+            for source in self._sources.get(node, ()):
+                position = self._order.get(source)
+                if position is None or source in backward:
+                    continue
+                if position > lower:
+                    backward.add(source)
+                    stack.append(source)
+        key = self._order.__getitem__
+        nodes = sorted(backward, key=key) + sorted(forward, key=key)
+        positions = sorted(self._order[node] for node in nodes)
+        for node, position in zip(nodes, positions):
+            self._order[node] = position
+        return True
+
+    def _compute_order(self):
+        """Compute a topological order of the graph, if it has one."""
+        indegree = dict((node, 0) for node in self.nodes)
+        for node in self.edges:
+            for edge in self.edges[node]:
+                if edge.node in indegree:
+                    indegree[edge.node] += 1
+        ready = [node for node in indegree if indegree[node] == 0]
+        order = {}
+        while ready:
+            node = ready.pop()
+            order[node] = len(order)
+            for edge in self.edges.get(node, ()):
+                if edge.node in indegree:
+                    indegree[edge.node] -= 1
+                    if indegree[edge.node] == 0:
+                        ready.append(edge.node)
+        self._acyclic = len(order) == len(self.nodes)
+        self._order = order if self._acyclic else {}
+        self._next_position = len(order)
 
     def node_in(self, val):
         return val in self.nodes
@@ -239,21 +341,81 @@ class Graph(object):
     def has_cycle(self):
         """Checks if there are cycles.
 
-        Run depth_first_search only if it has not already been run.
+        The graph keeps a topological order up to date as edges are
+        added, until one of them closes a cycle, so this only traverses
+        the graph when edges were deleted from a graph with cycles.
         """
-        if self._cycles is None:
-            self._enumerate_cycles()
-        return len(self._cycles) > 0
+        if self._acyclic is None:
+            self._compute_order()
+        return not self._acyclic
 
     def cycles(self):
         """Return list of cycles. None indicates unknown. """
-        if self._cycles is None:
+        if not self.has_cycle():
+            return []
+        if not self._cycles:
             self._enumerate_cycles()
         cycles_list = []
         for cycle_graph in self._cycles:
             cycles_list.append(cycle_graph.list_repr())
         return cycles_list
 
+    def cycles_through_edges(self, edges):
+        """Return the nodes of the cycles through any of EDGES.
+
+        EDGES is a collection of (source, destination) pairs.  Returns a
+        list with the list of nodes of each strongly connected component
+        that contains one of EDGES.  Only visits the nodes reachable from
+        the destinations of EDGES, so if the graph had no cycles before
+        EDGES were added, it has cycles now iff the result is not empty.
+        """
+        index = {}       # dict from node to its DFS number
+        lowlink = {}     # dict from node to least DFS number it reaches
+        component = {}   # dict from node to the root of its component
+        members = {}     # dict from root to the nodes of its component
+        stack = []
+        on_stack = set()
+        for root in set(dst for src, dst in edges):
+            if root in index or root not in self.nodes:
+                continue
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self.edges.get(root, ())))]
+            while work:
+                node, children = work[-1]
+                for edge in children:
+                    child = edge.node
+                    if child not in index:
+                        index[child] = lowlink[child] = len(index)
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self.edges.get(child, ()))))
+                        break
+                    elif child in on_stack:
+                        lowlink[node] = min(lowlink[node], index[child])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index[node]:
+                        nodes = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component[member] = node
+                            nodes.append(member)
+                            if member == node:
+                                break
+                        members[node] = nodes
+        cycles = {}
+        for src, dst in edges:
+            root = component.get(dst)
+            if root is not None and component.get(src) == root:
+                cycles[root] = members[root]
+        return list(cycles.values())
+
     def dependencies(self, node):
         """Returns collection of node names reachable from NODE.
 
@@ -285,19 +447,6 @@ class Graph(object):
         s += "}"
         return s
 
-    def _inverted_edge_graph(self):
-        """create a shallow copy of self with the edges inverted"""
-        newGraph = Graph()
-        newGraph.nodes = self.nodes
-        for source_node in self.edges:
-            for edge in self.edges[source_node]:
-                try:
-                    newGraph.edges[edge.node].add(Graph.edge_data(source_node))
-                except KeyError:
-                    newGraph.edges[edge.node] = set(
-                        [Graph.edge_data(source_node)])
-        return newGraph
-
     def find_dependent_nodes(self, nodes):
         """Return all nodes dependent on @nodes.
 
@@ -306,9 +455,19 @@ class Graph(object):
         and S is dependent on R.
 
         Note that node T is dependent on node T even if T is not in the graph
+
+        Walks the sources of the edges kept up to date by add_edge, so only
+        the dependent nodes and their edges are visited.
         """
-        return (self._inverted_edge_graph().find_reachable_nodes(nodes)
-                | set(nodes))
+        result = set(nodes)
+        stack = [node for node in result if node in self.nodes]
+        while stack:
+            node = stack.pop()
+            for source in self._sources.get(node, ()):
+                if source not in result:
+                    result.add(source)
+                    stack.append(source)
+        return result
 
     def find_reachable_nodes(self, roots):
         """Return all nodes reachable from @roots."""
@@ -99,6 +99,7 @@ class ValidatorDriver(datasource_driver.PollingDataSourceDriver):
             'Datasource driver that allows OS configs retrieval.')
         result['config'] = {
             'poll_time': constants.OPTIONAL,
+            'poll_concurrency': constants.OPTIONAL,
             'lazy_tables': constants.OPTIONAL}
         return result
 
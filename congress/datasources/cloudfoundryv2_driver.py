@@ -137,6 +137,7 @@ class CloudFoundryV2Driver(datasource_driver.PollingDataSourceDriver,
         result['config'] = {'username': constants.REQUIRED,
                             'password': constants.REQUIRED,
                             'poll_time': constants.OPTIONAL,
+                            'poll_concurrency': constants.OPTIONAL,
                             'auth_url': constants.REQUIRED}
         result['secret'] = ['password']
         return result
@@ -28,6 +28,7 @@ import json
 import time
 
 import eventlet
+from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import strutils
 import six
@@ -42,6 +43,29 @@ from congress import utils
 
 LOG = logging.getLogger(__name__)
 
+# the types of values that compiled translators know are hashable, and
+#   whose lists of values _compute_hash caches the ids of
+_HASHABLE_TYPES = frozenset(
+    (str, six.text_type, float, bool, type(None)) + six.integer_types)
+
+# the ids computed by _compute_hash, keyed by the values hashed and their
+#   types, since for instance 1 == 1.0 == True hash to different ids
+_hash_cache = {}
+# the number of ids cached, beyond which the cache is emptied
+HASH_CACHE_SIZE = 100000
+
+# str(type(x)) for the types of the values hashed so far
+_type_names = {}
+
+
+def _hash_sort_key(x):
+    t = type(x)
+    try:
+        return _type_names[t] + repr(x)
+    except KeyError:
+        _type_names[t] = str(t)
+        return _type_names[t] + repr(x)
+
 
 class DataSourceDriver(data_service.DataService):
     """A super-class for datasource drivers.
@@ -295,6 +319,11 @@ class DataSourceDriver(data_service.DataService):
 
     TRANSLATORS = []
 
+    # compiled translators, see compile_translator
+    # key: id of the translator
+    # value: (translator, function converting objects)
+    _compiled_translators = {}
+
     def __init__(self, name='', args=None):
         self.name = name
         self.type = 'datasource_driver'
@@ -467,6 +496,7 @@ class DataSourceDriver(data_service.DataService):
         if self.TABLE_NAME in translator:
             self._table_deps[translator[self.TABLE_NAME]] = related_tables
         self._validate_translator(translator, related_tables)
+        self.compile_translator(translator)
         self._translators.append(translator)
         self._schema.update(self._get_schema(translator, {}).schema)
 
@@ -781,18 +811,34 @@ class DataSourceDriver(data_service.DataService):
 
     @classmethod
     def _compute_hash(cls, obj):
-        # This might turn out to be expensive.
-
         # The datasource can contain a list which has an order, but
         # Congress uses unordered sets internally for its tables which
         # throw away a list's order.  Since Congress throws away the
         # order, this hash function needs to reimpose an order (by
         # sorting) to ensure that two invocations of the hash function
         # will always return the same result.
-        s = json.dumps(sorted(obj, key=(lambda x: str(type(x)) + repr(x))),
-                       sort_keys=True)
-        h = hashlib.md5(s.encode('ascii')).hexdigest()
-        return h
+        #
+        # The ids are digests of the JSON encoding of the sorted values,
+        # so they are the same in every process.  Since the same values
+        # are hashed again at every poll, the ids of lists of plain values
+        # are cached.
+        values = tuple(obj)
+        types = tuple(map(type, values))
+        if _HASHABLE_TYPES.issuperset(types):
+            key = (values, types)
+            h = _hash_cache.get(key)
+            if h is None:
+                h = cls._digest(values)
+                if len(_hash_cache) >= HASH_CACHE_SIZE:
+                    _hash_cache.clear()
+                _hash_cache[key] = h
+            return h
+        return cls._digest(values)
+
+    @classmethod
+    def _digest(cls, values):
+        s = json.dumps(sorted(values, key=_hash_sort_key), sort_keys=True)
+        return hashlib.md5(s.encode('ascii')).hexdigest()
 
     @classmethod
     def _extract_value(cls, obj, extract_fn, data_type, nullable=True):
@@ -1087,6 +1133,315 @@ class DataSourceDriver(data_service.DataService):
             new_results.extend(rows)
         return new_results, last_hash_val
 
+    @classmethod
+    def compile_translator(cls, translator):
+        """Return a function that converts objects using translator.
+
+        The function takes an object and an optional parent row dict, and
+        returns the same as convert_obj(obj, translator, parent_row_dict).
+        It looks up the parameters of the translator and its subtranslators
+        once, instead of for every object converted.  Compiled translators
+        are cached, so translators must not change once compiled.
+        """
+        entry = DataSourceDriver._compiled_translators.get(id(translator))
+        if entry is not None and entry[0] is translator:
+            return entry[1]
+        try:
+            populate = cls._compile_translator(translator)
+        except Exception:
+            # invalid translators fail when converting objects instead
+            populate = None
+        if populate is None:
+            # the translators not compiled are interpreted
+            def convert(obj, parent_row_dict=None):
+                return cls.convert_obj(obj, translator, parent_row_dict)
+        else:
+            def convert(obj, parent_row_dict=None):
+                if obj is None:
+                    return None, None
+                return populate(obj, parent_row_dict)
+        # keep the translator alive so that its id is not reused
+        DataSourceDriver._compiled_translators[id(translator)] = (
+            translator, convert)
+        return convert
+
+    @classmethod
+    def _compile_translator(cls, translator):
+        """Return a function that populates rows like convert_obj.
+
+        The function takes an object that is not None and a parent row
+        dict.  Returns None for the translators that are not compiled.
+        """
+        translation_type = translator[cls.TRANSLATION_TYPE]
+        if translation_type == cls.HDICT:
+            return cls._compile_hdict(translator)
+        elif translation_type == cls.VDICT:
+            return cls._compile_vdict(translator)
+        elif translation_type == cls.LIST:
+            return cls._compile_list(translator)
+
+    @classmethod
+    def _compile_value(cls, translator):
+        """Return a function that extracts values like _extract_value."""
+        extract_fn = translator.get(cls.EXTRACT_FN)
+        data_type = translator.get(cls.DATA_TYPE)
+        hashable = collections.Hashable
+
+        if extract_fn is None and data_type is None:
+            def extract(obj):
+                if (type(obj) in _HASHABLE_TYPES or
+                        isinstance(obj, hashable)):
+                    return obj
+                return str(obj)
+            return extract
+
+        def extract(obj):
+            value = obj if extract_fn is None else extract_fn(obj)
+            if (type(value) not in _HASHABLE_TYPES and
+                    not isinstance(value, hashable)):
+                value = str(value)
+            if data_type is not None and value is not None:
+                try:
+                    value = data_type.marshal(value)
+                except ValueError:
+                    LOG.exception('Type error.')
+            return value
+        return extract
+
+    @classmethod
+    def _compile_subtranslator(cls, translator):
+        """Return the parts of a non-VALUE subtranslator convert uses.
+
+        Returns the compiled subtranslator, its objects-extract-fn and the
+        id of its empty object, or None if it has no id-col.
+        """
+        empty_hash = None
+        if cls.ID_COL in translator:
+            empty_hash = cls._compute_hash([])
+        return (cls.compile_translator(translator),
+                translator.get(cls.OBJECTS_EXTRACT_FN), empty_hash)
+
+    @classmethod
+    def _compile_list(cls, translator):
+        table = translator[cls.TABLE_NAME]
+        parent_key = translator.get(cls.PARENT_KEY, None)
+        id_col = translator.get(cls.ID_COL, None)
+        subtrans = translator[cls.TRANSLATOR]
+        compute_id = cls._compute_id
+
+        if subtrans[cls.TRANSLATION_TYPE] == cls.VALUE:
+            extract = cls._compile_value(subtrans)
+
+            def populate(obj, parent_row_dict):
+                converted_values = tuple([extract(o) for o in obj])
+                if id_col:
+                    h = compute_id(id_col, obj, converted_values)
+                    return [(table, (h, v)) for v in converted_values], h
+                elif parent_key:
+                    parent_key_value = parent_row_dict[parent_key]
+                    return [(table, (parent_key_value, v))
+                            for v in converted_values], None
+                return [(table, (v,)) for v in converted_values], None
+            return populate
+
+        if not cls.need_column_for_subtable_id(subtrans):
+            # convert_obj fails on the objects of such lists
+            return
+        convert, objects_extract_fn, empty_hash = (
+            cls._compile_subtranslator(subtrans))
+
+        def populate(obj, parent_row_dict):
+            new_tuples = []
+            row_hashes = []
+            o = None
+            for o in obj:
+                if o is None:
+                    row_hash = empty_hash
+                else:
+                    if objects_extract_fn is not None:
+                        o = objects_extract_fn(o)
+                    tuples, row_hash = convert(o)
+                    if tuples:
+                        new_tuples.extend(tuples)
+                assert row_hash, "LIST's subtranslator must have row_hash"
+                row_hashes.append(row_hash)
+
+            h = None
+            if id_col:
+                if not row_hashes:
+                    # convert_obj fails to compute the id of empty lists
+                    return cls._populate_translator_data_list(
+                        translator, obj, parent_row_dict)
+                h = compute_id(id_col, o, row_hashes)
+                new_tuples.extend((table, (h, row_hash))
+                                  for row_hash in row_hashes)
+            elif parent_key:
+                parent_key_value = parent_row_dict[parent_key]
+                new_tuples.extend((table, (parent_key_value, row_hash))
+                                  for row_hash in row_hashes)
+            else:
+                new_tuples.extend((table, (row_hash,))
+                                  for row_hash in row_hashes)
+            return new_tuples, h
+        return populate
+
+    @classmethod
+    def _compile_vdict(cls, translator):
+        table = translator[cls.TABLE_NAME]
+        parent_key = translator.get(cls.PARENT_KEY, None)
+        id_col = translator.get(cls.ID_COL, None)
+        key_col = translator[cls.KEY_COL]
+        subtrans = translator[cls.TRANSLATOR]
+        compute_id = cls._compute_id
+
+        if subtrans[cls.TRANSLATION_TYPE] == cls.VALUE:
+            extract = cls._compile_value(subtrans)
+
+            def populate(obj, parent_row_dict):
+                converted_items = tuple(
+                    [(k, extract(v)) for k, v in obj.items()])
+                if id_col:
+                    h = compute_id(id_col, obj, converted_items)
+                    return [(table, (h,) + i) for i in converted_items], h
+                elif parent_key:
+                    parent_key_value = parent_row_dict[parent_key]
+                    return [(table, (parent_key_value,) + i)
+                            for i in converted_items], None
+                return [(table, i) for i in converted_items], None
+            return populate
+
+        need_column = cls.need_column_for_subtable_id(subtrans)
+        convert, objects_extract_fn, empty_hash = (
+            cls._compile_subtranslator(subtrans))
+
+        def populate(obj, parent_row_dict):
+            new_tuples = []
+            vdict_rows = []
+            for k, v in obj.items():
+                if v is None:
+                    row_hash = empty_hash
+                else:
+                    if objects_extract_fn is not None:
+                        v = objects_extract_fn(v)
+                    tuples, row_hash = convert(v, {key_col: k})
+                    if tuples:
+                        new_tuples.extend(tuples)
+                if need_column:
+                    vdict_rows.append((k, row_hash))
+                else:
+                    vdict_rows.append((k,))
+
+            h = None
+            if id_col:
+                h = compute_id(id_col, obj, vdict_rows)
+                new_tuples.extend((table, (h,) + vdict_row)
+                                  for vdict_row in vdict_rows)
+            elif parent_key:
+                k = parent_row_dict[parent_key]
+                new_tuples.extend((table, (k,) + vdict_row)
+                                  for vdict_row in vdict_rows)
+            else:
+                new_tuples.extend((table, vdict_row)
+                                  for vdict_row in vdict_rows)
+            return new_tuples, h
+        return populate
+
+    @classmethod
+    def _compile_hdict(cls, translator):
+        table = translator[cls.TABLE_NAME]
+        selector = translator[cls.SELECTOR_TYPE]
+        field_translators = translator[cls.FIELD_TRANSLATORS]
+        parent_key = translator.get(cls.PARENT_KEY)
+        parent_col_name = translator.get(cls.PARENT_COL_NAME,
+                                         cls.PARENT_KEY_COL_NAME)
+        id_col = translator.get(cls.ID_COL)
+        compute_id = cls._compute_id
+        if selector == cls.DOT_SELECTOR:
+            def get_value(o, field):
+                if hasattr(o, field):
+                    return getattr(o, field)
+        elif selector == cls.DICT_SELECTOR:
+            def get_value(o, field):
+                if field in o:
+                    return o[field]
+        else:
+            return
+
+        # (field, column, extract, convert, objects_extract_fn, empty_hash,
+        #  need_column) with the fields lacking parent-key first, as in
+        #  _populate_hdict
+        fields = []
+        for field_translator in sorted(
+                field_translators,
+                key=cmp_to_key(cls._compare_subtranslator)):
+            field = field_translator[cls.FIELDNAME]
+            col_name = field_translator.get(cls.COL, field)
+            subtranslator = field_translator[cls.TRANSLATOR]
+            if subtranslator[cls.TRANSLATION_TYPE] == cls.VALUE:
+                fields.append((field, col_name,
+                               cls._compile_value(subtranslator),
+                               None, None, None, False))
+            else:
+                fields.append(
+                    (field, col_name, None) +
+                    cls._compile_subtranslator(subtranslator) +
+                    (cls.need_column_for_subtable_id(subtranslator),))
+        columns = [field_translator.get(cls.COL,
+                                        field_translator[cls.FIELDNAME])
+                   for field_translator in field_translators]
+
+        def populate_hdict(obj, parent_row_dict):
+            new_results = []
+            hdict_row = {}
+            if parent_row_dict and parent_key:
+                hdict_row[parent_col_name] = parent_row_dict[parent_key]
+            for (field, col_name, extract, convert, objects_extract_fn,
+                 empty_hash, need_column) in fields:
+                if extract is not None:
+                    try:
+                        hdict_row[col_name] = extract(get_value(obj, field))
+                    except TypeError as exc:
+                        arg0 = "While translating field: %s, column: %s; " \
+                               "%s" % (field, col_name, exc.args[0])
+                        exc.args = tuple([arg0]) + exc.args[1:]
+                        raise
+                    continue
+                v = get_value(obj, field)
+                if v is None:
+                    row_hash = empty_hash
+                else:
+                    if objects_extract_fn is not None:
+                        v = objects_extract_fn(v)
+                    tuples, row_hash = convert(v, hdict_row)
+                    new_results.extend(tuples)
+                if need_column:
+                    hdict_row[col_name] = row_hash
+
+            new_row = [hdict_row[col] for col in columns if col in hdict_row]
+            if id_col:
+                h = compute_id(id_col, obj, new_row)
+                new_row = (h,) + tuple(new_row)
+            elif parent_key:
+                h = None
+                new_row = (hdict_row[parent_col_name],) + tuple(new_row)
+            else:
+                h = None
+                new_row = tuple(new_row)
+            new_results.append((table, new_row))
+            return new_results, h
+
+        if not translator.get(cls.IN_LIST, False):
+            return populate_hdict
+
+        def populate(obj, parent_row_dict):
+            new_results = []
+            last_hash_val = None
+            for val in obj:
+                rows, last_hash_val = populate_hdict(val, parent_row_dict)
+                new_results.extend(rows)
+            return new_results, last_hash_val
+        return populate
+
     @classmethod
     def convert_obj(cls, obj, translator, parent_row_dict=None):
         """Convert obj using translator.
@@ -1132,8 +1487,9 @@ class DataSourceDriver(data_service.DataService):
         else:
             obj_list = objects
 
+        convert = cls.compile_translator(translator)
         for o in obj_list:
-            rows, _ = DataSourceDriver.convert_obj(o, translator)
+            rows, _ = convert(o)
             results.extend(rows)
         return results
 
@@ -1227,6 +1583,8 @@ class PushedDataSourceDriver(DataSourceDriver):
 
     def __init__(self, name='', args=None):
         self.persist_data = False
+        # the rows of each table last written to the DB
+        self._persisted_state = {}
         super(PushedDataSourceDriver, self).__init__(name, args)
 
         # For DSE2.  Must go after __init__
@@ -1254,10 +1612,36 @@ class PushedDataSourceDriver(DataSourceDriver):
     # Note (thread-safety): blocking function
     def _restore_persisted_data(self):
         self.state = {}
+        # tables persisted before rows were persisted one by one
+        # Note (thread-safety): blocking call
+        db_ds_table_data.migrate_ds_table_data(self.ds_id)
         # Note (thread-safety): blocking call
-        data = db_ds_table_data.get_ds_table_data(self.ds_id)
-        for table in data:
-            self.state[table['tablename']] = table['tabledata']
+        for tablename, row in db_ds_table_data.get_ds_table_rows(self.ds_id):
+            if tablename not in self.state:
+                self.state[tablename] = set()
+            self.state[tablename].add(row)
+        self._persisted_state = dict(
+            (tablename, set(rows)) for tablename, rows in self.state.items())
+
+    # Note (thread-safety): blocking function
+    def _persist_tables(self, tablenames):
+        """Write to the DB the rows of TABLENAMES changed since last time.
+
+        Compares each table with the rows last persisted rather than with
+        prior_state, since webhook handlers may change tables in place.
+        """
+        if self.ds_id is None:
+            raise Exception('Push-type datasource driver does not have ID')
+        for tablename in tablenames:
+            rows = self.state.get(tablename, set())
+            persisted = self._persisted_state.get(tablename, set())
+            to_add = rows - persisted
+            to_del = persisted - rows
+            if to_add or to_del:
+                # Note (thread-safety): blocking call
+                db_ds_table_data.update_ds_table_rows(
+                    self.ds_id, tablename, to_add, to_del)
+            self._persisted_state[tablename] = set(rows)
 
     # Note (thread-safety): blocking function
     def replace_entire_table_data(self, table_id, objs):
@@ -1276,12 +1660,8 @@ class PushedDataSourceDriver(DataSourceDriver):
 
         # persist in DB
         if self.persist_data:
-            if self.ds_id is not None:
-                # Note (thread-safety): blocking call
-                db_ds_table_data.store_ds_table_data(
-                    self.ds_id, tablename, self.state[tablename])
-            else:
-                raise Exception('Push-type datasource driver does not have ID')
+            # Note (thread-safety): blocking call
+            self._persist_tables(self._table_deps.get(tablename, [tablename]))
 
     # Note (thread-safety): blocking function
     def process_webhook_notification(self, payload):
@@ -1293,14 +1673,8 @@ class PushedDataSourceDriver(DataSourceDriver):
 
         # persist in DB
         if self.persist_data:
-            for tablename in updated_tables:
-                if self.ds_id is not None:
-                    # Note (thread-safety): blocking call
-                    db_ds_table_data.store_ds_table_data(
-                        self.ds_id, tablename, self.state[tablename])
-                else:
-                    raise Exception(
-                        'Push-type datasource driver does not have ID')
+            # Note (thread-safety): blocking call
+            self._persist_tables(updated_tables)
 
 
 class PushedDataSourceDriverEndpoints(data_service.DataServiceEndPoints):
@@ -1330,6 +1704,11 @@ class PollingDataSourceDriver(DataSourceDriver):
 
         self.poll_time = poll_time
 
+        if 'poll_concurrency' in args:
+            self.poll_concurrency = int(args['poll_concurrency'])
+        else:
+            self.poll_concurrency = cfg.CONF.datasource_poll_concurrency
+
         self.lazy_tables = args.get('lazy_tables', [])
         self.validate_lazy_tables()
 
@@ -1339,6 +1718,13 @@ class PollingDataSourceDriver(DataSourceDriver):
         # ex: {'servers': <pointer for the updating method>}
         self.update_methods = {}
 
+        # with adaptive polling, each root table is polled every
+        #   table_poll_times[table] seconds, which grows while the table
+        #   does not change and shrinks while it does
+        self.adaptive_polling = cfg.CONF.adaptive_polling
+        self.table_poll_times = {}
+        self._next_table_polls = {}
+
         self.refresh_request_queue = eventlet.Queue(maxsize=1)
         self.worker_greenthread = None
 
@@ -1432,24 +1818,71 @@ class PollingDataSourceDriver(DataSourceDriver):
     def get_last_updated_time(self):
         return self.last_updated_time
 
-    def update_from_datasource(self):
-        for registered_table in self._table_deps:
-            LOG.debug('update table %s.' % registered_table)
-            self.update_methods[registered_table]()
+    def update_from_datasource(self, tables=None):
+        """Update the root TABLES, all the registered ones by default."""
+        # copy the tables, which get_snapshot may register meanwhile
+        tables = list(self._table_deps if tables is None else tables)
+        if self.poll_concurrency <= 1 or len(tables) <= 1:
+            for registered_table in tables:
+                self._update_table(registered_table)
+            return
+        # Note(thread-safety): update methods spend most of their time
+        #   waiting on the datasource, so up to poll_concurrency of them run
+        #   at once, each in a greenthread of its own.  An update method
+        #   translates its data and stores the rows of its tables in
+        #   self.state without yielding, so updates of different tables
+        #   never see each other half done.
+        pool = eventlet.GreenPool(self.poll_concurrency)
+        threads = []
+        error = None
+        try:
+            for registered_table in tables:
+                # Note(thread-safety): blocking call
+                threads.append((registered_table,
+                                pool.spawn(self._update_table,
+                                           registered_table)))
+            for registered_table, thread in threads:
+                try:
+                    # Note(thread-safety): blocking call
+                    thread.wait()
+                except Exception as e:
+                    if error is None:
+                        error = e
+                    else:
+                        LOG.exception("%s:: failed to update table %s",
+                                      self.name, registered_table)
+        finally:
+            # stop the updates left if the poll itself is killed
+            for registered_table, thread in threads:
+                thread.kill()
+        if error is not None:
+            raise error
+
+    def _update_table(self, registered_table):
+        LOG.debug('update table %s.' % registered_table)
+        self.update_methods[registered_table]()
 
     # Note(thread-safety): blocking function
-    def poll(self):
+    def poll(self, tables=None):
         """Periodically called to update new info.
 
         Function called periodically to grab new information, compute
         deltas, and publish those deltas.
+
+        :param tables: the root tables to poll, all of them by default.
         """
         LOG.info("%s:: polling", self.name)
         self.prior_state = dict(self.state)  # copying self.state
         self.last_error = None  # non-None only when last poll errored
         try:
-            self.update_from_datasource()  # sets self.state
-            tablenames = set(self.state.keys()) | set(self.prior_state.keys())
+            if tables is None:
+                self.update_from_datasource()  # sets self.state
+                tablenames = (set(self.state.keys()) |
+                              set(self.prior_state.keys()))
+            else:
+                self.update_from_datasource(tables)
+                tablenames = set(table for root in tables
+                                 for table in self._table_deps.get(root, []))
             for tablename in tablenames:
                 # publishing full table and using differential processing in
                 #   data_service to send
@@ -1467,10 +1900,65 @@ class PollingDataSourceDriver(DataSourceDriver):
             self.last_error = e
             LOG.exception("Datasource driver raised exception")
 
+        if self.adaptive_polling:
+            self._schedule_table_polls(
+                self._table_deps if tables is None else tables)
         self.last_updated_time = datetime.datetime.now()
         self.number_of_updates += 1
         LOG.info("%s:: finished polling", self.name)
 
+    def _schedule_table_polls(self, tables):
+        """Schedule the next polls of the root TABLES just polled.
+
+        The poll time of a table is halved if the poll changed any of its
+        tables, and doubled otherwise, within the bounds set by the
+        adaptive_poll_min_factor and adaptive_poll_max_factor options.
+        Poll times are kept as they are after a failed poll.
+        """
+        min_time = self.poll_time * cfg.CONF.adaptive_poll_min_factor
+        max_time = self.poll_time * cfg.CONF.adaptive_poll_max_factor
+        now = time.time()
+        for root in list(tables):
+            poll_time = self.table_poll_times.get(root, self.poll_time)
+            if self.last_error is None:
+                changed = any(
+                    self.state.get(table) is not self.prior_state.get(table)
+                    and self.state.get(table) != self.prior_state.get(table)
+                    for table in self._table_deps.get(root, []))
+                if changed:
+                    poll_time = max(min_time, poll_time / 2.0)
+                else:
+                    poll_time = min(max_time, poll_time * 2.0)
+            self.table_poll_times[root] = poll_time
+            self._next_table_polls[root] = now + poll_time
+
+    def _polls_tables_adaptively(self):
+        # drivers that update their tables without update methods are
+        #   always polled as a whole
+        return (self.adaptive_polling and
+                any(table in self.update_methods
+                    for table in self._table_deps))
+
+    # Note(thread-safety): blocking function
+    def _poll_due_tables(self):
+        """Poll the tables whose next poll is due, or all on request."""
+        now = time.time()
+        due = min(self._next_table_polls.get(table, now)
+                  for table in self._table_deps)
+        if due > now:
+            try:
+                with eventlet.Timeout(due - now):
+                    # Note(thread-safety): blocking call
+                    self.block_unless_refresh_requested()
+                return
+            except eventlet.Timeout:
+                now = time.time()
+        tables = [table for table in self._table_deps
+                  if self._next_table_polls.get(table, now) <= now]
+        if tables:
+            # Note(thread-safety): blocking call
+            self.poll(tables)
+
     # Note(thread-safety): blocking function
     def request_refresh(self):
         """Request a refresh of this service's data."""
@@ -1494,7 +1982,8 @@ class PollingDataSourceDriver(DataSourceDriver):
         """Entrypoint for the datasource driver's poller greenthread.
 
         Triggers polling every *poll_time* seconds or after *request_refresh*
-        is called.
+        is called.  With adaptive polling, each table is polled on a
+        schedule of its own, starting every *poll_time* seconds.
 
         :param poll_time: is the amount of time (in seconds) to wait between
             polling rounds.
@@ -1505,6 +1994,9 @@ class PollingDataSourceDriver(DataSourceDriver):
                 if self.last_updated_time is None:
                     # Note(thread-safety): blocking call
                     self.poll()
+                elif self._polls_tables_adaptively():
+                    # Note(thread-safety): blocking call
+                    self._poll_due_tables()
                 else:
                     try:
                         with eventlet.Timeout(poll_time):
@@ -39,7 +39,8 @@ def get_openstack_required_config():
             'project_domain_name': constants.OPTIONAL,
             'tenant_name': constants.OPTIONAL,
             'project_name': constants.REQUIRED,
-            'poll_time': constants.OPTIONAL}
+            'poll_time': constants.OPTIONAL,
+            'poll_concurrency': constants.OPTIONAL}
 
 
 def update_state_on_changed(root_table_name):
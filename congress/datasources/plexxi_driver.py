@@ -103,6 +103,7 @@ class PlexxiDriver(datasource_driver.PollingDataSourceDriver,
                             'username': constants.REQUIRED,
                             'password': constants.REQUIRED,
                             'poll_time': constants.OPTIONAL,
+                            'poll_concurrency': constants.OPTIONAL,
                             'tenant_name': constants.REQUIRED,
                             'unique_names': constants.OPTIONAL,
                             'keystone_pass': constants.OPTIONAL,
@@ -139,6 +139,7 @@ class VCenterDriver(datasource_driver.PollingDataSourceDriver,
                             'username': constants.REQUIRED,
                             'password': constants.REQUIRED,
                             'poll_time': constants.OPTIONAL,
+                            'poll_concurrency': constants.OPTIONAL,
                             'max_vms': constants.OPTIONAL,
                             'max_hosts': constants.OPTIONAL}
         result['secret'] = ['password']
@@ -107,14 +107,16 @@ class VitrageDriver(datasource_driver.PushedDataSourceDriver):
         translator = self.webhook_alarm_translator
         row_data = VitrageDriver.convert_objs(
             [payload['payload']], translator)
+        to_add = []
         for table, row in row_data:
             if table == tablename:
                 self.state[tablename].add(row)
+                to_add.append(row)
 
-        LOG.debug('publish a new state %s in %s',
-                  self.state[tablename], tablename)
+        LOG.debug('publish changes %s, %s in %s', to_add, to_remove,
+                  tablename)
         # Note (thread-safety): blocking call
-        self.publish(tablename, self.state[tablename])
+        self.publish_delta(tablename, to_add, to_remove)
         return [tablename]
 
     def set_up_periodic_tasks(self):
@@ -132,6 +134,11 @@ class VitrageDriver(datasource_driver.PushedDataSourceDriver):
                     >= timedelta(hours=self.hours_to_keep_alarm))]
             for row in to_remove:
                 self.state[tablename].discard(row)
+            if to_remove:
+                LOG.debug('publish removal of old alarms %s in %s',
+                          to_remove, tablename)
+                # Note (thread-safety): blocking call
+                self.publish_delta(tablename, [], to_remove)
 
         periodic_task_callables = [
             (delete_old_alarms, None, {}),
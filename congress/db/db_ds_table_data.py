@@ -16,6 +16,7 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 
+import hashlib
 import json
 
 import sqlalchemy as sa
@@ -35,6 +36,20 @@ class DSTableData(model_base.BASE):
     tabledata = sa.Column(sa.Text(), nullable=False)
 
 
+class DSTableRow(model_base.BASE):
+    __tablename__ = 'dstablerows'
+
+    ds_id = sa.Column(sa.String(36), nullable=False, primary_key=True)
+    tablename = sa.Column(sa.String(255), nullable=False, primary_key=True)
+    # MD5 digest of rowdata, which is too long to be part of the key
+    row_hash = sa.Column(sa.String(32), nullable=False, primary_key=True)
+    rowdata = sa.Column(sa.Text(), nullable=False)
+
+
+# number of rows written by a statement or fetched at a time
+ROW_BATCH_SIZE = 1000
+
+
 @db_utils.retry_on_db_error
 def store_ds_table_data(ds_id, tablename, tabledata, session=None):
     session = session or db.get_session()
@@ -50,13 +65,19 @@ def store_ds_table_data(ds_id, tablename, tabledata, session=None):
 @db_utils.retry_on_db_error
 def delete_ds_table_data(ds_id, tablename=None, session=None):
     session = session or db.get_session()
-    if tablename is None:
-        return session.query(DSTableData).filter(
-            DSTableData.ds_id == ds_id).delete()
-    else:
-        return session.query(DSTableData).filter(
-            DSTableData.ds_id == ds_id,
-            DSTableData.tablename == tablename).delete()
+    with session.begin(subtransactions=True):
+        if tablename is None:
+            deleted = session.query(DSTableData).filter(
+                DSTableData.ds_id == ds_id).delete()
+            return deleted + session.query(DSTableRow).filter(
+                DSTableRow.ds_id == ds_id).delete()
+        else:
+            deleted = session.query(DSTableData).filter(
+                DSTableData.ds_id == ds_id,
+                DSTableData.tablename == tablename).delete()
+            return deleted + session.query(DSTableRow).filter(
+                DSTableRow.ds_id == ds_id,
+                DSTableRow.tablename == tablename).delete()
 
 
 @db_utils.retry_on_db_error
@@ -80,6 +101,87 @@ def get_ds_table_data(ds_id, tablename=None, session=None):
         pass
 
 
+@db_utils.retry_on_db_error
+def update_ds_table_rows(ds_id, tablename, to_add, to_del, session=None):
+    """Persist the rows TO_ADD and remove the rows TO_DEL of a table.
+
+    Writes only the given rows, ROW_BATCH_SIZE rows per statement, in a
+    single transaction.  Adding a row that is already persisted replaces
+    it, so that a delta can safely be applied again.
+    """
+    session = session or db.get_session()
+    to_add = dict((_row_hash(rowdata), rowdata)
+                  for rowdata in (_json_encode_row(row) for row in to_add))
+    to_del = set(_row_hash(_json_encode_row(row)) for row in to_del)
+    to_del.update(to_add)
+    with session.begin(subtransactions=True):
+        for batch in _batches(list(to_del)):
+            session.query(DSTableRow).filter(
+                DSTableRow.ds_id == ds_id,
+                DSTableRow.tablename == tablename,
+                DSTableRow.row_hash.in_(batch)).delete(
+                    synchronize_session=False)
+        for batch in _batches(list(to_add.items())):
+            session.execute(
+                DSTableRow.__table__.insert(),
+                [{'ds_id': ds_id, 'tablename': tablename,
+                  'row_hash': row_hash, 'rowdata': rowdata}
+                 for row_hash, rowdata in batch])
+
+
+def get_ds_table_rows(ds_id, session=None):
+    """Return an iterator over the persisted rows of a datasource.
+
+    Yields (tablename, row) pairs, fetching ROW_BATCH_SIZE rows from the
+    DB at a time rather than loading every table at once.
+    """
+    session = session or db.get_session()
+    query = session.query(DSTableRow.tablename, DSTableRow.rowdata).filter(
+        DSTableRow.ds_id == ds_id).yield_per(ROW_BATCH_SIZE)
+    for tablename, rowdata in query:
+        yield tablename, _json_decode_row(rowdata)
+
+
+@db_utils.retry_on_db_error
+def migrate_ds_table_data(ds_id, session=None):
+    """Convert the tables of a datasource stored whole into rows.
+
+    Returns the names of the converted tables.
+    """
+    session = session or db.get_session()
+    with session.begin(subtransactions=True):
+        tables = session.query(DSTableData).filter(
+            DSTableData.ds_id == ds_id).all()
+        for table in tables:
+            session.query(DSTableRow).filter(
+                DSTableRow.ds_id == ds_id,
+                DSTableRow.tablename == table.tablename).delete(
+                    synchronize_session=False)
+            update_ds_table_rows(
+                ds_id, table.tablename,
+                _json_decode_table_data(table.tabledata), [],
+                session=session)
+            session.delete(table)
+    return [table.tablename for table in tables]
+
+
+def _batches(items):
+    for i in range(0, len(items), ROW_BATCH_SIZE):
+        yield items[i:i + ROW_BATCH_SIZE]
+
+
+def _row_hash(rowdata):
+    return hashlib.md5(rowdata.encode('utf-8')).hexdigest()
+
+
+def _json_encode_row(row):
+    return json.dumps(list(row))
+
+
+def _json_decode_row(rowdata):
+    return tuple(json.loads(rowdata))
+
+
 def _json_encode_table_data(tabledata):
     tabledata = list(tabledata)
     for i in range(0, len(tabledata)):
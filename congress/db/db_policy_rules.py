@@ -224,6 +224,40 @@ class PolicyRule(model_base.BASE, model_base.HasId, model_base.HasAudit):
         return d
 
 
+class PolicyRulesRevision(model_base.BASE):
+    """Counter of the changes made to the policy_rules table."""
+
+    __tablename__ = "policy_rules_revisions"
+
+    id = sa.Column(sa.Integer, primary_key=True)
+    revision = sa.Column(sa.BigInteger, nullable=False)
+
+    def __init__(self, revision):
+        self.id = 1
+        self.revision = revision
+
+
+def _bump_policy_rules_revision(session):
+    """Increment the revision of the policy rules within SESSION."""
+    updated = (session.query(PolicyRulesRevision).
+               update({PolicyRulesRevision.revision:
+                       PolicyRulesRevision.revision + 1},
+                      synchronize_session=False))
+    if not updated:
+        session.add(PolicyRulesRevision(1))
+
+
+@db_utils.retry_on_db_error
+def get_policy_rules_revision(session=None):
+    """Return the revision of the policy rules.
+
+    The revision changes whenever policy rules are added or deleted.
+    """
+    session = session or db.get_session()
+    revision = session.query(PolicyRulesRevision.revision).scalar()
+    return revision or 0
+
+
 @db_utils.retry_on_db_error
 def add_policy_rule(id, policy_name, rule, comment, deleted=False,
                     rule_name="", session=None):
@@ -234,6 +268,7 @@ def add_policy_rule(id, policy_name, rule, comment, deleted=False,
         policy_rule = PolicyRule(id, policy_name, rule, comment,
                                  deleted, rule_name=rule_name)
         session.add(policy_rule)
+        _bump_policy_rules_revision(session)
         return policy_rule
 
     # else
@@ -242,14 +277,47 @@ def add_policy_rule(id, policy_name, rule, comment, deleted=False,
         policy_rule = PolicyRule(id, policy_name, rule, comment,
                                  deleted, rule_name=rule_name)
         session.add(policy_rule)
+        _bump_policy_rules_revision(session)
     return policy_rule
 
 
+@db_utils.retry_on_db_error
+def add_policy_rules(policy_name, rules, session=None):
+    """Add RULES to POLICY_NAME with a single INSERT statement.
+
+    Each rule is a dict with the keys 'id', 'original_str', 'comment' and
+    'name'.
+    """
+    policy_rules = [PolicyRule(rule['id'], policy_name, rule['original_str'],
+                               rule['comment'], rule_name=rule['name'])
+                    for rule in rules]
+    if not policy_rules:
+        return policy_rules
+    if session:
+        # see add_policy_rule
+        session.bulk_save_objects(policy_rules)
+        _bump_policy_rules_revision(session)
+        return policy_rules
+
+    # else
+    session = db.get_session()
+    with session.begin(subtransactions=True):
+        session.bulk_save_objects(policy_rules)
+        _bump_policy_rules_revision(session)
+    return policy_rules
+
+
 @db_utils.retry_on_db_error
 def delete_policy_rule(id, session=None):
     """Specify either the ID or the NAME, and that policy is deleted."""
     session = session or db.get_session()
-    return session.query(PolicyRule).filter(PolicyRule.id == id).soft_delete()
+    with session.begin(subtransactions=True):
+        deleted = (session.query(PolicyRule).
+                   filter(PolicyRule.id == id).
+                   soft_delete())
+        if deleted:
+            _bump_policy_rules_revision(session)
+        return deleted
 
 
 @db_utils.retry_on_db_error
@@ -0,0 +1,41 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""add policy rules revision
+
+Revision ID: 8d2c5e7a4b19
+Revises: f3a9c1d27b60
+Create Date: 2026-10-18 16:40:12.735214
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '8d2c5e7a4b19'
+down_revision = 'f3a9c1d27b60'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    table = op.create_table(
+        'policy_rules_revisions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('revision', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        mysql_engine='InnoDB')
+    op.bulk_insert(table, [{'id': 1, 'revision': 0}])
+
+
+def downgrade():
+    op.drop_table('policy_rules_revisions')
@@ -0,0 +1,42 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""add datasource row persistence
+
+Revision ID: f3a9c1d27b60
+Revises: c0125080d572
+Create Date: 2026-10-18 10:12:31.482906
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c1d27b60'
+down_revision = 'c0125080d572'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'dstablerows',
+        sa.Column('ds_id', sa.String(length=36), nullable=False),
+        sa.Column('tablename', sa.String(length=255), nullable=False),
+        sa.Column('row_hash', sa.String(length=32), nullable=False),
+        sa.Column('rowdata', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('ds_id', 'tablename', 'row_hash'),
+        mysql_engine='InnoDB')
+
+
+def downgrade():
+    op.drop_table('dstablerows')
@@ -12,16 +12,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import copy
-import six  # thirdparty import first because needed in import of Queue/queue
+import heapq
 import time
-if six.PY2:
-    import Queue as queue_package
-else:
-    import queue as queue_package
 
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils as json
+from oslo_utils import uuidutils
+from six.moves import range
 
 from congress import exception
 
@@ -110,17 +108,19 @@ class DataService(object):
         self._published_tables_with_subscriber = set()
 
         # data structures for sequenced data updates for reliable pub-sub
-        # msg queues for msgs to be processed
-        # each queue is a priority queue prioritizing lowest seqnum
-        self.msg_queues = {}  # {publisher -> {table -> msg queue}}
-        # oldest queued msg receipt time
-        self.oldest_queue_times = {}  # {publisher -> {table -> receipt time}}
+        # msg queues for msgs received ahead of their turn
+        self.msg_queues = {}  # {publisher -> {table -> ReorderBuffer}}
         # last received & processed seqnum
         self.receiver_seqnums = {}  # {publisher -> {table -> seqnum}}
         # last sent seqnum
         self.sender_seqnums = {}  # {table -> seqnum}
         # last published data
         self._last_published_data = {}  # {table -> data}
+        # snapshots being sent in chunks
+        # {snapshot_id -> (table, rows, chunk_size, expiry time)}
+        self._snapshot_chunks = {}
+        # snapshots being received in chunks
+        self._receiving_snapshots = set()  # {(publisher, table)}
 
         # custom functions to execute on each heartbeat
         # must be 0-ary function
@@ -230,7 +230,13 @@ class DataService(object):
         LOG.trace('Parameters: table: %s, data: %s, use_snapshot: %s',
                   table, data, use_snapshot)
         LOG.trace('Last published data %s', self._last_published_data)
-        data = set(data)  # make a copy to avoid co-reference
+        rows = data if isinstance(data, (set, frozenset)) else set(data)
+        # comparing sets reuses the hashes they store for their rows
+        if not use_snapshot and self._last_published_data.get(table) == rows:
+            LOG.debug('Table %s unchanged since last published', table)
+            return
+        # make a copy to avoid co-reference
+        data = set(data) if rows is data else rows
 
         def get_differential_and_set_last_published_data():
             if table in self._last_published_data:
@@ -238,42 +244,102 @@ class DataService(object):
                           self._last_published_data[table])
                 to_add = list(data - self._last_published_data[table])
                 to_del = list(self._last_published_data[table] - data)
-                self._last_published_data[table] = data
             else:
                 to_add = list(data)
                 to_del = []
-                self._last_published_data[table] = data
+            self._last_published_data[table] = data
             return [to_add, to_del]
 
-        def increment_get_seqnum():
-            if table not in self.sender_seqnums:
-                self.sender_seqnums[table] = 0
-            else:
-                self.sender_seqnums[table] = self.sender_seqnums[table] + 1
-            return self.sender_seqnums[table]
-
         if not use_snapshot:
             data = get_differential_and_set_last_published_data()
             LOG.debug('Differential data to publish %s', data)
             if len(data[0]) == 0 and len(data[1]) == 0:
                 return
 
-        seqnum = increment_get_seqnum()
+        seqnum = self._increment_seqnum(table)
         self.node.publish_table_sequenced(
             self.service_id, table, data, use_snapshot, seqnum)
 
+    # Note(thread-safety): blocking function
+    def publish_delta(self, table, to_add, to_del):
+        """Publish the rows added to and deleted from TABLE.
+
+        For publishers that know their changes since TABLE was last
+        published, instead of comparing the whole table with the last
+        published data.  The rows of TO_DEL are deleted before the rows
+        of TO_ADD are added.  If TABLE was never published, publishes the
+        result of get_snapshot, which must already include the changes.
+        """
+        LOG.debug('Publishing changes to table %s', table)
+        if table not in self._last_published_data:
+            self.publish(table, self.get_snapshot(table))
+            return
+        last = self._last_published_data[table]
+        to_add = set(to_add)
+        to_del = [row for row in set(to_del)
+                  if row in last and row not in to_add]
+        to_add = [row for row in to_add if row not in last]
+        LOG.debug('Differential data to publish %s', [to_add, to_del])
+        if len(to_add) == 0 and len(to_del) == 0:
+            return
+        last.difference_update(to_del)
+        last.update(to_add)
+
+        seqnum = self._increment_seqnum(table)
+        self.node.publish_table_sequenced(
+            self.service_id, table, [to_add, to_del], False, seqnum)
+
+    def _increment_seqnum(self, table):
+        if table not in self.sender_seqnums:
+            self.sender_seqnums[table] = 0
+        else:
+            self.sender_seqnums[table] = self.sender_seqnums[table] + 1
+        return self.sender_seqnums[table]
+
     # Note(thread-safety): blocking function
     def subscribe(self, service, table):
         try:
             # Note(thread-safety): blocking call
-            (seqnum, data) = self.node.subscribe_table(
+            result = self.node.subscribe_table(
                 self.service_id, service, table)
-            self.receive_data_sequenced(
-                service, table, data, seqnum, is_snapshot=True)
+            if len(result) > 2:
+                self._receive_snapshot_chunks(service, table, *result)
+            else:
+                (seqnum, data) = result
+                self.receive_data_sequenced(
+                    service, table, data, seqnum, is_snapshot=True)
         except exception.NotFound:
             LOG.info("Service '%s' unresponsive. '%s:%s' subscribed but data "
                      "not yet initialized.", service, service, table)
 
+    # Note(thread-safety): blocking function
+    def _receive_snapshot_chunks(self, publisher, table, seqnum, data,
+                                 chunks):
+        """Apply the snapshot of TABLE at SEQNUM, sent in CHUNKS.
+
+        DATA is the first chunk, and CHUNKS describes the snapshot.  No
+        seqnum is set for TABLE until the last chunk is applied, so that
+        the publications received in the meantime are queued.
+        """
+        self._receiving_snapshots.add((publisher, table))
+        try:
+            self.receive_data(publisher, table, data, is_snapshot=True)
+            for index in range(1, chunks['count']):
+                # Note(thread-safety): blocking call
+                data = self.node.get_snapshot_chunk(
+                    publisher, table, chunks['snapshot_id'], index)
+                if table in self.receiver_seqnums.get(publisher, {}):
+                    # a newer snapshot was received in the meantime
+                    return
+                self.receive_data(
+                    publisher, table, [data, []], is_snapshot=False)
+        finally:
+            self._receiving_snapshots.discard((publisher, table))
+        if publisher not in self.receiver_seqnums:
+            self.receiver_seqnums[publisher] = {}
+        self.receiver_seqnums[publisher][table] = seqnum
+        self._process_queued_msg(publisher, table)
+
     def unsubscribe(self, service, table):
         # Note(thread-safety): it is important to make sure there are no
         #             blocking calls in modifying the msg_queues and related
@@ -295,7 +361,6 @@ class DataService(object):
         if publisher in self.msg_queues:
             if table in self.msg_queues[publisher]:
                 del self.msg_queues[publisher][table]
-                del self.oldest_queue_times[publisher][table]
 
     def _clear_receiver_seqnum(self, publisher, table):
         # Note(thread-safety): it is important to make sure there are no
@@ -311,7 +376,13 @@ class DataService(object):
     def receive_data_sequenced(
             self, publisher, table, data, seqnum, is_snapshot=False,
             receipt_time=None):
-        """Method called when sequenced publication data arrives."""
+        """Method called when sequenced publication data arrives.
+
+        Publications of a table are processed in seqnum order, starting
+        with the first snapshot received.  Those received ahead of their
+        turn wait in a ReorderBuffer, and consecutive deltas are processed
+        together.
+        """
         # Note(thread-safety): it is important to make sure there are no
         #             blocking calls in modifying the msg_queues and related
         #             data structures.
@@ -319,94 +390,106 @@ class DataService(object):
         #             periodic task _check_resub_all interrupts and modifies
         #             the same data structures.
         # TODO(ekcs): allow opting out of sequenced processing (per table)
-        def set_seqnum():
-            if publisher not in self.receiver_seqnums:
-                self.receiver_seqnums[publisher] = {}
-            self.receiver_seqnums[publisher][table] = seqnum
-
-        def clear_msg_queue():
-            self._clear_msg_queue(publisher, table)
-
         def add_to_msg_queue():
             if publisher not in self.msg_queues:
                 self.msg_queues[publisher] = {}
-                self.oldest_queue_times[publisher] = {}
             if table not in self.msg_queues[publisher]:
-                self.msg_queues[publisher][table] = \
-                    queue_package.PriorityQueue()
-                # set oldest queue time on first msg only, others are newer
-                self.oldest_queue_times[publisher][table] = receipt_time
-            self.msg_queues[publisher][table].put_nowait(
-                (seqnum, is_snapshot, data, receipt_time))
-            assert self.msg_queues[publisher][table].qsize() > 0
-
-        def process_queued_msg():
-            def update_oldest_time():
-                '''Set oldest time to the receipt time of oldest item in queue.
-
-                Called after removing the previous oldest item from a queue.
-                If queue is empty, corresponding oldest time is set to None.
-                '''
-                try:
-                    # remove and then add back to priority queue to get the
-                    # receipt time of the next oldest message
-                    # (peek not available in python standard library queues)
-                    s, i, d, t = self.msg_queues[publisher][table].get_nowait()
-                    self.msg_queues[publisher][table].put_nowait((s, i, d, t))
-                    self.oldest_queue_times[publisher][table] = t
-                except queue_package.Empty:
-                    # set oldest time to None if queue empty
-                    self.oldest_queue_times[publisher][table] = None
-
-            try:
-                s, i, d, t = self.msg_queues[publisher][table].get_nowait()
-                update_oldest_time()
-                self.receive_data_sequenced(publisher, table, d, s, i, t)
-            except queue_package.Empty:
-                pass
-            except KeyError:
-                pass
+                self.msg_queues[publisher][table] = ReorderBuffer()
+            self.msg_queues[publisher][table].put(
+                seqnum, is_snapshot, data, receipt_time)
 
         if receipt_time is None:
             receipt_time = time.time()
+        last_seqnum = self.receiver_seqnums.get(publisher, {}).get(table)
 
         # if no seqnum process immediately
         if seqnum is None:
             self.receive_data(publisher, table, data, is_snapshot)
 
         # if first data update received on this table
-        elif (publisher not in self.receiver_seqnums or
-                table not in self.receiver_seqnums[publisher]):
+        elif last_seqnum is None:
             if is_snapshot:
-                # set sequence number and process data
-                set_seqnum()
-                self.receive_data(publisher, table, data, is_snapshot)
-                process_queued_msg()
+                # drop queued msgs older than the snapshot
+                queue = self.msg_queues.get(publisher, {}).get(table)
+                if queue:
+                    queue.discard_through(seqnum)
+                self._process_in_sequence(
+                    publisher, table, seqnum, is_snapshot, data)
             else:
                 # queue
                 add_to_msg_queue()
 
         # if re-initialization
         elif seqnum == 0:  # initial snapshot or reset
-            # set sequence number and process data
-            set_seqnum()
-            clear_msg_queue()
-            self.receive_data(publisher, table, data, is_snapshot)
+            self._clear_msg_queue(publisher, table)
+            self._process_in_sequence(
+                publisher, table, seqnum, is_snapshot, data)
 
-        else:
-            # if seqnum is old, ignore
-            if seqnum <= self.receiver_seqnums[publisher][table]:
-                process_queued_msg()
-
-            # if seqnum next, process all in sequence
-            elif seqnum == self.receiver_seqnums[publisher][table] + 1:
-                set_seqnum()
-                self.receive_data(publisher, table, data, is_snapshot)
-                process_queued_msg()
-
-            # if seqnum future, queue for future
-            elif seqnum > self.receiver_seqnums[publisher][table] + 1:
-                add_to_msg_queue()
+        # if seqnum next, process all in sequence
+        elif seqnum == last_seqnum + 1:
+            self._process_in_sequence(
+                publisher, table, seqnum, is_snapshot, data)
+
+        # if seqnum future, queue for future
+        elif seqnum > last_seqnum + 1:
+            add_to_msg_queue()
+
+        # if seqnum is old, ignore
+
+    def _process_in_sequence(self, publisher, table, seqnum, is_snapshot,
+                             data):
+        """Process msg SEQNUM of TABLE, then the queued msgs following it.
+
+        Consecutive deltas are merged and passed to receive_data at once.
+        """
+        queue = self.msg_queues.get(publisher, {}).get(table)
+        deltas = []
+        while True:
+            if publisher not in self.receiver_seqnums:
+                self.receiver_seqnums[publisher] = {}
+            self.receiver_seqnums[publisher][table] = seqnum
+            if is_snapshot:
+                if deltas:
+                    self.receive_data(
+                        publisher, table, merge_deltas(deltas), False)
+                    deltas = []
+                self.receive_data(publisher, table, data, True)
+            else:
+                deltas.append(data)
+            msg = queue.pop(seqnum + 1) if queue else None
+            if msg is None:
+                break
+            seqnum += 1
+            is_snapshot, data = msg
+        if deltas:
+            self.receive_data(publisher, table, merge_deltas(deltas), False)
+
+    def _process_queued_msg(self, publisher, table):
+        """Process the queued msgs of TABLE next in sequence, if any."""
+        queue = self.msg_queues.get(publisher, {}).get(table)
+        if not queue:
+            return
+        seqnum = self.receiver_seqnums[publisher][table]
+        queue.discard_through(seqnum)
+        msg = queue.pop(seqnum + 1)
+        if msg is not None:
+            self._process_in_sequence(publisher, table, seqnum + 1, *msg)
+
+    def receive_queue_stats(self):
+        """Return statistics of the msgs queued for their turn.
+
+        Returns {publisher -> {table -> {'depth': number of queued msgs,
+        'gap_age': seconds the oldest of them has waited, or None}}}.
+        """
+        now = time.time()
+        result = {}
+        for publisher, queues in self.msg_queues.items():
+            for table, queue in queues.items():
+                oldest = queue.oldest_time()
+                result.setdefault(publisher, {})[table] = {
+                    'depth': len(queue),
+                    'gap_age': None if oldest is None else now - oldest}
+        return result
 
     def receive_data(self, publisher, table, data, is_snapshot=True):
         """Method called when publication data arrives.
@@ -457,6 +540,35 @@ class DataService(object):
         return (self.sender_seqnums[table],
                 list(self._last_published_data[table]))
 
+    def split_snapshot(self, table, rows, chunk_size):
+        """Keep ROWS of TABLE to send in chunks of CHUNK_SIZE rows.
+
+        Returns the first chunk and the description of the chunks, which
+        get_snapshot_chunk takes.
+        """
+        now = time.time()
+        for snapshot_id, chunks in list(self._snapshot_chunks.items()):
+            if chunks[3] < now:
+                del self._snapshot_chunks[snapshot_id]
+        snapshot_id = uuidutils.generate_uuid()
+        self._snapshot_chunks[snapshot_id] = (
+            table, rows, chunk_size, now + cfg.CONF.dse.long_timeout)
+        count = (len(rows) + chunk_size - 1) // chunk_size
+        return (rows[:chunk_size],
+                {'snapshot_id': snapshot_id, 'count': count})
+
+    def get_snapshot_chunk(self, snapshot_id, index):
+        """Return chunk INDEX of the snapshot kept by split_snapshot."""
+        if snapshot_id not in self._snapshot_chunks:
+            raise exception.NotFound(
+                "Snapshot %s of service %s expired" %
+                (snapshot_id, self.service_id))
+        table, rows, chunk_size, expiry = self._snapshot_chunks[snapshot_id]
+        start = index * chunk_size
+        if start + chunk_size >= len(rows):
+            del self._snapshot_chunks[snapshot_id]
+        return rows[start:start + chunk_size]
+
     def get_snapshot(self, table):
         """Method that returns the current data for the given table.
 
@@ -469,23 +581,95 @@ class DataService(object):
     def check_resub_all(self):
         '''Check all subscriptions for long missing update and resubscribe.'''
         def check_resub(publisher, table):
-            if (publisher in self.oldest_queue_times and
-                table in self.oldest_queue_times[publisher] and
-                self.oldest_queue_times[publisher][table] is not None and
-                (time.time() - self.oldest_queue_times[publisher][table]
-                 > cfg.CONF.dse.time_to_resub)):
+            oldest = self.msg_queues[publisher][table].oldest_time()
+            if ((publisher, table) not in self._receiving_snapshots and
+                    oldest is not None and
+                    time.time() - oldest > cfg.CONF.dse.time_to_resub):
                 self.unsubscribe(publisher, table)
                 self.subscribe(publisher, table)
                 return True
             else:
                 return False
 
-        copy_oldest_queue_times = copy.copy(self.oldest_queue_times)
-        for publisher in copy_oldest_queue_times:
-            copy_oldest_queue_times_publisher = copy.copy(
-                copy_oldest_queue_times[publisher])
-            for table in copy_oldest_queue_times_publisher:
-                check_resub(publisher, table)
+        copy_msg_queues = copy.copy(self.msg_queues)
+        for publisher in copy_msg_queues:
+            copy_msg_queues_publisher = copy.copy(copy_msg_queues[publisher])
+            for table in copy_msg_queues_publisher:
+                if table in self.msg_queues.get(publisher, {}):
+                    check_resub(publisher, table)
+
+
+class ReorderBuffer(object):
+    """Msgs of a table received ahead of their turn, by seqnum.
+
+    Keeps the receipt times in a heap to find the oldest msg, from which
+    the msgs taken out are removed lazily.
+    """
+
+    def __init__(self):
+        self.msgs = {}  # {seqnum -> (is_snapshot, data, receipt_time)}
+        self._times = []  # heap of (receipt_time, seqnum)
+
+    def __len__(self):
+        return len(self.msgs)
+
+    def put(self, seqnum, is_snapshot, data, receipt_time):
+        """Add a msg, unless one with the same seqnum is present."""
+        if seqnum in self.msgs:
+            return
+        self.msgs[seqnum] = (is_snapshot, data, receipt_time)
+        heapq.heappush(self._times, (receipt_time, seqnum))
+
+    def pop(self, seqnum):
+        """Remove msg SEQNUM and return (is_snapshot, data), or None."""
+        msg = self.msgs.pop(seqnum, None)
+        if msg is None:
+            return None
+        return msg[:2]
+
+    def discard_through(self, seqnum):
+        """Remove the msgs up to SEQNUM."""
+        for old in [s for s in self.msgs if s <= seqnum]:
+            del self.msgs[old]
+
+    def oldest_time(self):
+        """Return the receipt time of the oldest msg, or None if empty."""
+        while self._times:
+            receipt_time, seqnum = self._times[0]
+            msg = self.msgs.get(seqnum)
+            if msg is not None and msg[2] == receipt_time:
+                return receipt_time
+            heapq.heappop(self._times)
+        return None
+
+
+def merge_deltas(deltas):
+    """Return a delta with the effect of applying DELTAS in order.
+
+    Each delta is a pair of lists of rows, the rows to add and to delete,
+    whose deletions are applied first.  Like those the publishers send,
+    each delta must only add missing rows and delete present ones, so
+    that a row deleted after being added, or the other way around, is
+    left out.
+    """
+    if len(deltas) == 1:
+        return deltas[0]
+    to_add = set()
+    to_del = set()
+    for added, deleted in deltas:
+        for row in deleted:
+            row = tuple(row) if isinstance(row, list) else row
+            if row in to_add:
+                to_add.discard(row)
+            else:
+                to_del.add(row)
+        for row in added:
+            row = tuple(row) if isinstance(row, list) else row
+            if row in to_del:
+                to_del.discard(row)
+            else:
+                to_add.add(row)
+    return [list(to_add), list(to_del)]
 
 
 class DataServiceEndPoints (object):
@@ -499,12 +683,45 @@ class DataServiceEndPoints (object):
         except AttributeError:
             pass
 
-    def get_last_published_data_with_seqnum(self, context, table):
-        """Function called on a node when an RPC request is sent."""
+    def get_last_published_data_with_seqnum(self, context, table,
+                                            wire_format=None,
+                                            chunk_size=None):
+        """Function called on a node when an RPC request is sent.
+
+        WIRE_FORMAT is the wire format the subscriber asks the publications
+        of TABLE to be sent in, which the snapshot returned is encoded in
+        if it is supported.  Publications are only broadcast in it once all
+        the nodes subscribing to TABLE ask for it.  If CHUNK_SIZE is given
+        and the snapshot has more rows, only its first CHUNK_SIZE rows are
+        returned, followed by the description of the chunks to get with
+        get_snapshot_chunk.
+        """
         try:
-            return self.service.get_last_published_data_with_seqnum(table)
+            result = self.service.get_last_published_data_with_seqnum(table)
         except AttributeError:
-            pass
+            return
+        node = self.service.node
+        node_id = context.get('node_id')
+        node.set_wire_format(
+            self.service.service_id, table, node_id, wire_format)
+        if wire_format is None and chunk_size is None:
+            return result
+        seqnum, data = result
+        chunks = None
+        if chunk_size and len(data) > chunk_size:
+            data, chunks = self.service.split_snapshot(
+                table, data, chunk_size)
+        data = node.encode_table_data(
+            self.service.service_id, table, data, node_id)
+        if chunks is None:
+            return seqnum, data
+        return seqnum, data, chunks
+
+    def get_snapshot_chunk(self, context, table, snapshot_id, index):
+        """Function called on a node when an RPC request is sent."""
+        data = self.service.get_snapshot_chunk(snapshot_id, index)
+        return self.service.node.encode_table_data(
+            self.service.service_id, table, data, context.get('node_id'))
 
     def ping(self, client_ctxt, **args):
         """Echo args"""
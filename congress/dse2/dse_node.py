@@ -15,6 +15,7 @@
 
 import json
 import six
+import time
 
 from oslo_config import cfg
 from oslo_db import exception as db_exc
@@ -31,6 +32,7 @@ from congress.datalog import compile as datalog_compile
 from congress.datasources import constants
 from congress.db import datasources as datasources_db
 from congress.dse2 import control_bus
+from congress.dse2 import wire
 from congress import exception
 
 
@@ -113,6 +115,10 @@ class DseNode(object):
         # {publisher_id ->
         #     {table_name -> set_of_subscriber_ids}}
         self.subscriptions = {}
+        # wire formats the nodes subscribing to the tables of local services
+        # asked them to be published in, and when they asked:
+        # {publisher_id -> {table_name -> {node_id -> (wire_format, time)}}}
+        self.wire_formats = {}
 
         # Note(ekcs): A little strange that _control_bus starts before self?
         self._control_bus = control_bus.DseNodeControlBus(self)
@@ -402,6 +408,7 @@ class DseNode(object):
         """
         LOG.trace("<%s> Publishing from '%s' table %s: %s",
                   self.node_id, publisher, table, data)
+        data = self.encode_table_data(publisher, table, data)
         self.broadcast_node_rpc(
             "handle_publish_sequenced",
             {'publisher': publisher, 'table': table,
@@ -425,12 +432,96 @@ class DseNode(object):
 
         # oslo returns [] instead of set(), so handle that case directly
 
-        # Note(thread-safety): blocking call
-        snapshot_seqnum = self.invoke_service_rpc(
-            publisher, "get_last_published_data_with_seqnum",
-            {'table': table})
+        kwargs = {'table': table}
+        if cfg.CONF.dse.wire_format != wire.JSON:
+            kwargs['wire_format'] = cfg.CONF.dse.wire_format
+        if cfg.CONF.dse.snapshot_chunk_size > 0:
+            kwargs['chunk_size'] = cfg.CONF.dse.snapshot_chunk_size
+        try:
+            # Note(thread-safety): blocking call
+            snapshot_seqnum = self.invoke_service_rpc(
+                publisher, "get_last_published_data_with_seqnum", kwargs)
+        except TypeError:
+            # remote TypeErrors are re-raised here
+            if len(kwargs) == 1:
+                raise
+            # the publisher does not know about wire formats and chunks
+            LOG.debug("Publisher %s does not support the options %s",
+                      publisher, kwargs)
+            # Note(thread-safety): blocking call
+            snapshot_seqnum = self.invoke_service_rpc(
+                publisher, "get_last_published_data_with_seqnum",
+                {'table': table})
+        if snapshot_seqnum is None:
+            return None
+        # the snapshot may be followed by the description of its chunks
+        snapshot_seqnum = list(snapshot_seqnum)
+        snapshot_seqnum[1] = wire.decode(snapshot_seqnum[1])
         return snapshot_seqnum
 
+    # Note(thread-safety): blocking function
+    def get_snapshot_chunk(self, publisher, table, snapshot_id, index):
+        """Return chunk INDEX of a snapshot of publisher/table."""
+        # Note(thread-safety): blocking call
+        chunk = self.invoke_service_rpc(
+            publisher, "get_snapshot_chunk",
+            {'table': table, 'snapshot_id': snapshot_id, 'index': index})
+        return wire.decode(chunk)
+
+    def set_wire_format(self, publisher, table, node_id, wire_format):
+        """Record that node NODE_ID subscribes to TABLE in WIRE_FORMAT.
+
+        TABLE is published by local service PUBLISHER.  Nodes asking for a
+        wire format that is not supported, or for none, are sent JSON.
+        """
+        if wire_format not in wire.FORMATS:
+            wire_format = wire.JSON
+        formats = self.wire_formats.setdefault(publisher, {}).setdefault(
+            table, {})
+        formats[node_id] = (wire_format, time.time())
+
+    def encode_table_data(self, publisher, table, data, node_id=None):
+        """Encode DATA of TABLE for the subscribers on node NODE_ID.
+
+        Without NODE_ID, DATA is broadcast to every node subscribing to
+        TABLE, so it is encoded only if all of them asked for the same
+        wire format, and otherwise sent as JSON.
+        """
+        formats = self.wire_formats.get(publisher, {}).get(table, {})
+        if node_id is not None:
+            wire_format = formats.get(node_id, (wire.JSON, None))[0]
+        else:
+            wire_formats = set(f for f, _ in formats.values())
+            if len(wire_formats) == 1:
+                wire_format = wire_formats.pop()
+            else:
+                wire_format = wire.JSON
+        if wire_format == wire.JSON:
+            return data
+        return wire.encode(data, wire_format, cfg.CONF.dse.wire_compression)
+
+    def _prune_wire_formats(self, peers):
+        """Forget the wire formats of nodes no longer subscribing.
+
+        A peer is only known to have unsubscribed from a table once it
+        sent a heartbeat without the table after it asked for a format.
+        """
+        for publisher, tables in list(self.wire_formats.items()):
+            for table, formats in list(tables.items()):
+                for node_id, (_, asked) in list(formats.items()):
+                    if node_id == self.node_id:
+                        subscriptions = self.subscriptions
+                    elif peers.get(node_id, {}).get('last_hb_time', 0) > asked:
+                        subscriptions = peers[node_id]['subscribed_tables']
+                    else:
+                        continue
+                    if table not in subscriptions.get(publisher, ()):
+                        del formats[node_id]
+                if not formats:
+                    del tables[table]
+            if not tables:
+                del self.wire_formats[publisher]
+
     def get_subscription(self, service_id):
         """Return publisher/tables subscribed by service: service_id
 
@@ -476,12 +567,16 @@ class DseNode(object):
         self.subscriptions[publisher][table].discard(subscriber)
         if len(self.subscriptions[publisher][table]) == 0:
             del self.subscriptions[publisher][table]
+            # a local publisher no longer sends TABLE to this node
+            self.wire_formats.get(publisher, {}).get(table, {}).pop(
+                self.node_id, None)
         if len(self.subscriptions[publisher]) == 0:
             del self.subscriptions[publisher]
 
     def _update_tables_with_subscriber(self):
         # not thread-safe: assumes each dseNode is single-threaded
         peers = self.dse_status()['peers']
+        self._prune_wire_formats(peers)
         for s in self.get_services():
             sid = s.service_id
             # first, include subscriptions within the node, if any
@@ -722,6 +817,7 @@ class DseNodeEndpoints (object):
 
            Forwards the publication to all of the relevant services.
         """
+        data = wire.decode(data, is_snapshot)
         for s in self.node.table_subscribers(publisher, table):
             self.node.service_object(s).receive_data_sequenced(
                 publisher=publisher, table=table, data=data, seqnum=seqnum,
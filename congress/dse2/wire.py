@@ -0,0 +1,76 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Wire formats of the table data that DSE nodes exchange.
+
+By default, published tables travel as lists of rows, serialized to JSON
+by oslo.messaging.  The msgpack wire format packs the rows with msgpack,
+compresses large payloads with zlib and base64-encodes the result, so that
+it still fits in a JSON message.  Encoded data is a dict that names its
+wire format, and so is told apart from plain lists of rows by decode.
+"""
+
+import base64
+import zlib
+
+import msgpack
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+FORMATS = (JSON, MSGPACK)
+
+# payloads smaller than this many bytes are not worth compressing
+COMPRESSION_MIN_BYTES = 1024
+
+
+def is_encoded(data):
+    """Return True if DATA was encoded by encode."""
+    return isinstance(data, dict) and 'wire_format' in data
+
+
+def encode(data, wire_format, compress=True):
+    """Encode DATA, a list of rows or a list of lists of rows.
+
+    Returns DATA unchanged for the JSON wire format.
+    """
+    if wire_format != MSGPACK:
+        return data
+    if isinstance(data, (set, frozenset)):
+        data = list(data)
+    payload = msgpack.packb(data, use_bin_type=True)
+    compression = None
+    if compress and len(payload) >= COMPRESSION_MIN_BYTES:
+        payload = zlib.compress(payload, 1)
+        compression = 'zlib'
+    return {'wire_format': MSGPACK,
+            'compression': compression,
+            'payload': base64.b64encode(payload).decode('ascii')}
+
+
+def decode(data, is_snapshot=True):
+    """Decode DATA if it was encoded by encode.
+
+    Returns a list of rows if IS_SNAPSHOT, and otherwise a list of lists
+    of rows, whose rows are tuples.  Returns any other DATA unchanged.
+    """
+    if not is_encoded(data):
+        return data
+    if data['wire_format'] != MSGPACK:
+        raise ValueError("Unknown wire format %s" % data['wire_format'])
+    payload = base64.b64decode(data['payload'])
+    if data.get('compression') == 'zlib':
+        payload = zlib.decompress(payload)
+    data = msgpack.unpackb(payload, raw=False, use_list=False)
+    if is_snapshot:
+        return list(data)
+    return [list(rows) for rows in data]
@@ -57,7 +57,7 @@ def validate_policy_item(item):
           "title": "Policy kind",
           "type": "string",
           "enum": ["database", "nonrecursive", "action", "z3", "materialized",
-                   "delta", "datasource"]
+                   "delta", "datasource", "bottomup"]
         },
         "abbreviation": {
           "title": "Policy name abbreviation",
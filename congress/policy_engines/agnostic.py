@@ -17,6 +17,7 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 
+import collections
 import time
 
 import eventlet
@@ -29,8 +30,11 @@ import six
 from six.moves import range
 
 from congress.datalog import base
+from congress.datalog import bottomup
+from congress.datalog import builtin
 from congress.datalog import compile
 from congress.datalog import database as db
+from congress.datalog import factset
 from congress.datalog import materialized
 from congress.datalog import nonrecursive
 from congress.datalog import unify
@@ -117,6 +121,11 @@ class TriggerRegistry(object):
         # map from table to triggers relevant to changes for that table
         self.index = {}
 
+        # map from (table, policy, modal) to the contents of that table
+        #   as of the last time its triggers were evaluated.  Only
+        #   tables eligible for incremental evaluation are cached.
+        self.contents = {}
+
     def register_table(self, tablename, policy, callback, modal=None):
         """Register CALLBACK to run when TABLENAME changes."""
         # TODO(thinrichs): either fix dependency graph to differentiate
@@ -132,6 +141,11 @@ class TriggerRegistry(object):
         """Unregister trigger ID."""
         self.triggers.remove(trigger)
         self._delete_indexes(trigger)
+        # contents are only maintained while some trigger watches the table
+        key = (trigger.tablename, trigger.policy, trigger.modal)
+        if not any((t.tablename, t.policy, t.modal) == key
+                   for t in self.triggers):
+            self.contents.pop(key, None)
 
     def update_dependencies(self, dependency_graph_changes=None):
         """Inform registry of changes to the dependency graph.
@@ -146,6 +160,19 @@ class TriggerRegistry(object):
         self.index = {}
         for trigger in self.triggers:
             self._add_indexes(trigger)
+        # rule changes may alter any table's contents
+        if (dependency_graph_changes is None or
+                self.rules_changed(dependency_graph_changes)):
+            self.contents = {}
+
+    @staticmethod
+    def rules_changed(dependency_graph_changes):
+        """Return True if the dependency graph changes come from rules.
+
+        Atoms only ever contribute (empty) modal changes.
+        """
+        return any(change[0] != 'modal'
+                   for change in dependency_graph_changes)
 
     def _add_indexes(self, trigger):
         full_table = compile.Tablename.build_service_table(
@@ -171,6 +198,18 @@ class TriggerRegistry(object):
     def relevant_triggers(self, events):
         """Return the set of triggers that are relevant to the EVENTS.
 
+        Each EVENT may either be a compile.Event or a tablename.
+        """
+        triggers = set()
+        for table in self.changed_tables(events):
+            if table in self.index:
+                triggers |= self.index[table]
+        return triggers
+
+    @staticmethod
+    def changed_tables(events):
+        """Return the set of global tablenames changed by the EVENTS.
+
         Each EVENT may either be a compile.Event or a tablename.
         """
         table_changes = set()
@@ -185,11 +224,7 @@ class TriggerRegistry(object):
                         event.formula.table.global_tablename(event.target))
             elif isinstance(event, six.string_types):
                 table_changes.add(event)
-        triggers = set()
-        for table in table_changes:
-            if table in self.index:
-                triggers |= self.index[table]
-        return triggers
+        return table_changes
 
     def _index_string(self):
         """Build string representation of self.index; useful for debugging."""
@@ -212,6 +247,149 @@ class TriggerRegistry(object):
         return d
 
 
+class TriggerDeltaPropagator(object):
+    """Computes which rows of trigger tables an update may change.
+
+    Starting from the facts inserted/deleted by an update, propagates
+    those changes up through the rules (semi-naive style) and
+    collects, for each table of interest, a set of patterns that
+    over-approximates the rows that were added or removed.  A pattern
+    is a (modal, args) pair where ARGS is a tuple of ObjectConstants,
+    with None standing for 'any value'.
+
+    Rows that may disappear are derived in the state *before* the update
+    (PRE_UPDATE) and rows that may appear in the state *after* the update
+    (POST_UPDATE).  When the required state is no longer available (a row
+    that disappears because of something that appeared under negation),
+    the instantiated rule head is used as a pattern instead of evaluating
+    the rule body.
+    """
+    DISAPPEAR = 'disappear'
+    APPEAR = 'appear'
+    UNKNOWN = 'unknown'
+
+    def __init__(self, theories, body_index, is_relevant, targets):
+        # dict from policy name to theory object
+        self.theories = theories
+        # dict from global tablename to list of (policy, rule, position)
+        #   for every rule body literal referencing that table
+        self.body_index = body_index
+        # function from global tablename to whether its changes matter
+        self.is_relevant = is_relevant
+        # set of global tablenames for which we collect patterns
+        self.targets = targets
+        # dict from global tablename to set of patterns
+        self.patterns = {}
+        # work items: (global tablename, pattern, kind)
+        self._queue = []
+        self._seen = set()
+        # rule instantiations that must be evaluated after the update
+        self._deferred = []
+        self._deferred_seen = set()
+        self._pre_update = True
+
+    def pre_update(self, events):
+        """Process EVENTS before they have been applied to the theories."""
+        for event in events:
+            lit = event.formula
+            kind = self.APPEAR if event.insert else self.DISAPPEAR
+            self._add(lit.table.global_tablename(event.target),
+                      (lit.table.modal, tuple(lit.arguments)), kind)
+        self._drain()
+
+    def post_update(self):
+        """Finish propagation once the update has been applied.
+
+        Returns a dictionary from global tablename to set of patterns.
+        """
+        self._pre_update = False
+        deferred = self._deferred
+        self._deferred = []
+        for policy, rule, binding, kind in deferred:
+            self._instantiate(policy, rule, binding, kind)
+        self._drain()
+        return self.patterns
+
+    def _add(self, table, pattern, kind):
+        if not self.is_relevant(table):
+            return
+        item = (table, pattern, kind)
+        if item in self._seen:
+            return
+        self._seen.add(item)
+        self._queue.append(item)
+
+    def _drain(self):
+        while self._queue:
+            table, pattern, kind = self._queue.pop()
+            if table in self.targets:
+                self.patterns.setdefault(table, set()).add(pattern)
+            for policy, rule, position in self.body_index.get(table, ()):
+                lit = rule.body[position]
+                if lit.table.modal != pattern[0]:
+                    continue
+                binding = self._match(lit, pattern[1])
+                if binding is None:
+                    continue
+                self._propagate(policy, rule, lit, binding, kind)
+
+    def _propagate(self, policy, rule, lit, binding, kind):
+        """Propagate a change to LIT (under BINDING) to the heads of RULE."""
+        if kind != self.UNKNOWN and lit.is_negated():
+            kind = self.APPEAR if kind == self.DISAPPEAR else self.DISAPPEAR
+        if kind == self.APPEAR and self._pre_update:
+            key = (policy, id(rule), frozenset(binding.items()))
+            if key not in self._deferred_seen:
+                self._deferred_seen.add(key)
+                self._deferred.append((policy, rule, binding, kind))
+        elif kind == self.DISAPPEAR and not self._pre_update:
+            self._instantiate(policy, rule, binding, self.UNKNOWN)
+        else:
+            self._instantiate(policy, rule, binding, kind)
+
+    def _instantiate(self, policy, rule, binding, kind):
+        """Add the instances of RULE's heads consistent with BINDING.
+
+        Unless KIND is UNKNOWN, the body of RULE is evaluated in the
+        current state to find the instances.
+        """
+        if kind == self.UNKNOWN:
+            for head in rule.heads:
+                args = tuple(binding.get(arg) if arg.is_variable() else arg
+                             for arg in head.arguments)
+                self._add(head.table.global_tablename(policy),
+                          (head.table.modal, args), kind)
+            return
+        theory = self.theories[policy]
+        body = [lit.plug(binding) for lit in rule.body]
+        heads = [head.plug(binding) for head in rule.heads]
+        variables = set()
+        for head in heads:
+            variables |= head.variables()
+        for answer in theory.top_down_evaluation(variables, body):
+            for head in heads:
+                args = tuple(arg if arg.is_object() else None
+                             for arg in head.plug(answer).arguments)
+                self._add(head.table.global_tablename(policy),
+                          (head.table.modal, args), kind)
+
+    @staticmethod
+    def _match(lit, args):
+        """Return the binding for LIT's variables implied by ARGS or None."""
+        if len(lit.arguments) != len(args):
+            return None
+        binding = {}
+        for term, value in zip(lit.arguments, args):
+            if value is None:
+                continue
+            if term.is_variable():
+                if binding.setdefault(term, value) != value:
+                    return None
+            elif term != value:
+                return None
+        return binding
+
+
 class Runtime (object):
     """Runtime for the Congress policy language.
 
@@ -243,6 +421,28 @@ class Runtime (object):
         # rules with errors (because of schema inconsistencies)
         self.error_events = []
         self.synchronizer = None
+        # incremented whenever the policies other than datasource policies
+        #   or their rules change, so the synchronizer can tell when they
+        #   need to be compared with the DB
+        self.rules_revision = 0
+        # whether to compute trigger table changes from the update deltas
+        #   instead of recomputing the tables before and after each update
+        self.incremental_triggers = False
+        # dict from global tablename to rule body literals referencing it;
+        #   built lazily for incremental trigger evaluation
+        self._body_index = None
+        # name of the FactSet backend for the facts of new policies
+        self.fact_storage = 'tuple'
+        # whether new policies use tabled top-down evaluation
+        self.tabling = False
+        # how new materialized policies maintain the rows of views
+        self.materialized_maintenance = (
+            materialized.MaterializedViewTheory.PROOFS)
+        # whether get_row_data caches the rows of policy tables
+        self.cache_table_rows = False
+        # dict from (table, policy, modal) to the rows get_row_data
+        #   returned; dropped when a table the rows depend on changes
+        self.table_rows = {}
 
     ###############################################
     # Persistence layer
@@ -379,9 +579,8 @@ class Runtime (object):
         """Insert and persists rule into policy_name."""
 
         def uninsert_rules(rules_inserted):
-            for d in rules_inserted:
-                self._safe_process_policy_update(
-                    [d['input_rule_str']], policy_name, insert=False)
+            self._safe_process_policy_update(
+                rules_inserted, policy_name, insert=False)
 
         success = False  # used to rollback DB if not set to success
         try:
@@ -392,10 +591,12 @@ class Runtime (object):
 
             # lock policy_rules table to prevent conflicting rules
             # insertion (say causing unsupported recursion)
-            # policies and datasources tables locked because
-            # it's a requirement of MySQL backend to lock all accessed tables
+            # policies, policy_rules_revisions and datasources tables locked
+            # because it's a requirement of MySQL backend to lock all
+            # accessed tables
             db_api.lock_tables(session=db_session,
                                tables=['policy_rules', 'policies',
+                                       'policy_rules_revisions',
                                        'datasources'])
 
             if cfg.CONF.replicated_policy_engine:
@@ -500,13 +701,11 @@ class Runtime (object):
                 raise exception.PolicyRuntimeException(
                     name='rule_already_exists')
             try:
-                for d in rules_to_persist:
-                    # Note(thread-safety): blocking call
-                    db_policy_rules.add_policy_rule(
-                        d['id'], policy_name, d['original_str'],
-                        d['comment'], rule_name=d['name'], session=db_session)
-                    # do not begin to avoid implicitly releasing table
-                    # lock due to starting new transaction
+                # Note(thread-safety): blocking call
+                db_policy_rules.add_policy_rules(
+                    policy_name, rules_to_persist, session=db_session)
+                # do not begin to avoid implicitly releasing table
+                # lock due to starting new transaction
                 success = True
                 return return_data, policy_metadata
             except Exception as db_exception:
@@ -564,15 +763,17 @@ class Runtime (object):
         """Load all rules from the database."""
         # Note(thread-safety): blocking call
         rules = db_policy_rules.get_policy_rules()
+        # insert the rules of each policy at once
+        parsed_rules = collections.OrderedDict()
         for rule in rules:
             parsed_rule = self.parse1(rule.rule)
             parsed_rule.set_id(rule.id)
             parsed_rule.set_name(rule.name)
             parsed_rule.set_comment(rule.comment)
             parsed_rule.set_original_str(rule.rule)
-            self._safe_process_policy_update(
-                [parsed_rule],
-                rule.policy_name)
+            parsed_rules.setdefault(rule.policy_name, []).append(parsed_rule)
+        for policy_name, policy_rules in parsed_rules.items():
+            self._safe_process_policy_update(policy_rules, policy_name)
 
     def _safe_process_policy_update(self, parsed_rules, policy_name,
                                     insert=True, persistent=False):
@@ -616,6 +817,8 @@ class Runtime (object):
             kind = kind.lower()
         if kind == base.NONRECURSIVE_POLICY_TYPE:
             PolicyClass = nonrecursive.NonrecursiveRuleTheory
+        elif kind == base.BOTTOMUP_POLICY_TYPE:
+            PolicyClass = bottomup.BottomUpTheory
         elif kind == base.ACTION_POLICY_TYPE:
             PolicyClass = nonrecursive.ActionTheory
         elif kind == base.DATABASE_POLICY_TYPE:
@@ -637,6 +840,11 @@ class Runtime (object):
                                  desc=desc, owner=owner)
         policy_obj.set_id(id_)
         policy_obj.set_tracer(self.tracer)
+        if isinstance(policy_obj, nonrecursive.NonrecursiveRuleTheory):
+            policy_obj.set_fact_storage(self.fact_storage)
+            policy_obj.tabling = self.tabling
+        elif isinstance(policy_obj, materialized.MaterializedViewTheory):
+            policy_obj.set_maintenance(self.materialized_maintenance)
         return policy_obj
 
     def add_policy_obj_to_runtime(self, policy_obj):
@@ -645,6 +853,9 @@ class Runtime (object):
         if name in self.theory:
             raise KeyError("Policy with name %s already exists" % name)
         self.theory[name] = policy_obj
+        self._body_index = None
+        self._invalidate_table_rows()
+        self.rules_revision += 1
         LOG.debug("Added to runtime policy <%s> with abbr <%s> and kind <%s>",
                   policy_obj.name, policy_obj.abbr, policy_obj.kind)
 
@@ -706,6 +917,9 @@ class Runtime (object):
             self.theory[name].drop()
         # actually delete the theory
         del self.theory[name]
+        self._body_index = None
+        self._invalidate_table_rows()
+        self.rules_revision += 1
 
     def rename_policy(self, oldname, newname):
         """Renames policy OLDNAME to NEWNAME or raises KeyError."""
@@ -718,6 +932,10 @@ class Runtime (object):
         except KeyError:
             raise KeyError('Cannot rename %s to %s: %s does not exist' %
                            (oldname, newname, oldname))
+        self._body_index = None
+        self.trigger_registry.contents = {}
+        self.rules_revision += 1
+        self._invalidate_table_rows()
 
     # TODO(thinrichs): make Runtime act like a dictionary so that we
     #   can iterate over policy names (keys), check if a policy exists, etc.
@@ -771,6 +989,7 @@ class Runtime (object):
             raise exception.CongressException(
                 "Schema for %s already set" % name)
         self.theory[name].schema = compile.Schema(schema, complete=complete)
+        self._invalidate_table_rows()
         enabled, disabled, errs = self._process_limbo_events(
             self.disabled_events)
         self.disabled_events = disabled
@@ -834,13 +1053,53 @@ class Runtime (object):
         triggers = self.trigger_registry.relevant_triggers(alltables)
         LOG.info("relevant triggers (init): %s",
                  ";".join(str(x) for x in triggers))
-        # run queries on relevant triggers *before* applying changes
         table_triggers = self.trigger_registry.triggers_by_table(triggers)
-        table_data_old = self._compute_table_contents(table_triggers)
+        # run queries on relevant triggers *before* applying changes
+        table_data_old = self._compute_table_contents(
+            [table for table in table_triggers
+             if table not in self.trigger_registry.contents])
+        propagator = None
+        if (self.incremental_triggers and
+                isinstance(target_theory, nonrecursive.RuleHandlingMixin)):
+            if any(target_theory.rules.rules.get(t) for t in tablenames):
+                # initializing drops the rules of the tables
+                self._body_index = None
+            else:
+                facts = list(facts)
+                size = sum(len(target_theory.rules.facts.get(t, ()))
+                           for t in tablenames)
+                # propagating deltas is only worth it for small changes
+                events = target_theory.initialize_tables_events(
+                    tablenames, facts,
+                    max(size, len(facts)) // factset.FactSet.REBUILD_RATIO)
+                if events is not None:
+                    propagator = self._trigger_delta_propagator(
+                        table_triggers)
+        if propagator is None:
+            for table in table_triggers:
+                if table not in table_data_old:
+                    table_data_old[table] = (
+                        self.trigger_registry.contents[table])
+        else:
+            propagator.pre_update(events)
         # actually apply the updates
-        target_theory.initialize_tables(tablenames, facts)
+        if propagator is None:
+            target_theory.initialize_tables(tablenames, facts)
+        else:
+            target_theory.update(events)
+        if target_theory.kind != base.DATASOURCE_POLICY_TYPE:
+            self.rules_revision += 1
+        self._invalidate_table_rows(alltables)
         # rerun the trigger queries to check for changes
-        table_data_new = self._compute_table_contents(table_triggers)
+        if propagator is None:
+            table_data_new = self._compute_table_contents(table_triggers)
+        else:
+            table_data_new = self._compute_table_contents(
+                table_data_old.keys())
+            self._apply_trigger_deltas(table_triggers,
+                                       propagator.post_update(),
+                                       table_data_old, table_data_new)
+        self._cache_table_contents(table_data_new)
         # run triggers if tables changed
         for table, triggers in table_triggers.items():
             if table_data_old[table] != table_data_new[table]:
@@ -958,8 +1217,11 @@ class Runtime (object):
         tablename = self.get_tablename(policy_name, table_id)
         if not tablename:
             raise exception.NotFound("table '%s' doesn't exist" % table_id)
+        key = (tablename, policy_name, None)
+        if not trace and key in self.table_rows:
+            return self.table_rows[key]
 
-        queries = self.table_contents_queries(tablename, policy_name)
+        queries = self.table_contents_literals(tablename, policy_name)
         if queries is None:
             m = "Known table but unknown arity for '%s' in policy '%s'" % (
                 tablename, policy_name)
@@ -967,7 +1229,7 @@ class Runtime (object):
             raise exception.CongressException(m)
 
         gen_trace = None
-        query = self.parse1(queries[0])
+        query = queries[0]
         # LOG.debug("query: %s", query)
         result = self.select(query, target=policy_name,
                              trace=trace)
@@ -985,6 +1247,9 @@ class Runtime (object):
             d['data'] = [arg.name for arg in lit.arguments]
             results.append(d)
 
+        if self.cache_table_rows and self._cacheable_rows(tablename,
+                                                          policy_name):
+            self.table_rows[key] = results
         if trace:
             return results, gen_trace
         else:
@@ -1027,6 +1292,16 @@ class Runtime (object):
         else:
             return [modal + "[" + atom + "]"]
 
+    def table_contents_literals(self, tablename, policy, modal=None):
+        """Return list of literals yielding contents of TABLENAME in POLICY.
+
+        Same as table_contents_queries, but the queries are Literals.
+        """
+        arity = self.arity(tablename, policy, modal)
+        if arity is None:
+            return
+        return [compile.table_query(tablename, arity, modal)]
+
     def register_trigger(self, tablename, callback, policy=None, modal=None):
         """Register CALLBACK to run when table TABLENAME changes."""
         # calling self.get_target_name to check if policy actually exists
@@ -1227,18 +1502,24 @@ class Runtime (object):
         # update dependency graph (and undo it if errors)
         graph_changes = self.global_dependency_graph.formula_update(
             events, include_atoms=False)
-        if graph_changes:
-            if (self.global_dependency_graph.has_cycle() and
+        if graph_changes and self.global_dependency_graph.has_cycle():
+            # the graph only has the cycles allowed so far, so new cycles
+            #   go through the new edges
+            cycles = self.global_dependency_graph.cycles_through_edges(
+                [(change[1], change[2]) for change in graph_changes
+                 if change[0] == 'edge' and change[4]])
+            if (cycles and
                 (not z3types.Z3_AVAILABLE or
-                 z3theory.cycle_not_contained_in_z3(
-                     self.theory,
-                     self.global_dependency_graph.cycles()))):
+                 z3theory.cycle_not_contained_in_z3(self.theory, cycles))):
                 # TODO(thinrichs): include path
                 errors.append(exception.PolicyException(
                     "Rules are recursive"))
                 self.global_dependency_graph.undo_changes(graph_changes)
         if len(errors) > 0:
             return (False, errors)
+        rules_changed = self.trigger_registry.rules_changed(graph_changes)
+        if rules_changed:
+            self._body_index = None
         # modify execution triggers
         self._maintain_triggers()
         # figure out relevant triggers
@@ -1250,13 +1531,39 @@ class Runtime (object):
 
         # run queries on relevant triggers *before* applying changes
         table_triggers = self.trigger_registry.triggers_by_table(triggers)
-        table_data_old = self._compute_table_contents(table_triggers)
+        propagator = None
+        if self.incremental_triggers and not rules_changed:
+            propagator = self._trigger_delta_propagator(table_triggers)
+        if propagator is None:
+            table_data_old = self._compute_table_contents(table_triggers)
+        else:
+            # only tables without cached contents are computed in full
+            table_data_old = self._compute_table_contents(
+                [table for table in table_triggers
+                 if table not in self.trigger_registry.contents])
+            propagator.pre_update(events)
         # actually apply the updates
         changes = []
         for th, th_events in by_theory.items():
             changes.extend(self.get_target(th).update(events))
+        if any(self.get_target(th).kind != base.DATASOURCE_POLICY_TYPE
+               for th in by_theory):
+            self.rules_revision += 1
+        if rules_changed:
+            self._invalidate_table_rows()
+        else:
+            self._invalidate_table_rows(
+                self.trigger_registry.changed_tables(changes))
         # rerun the trigger queries to check for changes
-        table_data_new = self._compute_table_contents(table_triggers)
+        if propagator is None:
+            table_data_new = self._compute_table_contents(table_triggers)
+        else:
+            table_data_new = self._compute_table_contents(
+                table_data_old.keys())
+            self._apply_trigger_deltas(table_triggers,
+                                       propagator.post_update(),
+                                       table_data_old, table_data_new)
+        self._cache_table_contents(table_data_new)
         # run triggers if tables changed
         for table, triggers in table_triggers.items():
             if table_data_old[table] != table_data_new[table]:
@@ -1281,13 +1588,162 @@ class Runtime (object):
         data = {}   # dict from (table, policy) to set of query results
         for table, policy, modal in table_policy_pairs:
             th = self.get_target(policy)
-            queries = self.table_contents_queries(table, policy, modal) or []
+            queries = self.table_contents_literals(table, policy, modal) or []
             data[(table, policy, modal)] = set()
             for query in queries:
-                ans = set(self._select_obj(self.parse1(query), th, False))
+                ans = set(self._select_obj(query, th, False))
                 data[(table, policy, modal)] |= ans
         return data
 
+    def _cacheable_rows(self, table, policy):
+        """Return True if the rows of TABLE only change with the policies.
+
+        That is not the case when TABLE depends on a builtin without
+        inputs, such as now().
+        """
+        full_table = compile.Tablename.build_service_table(policy, table)
+        for dep in (self.global_dependency_graph.dependencies(full_table) or
+                    []):
+            built = builtin.builtin_registry.builtin(
+                compile.Tablename.parse_service_table(dep)[1])
+            if built is not None and built.num_inputs == 0:
+                return False
+        return True
+
+    def _invalidate_table_rows(self, tables=None):
+        """Drop the cached rows depending on the global names TABLES.
+
+        Drops all the cached rows if TABLES is None.
+        """
+        if not self.table_rows:
+            return
+        if tables is None:
+            self.table_rows = {}
+            return
+        dependents = self.global_dependency_graph.find_dependent_nodes(
+            tables)
+        for key in list(self.table_rows):
+            table, policy, modal = key
+            if (compile.Tablename.build_service_table(policy, table) in
+                    dependents):
+                del self.table_rows[key]
+
+    def _cache_table_contents(self, table_data):
+        """Remember trigger table contents for incremental evaluation."""
+        if not self.incremental_triggers:
+            return
+        for key, data in table_data.items():
+            if self._supports_incremental_triggers(key):
+                self.trigger_registry.contents[key] = data
+
+    def _supports_incremental_triggers(self, table_policy_modal):
+        """Return True if changes to the table can be computed from deltas.
+
+        Requires every policy the table depends on to be evaluated
+        top-down by a NonrecursiveRuleTheory.
+        """
+        table, policy, modal = table_policy_modal
+        if len(self.table_contents_literals(table, policy, modal) or []) != 1:
+            return False
+        full_table = compile.Tablename.build_service_table(policy, table)
+        deps = self.global_dependency_graph.dependencies(full_table)
+        for dep in deps or [full_table]:
+            th = self.theory.get(
+                compile.Tablename.parse_service_table(dep)[0])
+            if th is None:
+                continue
+            if (not isinstance(th, nonrecursive.NonrecursiveRuleTheory) or
+                    th.includes):
+                return False
+        return True
+
+    def _trigger_delta_propagator(self, table_triggers):
+        """Return a TriggerDeltaPropagator for the cached trigger tables.
+
+        Returns None if no relevant trigger table has cached contents.
+        """
+        cached = [key for key in table_triggers
+                  if key in self.trigger_registry.contents]
+        if not cached:
+            return None
+        if self._body_index is None:
+            self._body_index = self._compute_body_index()
+        targets = set(compile.Tablename.build_service_table(policy, table)
+                      for table, policy, modal in cached)
+        registry = self.trigger_registry
+        relevant = {}
+
+        def is_relevant(table):
+            if table not in relevant:
+                relevant[table] = any(
+                    (t.tablename, t.policy, t.modal) in registry.contents
+                    for t in registry.index.get(table, ()))
+            return relevant[table]
+
+        return TriggerDeltaPropagator(
+            self.theory, self._body_index, is_relevant, targets)
+
+    def _compute_body_index(self):
+        """Map each global tablename to the rule body literals using it."""
+        index = {}
+        for name, th in self.theory.items():
+            if not isinstance(th, nonrecursive.NonrecursiveRuleTheory):
+                continue
+            # th.rules.rules holds only rules with bodies, not facts
+            for table_rules in th.rules.rules.values():
+                for rule in table_rules:
+                    for position, lit in enumerate(rule.body):
+                        if lit.is_builtin():
+                            continue
+                        index.setdefault(lit.tablename(name), []).append(
+                            (name, rule, position))
+        return index
+
+    def _apply_trigger_deltas(self, table_triggers, patterns,
+                              table_data_old, table_data_new):
+        """Compute old/new contents of cached trigger tables from PATTERNS.
+
+        PATTERNS is the output of TriggerDeltaPropagator.post_update.
+        Only rows matching one of the patterns are re-queried; all other
+        rows are taken from the cached contents.
+        """
+        for key in table_triggers:
+            if key in table_data_old:
+                continue
+            old = self.trigger_registry.contents[key]
+            table, policy, modal = key
+            full_table = compile.Tablename.build_service_table(policy, table)
+            table_patterns = [args for pattern_modal, args
+                              in patterns.get(full_table, ())
+                              if pattern_modal == modal]
+            table_data_old[key] = old
+            if not table_patterns:
+                table_data_new[key] = old
+                continue
+            th = self.get_target(policy)
+            query = self.table_contents_literals(table, policy, modal)[0]
+            if any(all(arg is None for arg in args)
+                   for args in table_patterns):
+                table_data_new[key] = set(self._select_obj(query, th, False))
+                continue
+            new = set(old)
+            for args in table_patterns:
+                if len(args) != len(query.arguments):
+                    continue
+                pattern = query.plug(
+                    dict((var, arg) for var, arg in zip(query.arguments, args)
+                         if arg is not None))
+                if pattern.is_ground():
+                    new.discard(pattern)
+                else:
+                    new -= set(
+                        row for row in old
+                        if all(arg is None or arg == row_arg
+                               for arg, row_arg
+                               in zip(args, row.arguments)))
+                new |= set(self._select_obj(pattern, th, False))
+            table_data_new[key] = new
+
     def _group_events_by_target(self, events):
         """Return mapping of targets and events.
 
@@ -1330,11 +1786,8 @@ class Runtime (object):
 
     # select
     def _select_string(self, policy_string, theory, trace):
-        policy = self.parse(policy_string)
-        assert (len(policy) == 1), (
-            "Queries can have only 1 statement: {}".format(
-                [str(x) for x in policy]))
-        results = self._select_obj(policy[0], theory, trace)
+        query = compile.parse_query(policy_string)
+        results = self._select_obj(query, theory, trace)
         if trace:
             return (compile.formulas_to_string(results[0]), results[1])
         else:
@@ -1592,6 +2045,11 @@ class Runtime (object):
         changed = th_obj.update([compile.Event(formula=newdelta,
                                                insert=insert)])
         if changed:
+            if compile.is_atom(newdelta):
+                self._invalidate_table_rows(
+                    [newdelta.table.global_tablename(theory)])
+            else:
+                self._invalidate_table_rows()
             return delta.invert_update()
         else:
             return None
@@ -1890,6 +2348,16 @@ class DseRuntime (Runtime, data_service.DataService):
         self.last_policy_change = None
         self.policySubData = {}
         self.log_actions_only = cfg.CONF.enable_execute_action
+        self.incremental_triggers = cfg.CONF.incremental_trigger_evaluation
+        self.fact_storage = cfg.CONF.fact_storage
+        self.tabling = cfg.CONF.tabled_evaluation
+        self.materialized_maintenance = cfg.CONF.materialized_maintenance
+        self.cache_table_rows = cfg.CONF.cache_table_rows
+        self.update_batch_window = cfg.CONF.update_batch_window
+        self.update_batch_size = cfg.CONF.update_batch_size
+        # rows changed by the data deltas waiting for the batch window
+        self._update_batch = {}  # {(publisher, table, row) -> is_insert}
+        self._update_batch_timer = None
         self.add_rpc_endpoint(DseRuntimeEndpoints(self))
 
     def set_synchronizer(self):
@@ -2156,6 +2624,9 @@ class DseRuntime (Runtime, data_service.DataService):
         if not is_snapshot:
             to_add = data[0]
             to_del = data[1]
+            if self.update_batch_window > 0:
+                self._batch_data_update(publisher, table, to_add, to_del)
+                return
             result = []
             for row in to_del:
                 formula = compile.Literal.create_from_table_tuple(
@@ -2170,6 +2641,8 @@ class DseRuntime (Runtime, data_service.DataService):
             self.receive_data_update(publisher, table, result)
             return
 
+        # apply the deltas received before the snapshot first
+        self.flush_data_updates()
         # if empty data, assume it is an init msg, since noop otherwise
         if len(data) == 0:
             self.receive_data_full(publisher, table, data)
@@ -2181,6 +2654,64 @@ class DseRuntime (Runtime, data_service.DataService):
             else:
                 self.receive_data_full(publisher, table, data)
 
+    def _batch_data_update(self, publisher, table, to_add, to_del):
+        """Add the delta of TABLE to the batch of data updates.
+
+        The insertion and the deletion of the same row cancel each other.
+        The batch is applied once it changes update_batch_size rows, or
+        update_batch_window seconds after it started otherwise.
+        """
+        batch = self._update_batch
+        for rows, insert in ((to_del, False), (to_add, True)):
+            for row in rows:
+                if isinstance(row, list):
+                    row = tuple(row)
+                key = (publisher, table, row)
+                if batch.get(key, insert) != insert:
+                    del batch[key]
+                else:
+                    batch[key] = insert
+        if len(batch) >= self.update_batch_size:
+            self.flush_data_updates()
+        elif batch and self._update_batch_timer is None:
+            self._update_batch_timer = eventlet.spawn_after(
+                self.update_batch_window, self.flush_data_updates)
+
+    def flush_data_updates(self):
+        """Apply the batched data updates in a single update."""
+        if self._update_batch_timer is not None:
+            # no-op when called by the timer itself
+            self._update_batch_timer.cancel()
+            self._update_batch_timer = None
+        batch, self._update_batch = self._update_batch, {}
+        if not batch:
+            return
+        deletes = []
+        inserts = []
+        for (publisher, table, row), insert in batch.items():
+            formula = compile.Literal.create_from_table_tuple(
+                table, utils.tuple_to_congress(row))
+            event = compile.Event(formula=formula, insert=insert,
+                                  target=publisher)
+            (inserts if insert else deletes).append(event)
+        LOG.debug("applying a batch of %d data updates", len(batch))
+        (permitted, changes) = self.update(deletes + inserts)
+        if permitted:
+            return
+        # apply the updates of each table separately to keep the valid ones
+        LOG.warning("Batch of data updates not permitted: %s",
+                    '\n'.join(str(x) for x in changes))
+        by_table = {}
+        for event in deletes + inserts:
+            key = (event.target, event.formula.table.table)
+            by_table.setdefault(key, []).append(event)
+        for (publisher, table), events in by_table.items():
+            try:
+                self.receive_data_update(publisher, table, events)
+            except exception.CongressException:
+                LOG.exception("Failed to apply update of %s:%s",
+                              publisher, table)
+
     def receive_data_full(self, publisher, table, data):
         """Handler for when dataservice publishes full table."""
         LOG.debug("received full data msg for %s:%s. %s",
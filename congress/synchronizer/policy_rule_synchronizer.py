@@ -37,6 +37,11 @@ class PolicyRuleSynchronizer(object):
         self.sync_thread = None
         self.periodic_tasks = None
         self.node = node
+        # revisions of the rules in DB and in the engine when the rules
+        # were last synchronized, to skip synchronizing when nothing changed
+        self._synced_revisions = None
+        # dict from the id of each fact in DB to its normalized string
+        self._fact_strings = {}
 
     def start(self):
         callables = [(self.synchronize_all_policies, None, {}),
@@ -199,44 +204,57 @@ class PolicyRuleSynchronizer(object):
     def synchronize_rules_nonlocking(self, db_session=None):
         LOG.debug("Synchronizing rules on node %s", self.node.node_id)
         try:
+            # Read the revision before the rules, so that a change made in
+            # between is synchronized again next time.
+            revision = db_policy_rules.get_policy_rules_revision(
+                session=db_session)
+            if self._synced_revisions == (revision,
+                                          self.engine.rules_revision):
+                LOG.debug("rules unchanged since revision %d", revision)
+                return
+
             # Read rules from DB.
-            configured_rules = []
-            configured_facts = []
+            configured_rules = {}
+            configured_facts = set()
+            fact_strings = {}
             for r in db_policy_rules.get_policy_rules(session=db_session):
                 if ':-' in r.rule:  # if rule has body
-                    configured_rules.append({'rule': r.rule,
-                                             'id': r.id,
-                                             'comment': r.comment,
-                                             'name': r.name,
-                                             'policy_name': r.policy_name})
+                    configured_rules[r.id] = {'rule': r.rule,
+                                              'id': r.id,
+                                              'comment': r.comment,
+                                              'name': r.name,
+                                              'policy_name': r.policy_name}
                 else:  # head-only rule, ie., fact
-                    configured_facts.append(
-                        {'rule': self.engine.parse1(r.rule).pretty_str(),
-                         # note:parse to remove effect of extraneous formatting
-                         'policy_name': r.policy_name})
+                    # note:parse to remove effect of extraneous formatting
+                    fact = self._fact_strings.get(r.id)
+                    if fact is None:
+                        fact = self.engine.parse1(r.rule).pretty_str()
+                    fact_strings[r.id] = fact
+                    configured_facts.add((r.policy_name, fact))
+            self._fact_strings = fact_strings
 
             # Read rules from engine
             policies = {n: self.engine.policy_object(n) for n in
                         self.engine.policy_names()}
-            active_policy_rules = []
-            active_policy_facts = []
+            active_policy_rules = {}
+            active_policy_facts = set()
             for policy_name, policy in policies.items():
-                if policy.kind != base.DATASOURCE_POLICY_TYPE:
-                    for active_rule in policy.content():
-                        # FIXME: This assumes r.original_str is None iff
-                        # r is a head-only rule (fact). This works in
-                        # non-recursive policy but not in recursive policies
-                        if active_rule.original_str is None:
-                            active_policy_facts.append(
-                                {'rule': str(active_rule.head),
-                                 'policy_name': policy_name})
-                        else:
-                            active_policy_rules.append(
-                                {'rule': active_rule.original_str,
-                                 'id': active_rule.id,
-                                 'comment': active_rule.comment,
-                                 'name': active_rule.name,
-                                 'policy_name': policy_name})
+                if policy.kind == base.DATASOURCE_POLICY_TYPE:
+                    continue
+                for active_rule in policy.content():
+                    # FIXME: This assumes r.original_str is None iff
+                    # r is a head-only rule (fact). This works in
+                    # non-recursive policy but not in recursive policies
+                    if active_rule.original_str is None:
+                        active_policy_facts.add(
+                            (policy_name, str(active_rule.head)))
+                    else:
+                        active_policy_rules[active_rule.id] = {
+                            'rule': active_rule.original_str,
+                            'id': active_rule.id,
+                            'comment': active_rule.comment,
+                            'name': active_rule.name,
+                            'policy_name': policy_name}
 
             # ALEX: the Rule object does not have fields like the rule-string
             # or id or comment.  We can add those fields to the Rule object,
@@ -248,8 +266,8 @@ class PolicyRuleSynchronizer(object):
             changes = []
 
             # add configured rules
-            for r in configured_rules:
-                if r not in active_policy_rules:
+            for id_, r in configured_rules.items():
+                if active_policy_rules.get(id_) != r:
                     LOG.debug("adding rule %s", str(r))
                     parsed_rule = self.engine.parse1(r['rule'])
                     parsed_rule.set_id(r['id'])
@@ -263,18 +281,17 @@ class PolicyRuleSynchronizer(object):
                     changes.append(event)
 
             # add configured facts
-            for r in configured_facts:
-                if r not in active_policy_facts:
-                    LOG.debug("adding rule %s", str(r))
-                    parsed_rule = self.engine.parse1(r['rule'])
-                    event = compile.Event(formula=parsed_rule,
-                                          insert=True,
-                                          target=r['policy_name'])
-                    changes.append(event)
+            for policy_name, fact in configured_facts - active_policy_facts:
+                LOG.debug("adding rule %s in policy %s", fact, policy_name)
+                parsed_rule = self.engine.parse1(fact)
+                event = compile.Event(formula=parsed_rule,
+                                      insert=True,
+                                      target=policy_name)
+                changes.append(event)
 
             # remove active rules not configured
-            for r in active_policy_rules:
-                if r not in configured_rules:
+            for id_, r in active_policy_rules.items():
+                if configured_rules.get(id_) != r:
                     LOG.debug("removing rule %s", str(r))
                     parsed_rule = self.engine.parse1(r['rule'])
                     parsed_rule.set_id(r['id'])
@@ -288,17 +305,19 @@ class PolicyRuleSynchronizer(object):
                     changes.append(event)
 
             # remove active facts not configured
-            for r in active_policy_facts:
-                if r not in configured_facts:
-                    LOG.debug("removing rule %s", str(r))
-                    parsed_rule = self.engine.parse1(r['rule'])
-                    event = compile.Event(formula=parsed_rule,
-                                          insert=False,
-                                          target=r['policy_name'])
-                    changes.append(event)
+            for policy_name, fact in active_policy_facts - configured_facts:
+                LOG.debug("removing rule %s in policy %s", fact, policy_name)
+                parsed_rule = self.engine.parse1(fact)
+                event = compile.Event(formula=parsed_rule,
+                                      insert=False,
+                                      target=policy_name)
+                changes.append(event)
 
             permitted, changes = self.engine.process_policy_update(changes)
             LOG.info("synchronize_rules, permitted %d, made %d changes on "
                      "node %s", permitted, len(changes), self.node.node_id)
+            if permitted:
+                self._synced_revisions = (revision,
+                                          self.engine.rules_revision)
         except Exception:
             LOG.exception("synchronizing rules failed")
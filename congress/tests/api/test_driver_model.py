@@ -70,6 +70,7 @@ class TestDriverModel(base.SqlTestCase):
                 "auth_url": "required",
                 "endpoint": "(optional)",
                 "password": "required",
+                "poll_concurrency": "(optional)",
                 "poll_time": "(optional)",
                 "region": "(optional)",
                 'project_domain_name': '(optional)',
@@ -0,0 +1,137 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import mock
+
+from congress.datalog import base as datalog_base
+from congress.datalog import bottomup
+from congress.policy_engines import agnostic
+from congress.tests import base
+from congress.tests import helper
+
+BU_THEORY = 'bottom-up theory'
+NREC_THEORY = 'non-recursive theory'
+OTHER_THEORY = 'other'
+
+
+class TestBottomUp(base.TestCase):
+    def prep_runtime(self, code, other_code=''):
+        """Load CODE into a bottom-up and a non-recursive policy."""
+        run = agnostic.Runtime()
+        run.create_policy(BU_THEORY, kind=datalog_base.BOTTOMUP_POLICY_TYPE)
+        run.create_policy(NREC_THEORY,
+                          kind=datalog_base.NONRECURSIVE_POLICY_TYPE)
+        run.create_policy(OTHER_THEORY,
+                          kind=datalog_base.NONRECURSIVE_POLICY_TYPE)
+        if other_code:
+            run.insert(other_code, target=OTHER_THEORY)
+        run.insert(code, target=BU_THEORY)
+        run.insert(code, target=NREC_THEORY)
+        return run
+
+    def check(self, run, query, correct, msg):
+        """Check both policies answer QUERY with CORRECT."""
+        self.assertTrue(helper.datalog_equal(
+            run.select(query, BU_THEORY), correct, msg))
+        self.assertTrue(helper.datalog_equal(
+            run.select(query, NREC_THEORY), correct, msg))
+
+    def test_policy_kind(self):
+        run = self.prep_runtime('')
+        self.assertIsInstance(run.policy_object(BU_THEORY),
+                              bottomup.BottomUpTheory)
+        self.assertEqual(datalog_base.BOTTOMUP_POLICY_TYPE,
+                         run.policy_object(BU_THEORY).kind)
+
+    def test_joins(self):
+        code = ('r(1, 2) r(2, 3) r(3, 3) s(2, 5) s(3, 6) t(3) '
+                'p(x, z) :- r(x, y), s(y, z) '
+                'q(x) :- r(x, x) '
+                'u(x, 6) :- r(x, 3), s(3, 6) '
+                'v(x) :- p(x, y), t(x)')
+        run = self.prep_runtime(code)
+        self.check(run, 'p(x, y)', 'p(1, 5) p(2, 6) p(3, 6)', 'Join')
+        self.check(run, 'p(2, y)', 'p(2, 6)', 'Join with constant')
+        self.check(run, 'q(x)', 'q(3)', 'Repeated variable')
+        self.check(run, 'u(x, y)', 'u(2, 6) u(3, 6)', 'Constants')
+        self.check(run, 'v(x)', 'v(3)', 'Derived body table')
+        self.check(run, 'a(x, y) :- p(x, y), t(x)',
+                   'a(3, 6) :- p(3, 6), t(3)', 'Rule query')
+
+    def test_multiple_rules(self):
+        code = ('r(1) s(2) '
+                'p(x) :- r(x) '
+                'p(x) :- s(x) '
+                'p(3) '
+                'p(x) :- r(x), s(x)')
+        run = self.prep_runtime(code)
+        self.check(run, 'p(x)', 'p(1) p(2) p(3)', 'Multiple rules')
+
+    def test_negation(self):
+        code = ('r(1) r(2) r(3) s(2) t(3, 4) '
+                'p(x) :- r(x), not s(x) '
+                'q(x) :- r(x), not p(x) '
+                'w(x) :- r(x), not t(x, 4)')
+        run = self.prep_runtime(code)
+        self.check(run, 'p(x)', 'p(1) p(3)', 'Negation')
+        self.check(run, 'q(x)', 'q(2)', 'Negated derived table')
+        self.check(run, 'w(x)', 'w(1) w(2)', 'Negation with constant')
+
+    def test_builtins(self):
+        code = ('r(1, 2) r(3, 4) r(5, 5) '
+                'p(x, z) :- r(x, y), plus(x, y, z) '
+                'q(x) :- r(x, y), lt(x, y) '
+                'u(x) :- r(x, y), plus(x, 1, y)')
+        run = self.prep_runtime(code)
+        self.check(run, 'p(x, y)', 'p(1, 3) p(3, 7) p(5, 10)', 'Builtin')
+        self.check(run, 'q(x)', 'q(1) q(3)', 'Boolean builtin')
+        self.check(run, 'u(x)', 'u(1) u(3)', 'Bound builtin output')
+
+    def test_other_policies(self):
+        code = ('p(x) :- %(other)s:r(x), not %(other)s:s(x) '
+                'q(x) :- %(other)s:u(x) '
+                'w(x) :- p(x), unknown:r(x)' % {'other': OTHER_THEORY})
+        run = self.prep_runtime(code, 'r(1) r(2) s(2) t(5) u(x) :- t(x)')
+        self.check(run, 'p(x)', 'p(1)', 'Other policy')
+        self.check(run, 'q(x)', 'q(5)', 'Rules of other policy')
+        self.check(run, 'w(x)', '', 'Unknown policy')
+
+    def test_find_one(self):
+        run = self.prep_runtime('r(1) r(2) p(x) :- r(x)')
+        self.assertEqual(
+            1, len(run.policy_object(BU_THEORY).select(
+                helper.str2form('p(x)'), find_all=False)))
+
+    def test_updates(self):
+        run = self.prep_runtime('r(1) r(2) p(x) :- r(x)')
+        self.check(run, 'p(x)', 'p(1) p(2)', 'Before update')
+        run.delete('r(1)', target=BU_THEORY)
+        run.delete('r(1)', target=NREC_THEORY)
+        run.insert('r(3)', target=BU_THEORY)
+        run.insert('r(3)', target=NREC_THEORY)
+        self.check(run, 'p(x)', 'p(2) p(3)', 'After update')
+
+    def test_top_down_fallback(self):
+        run = self.prep_runtime('r(1) p(x) :- r(x)')
+        policy = run.policy_object(BU_THEORY)
+        with mock.patch.object(policy, '_join', wraps=policy._join) as join:
+            self.check(run, 'p(x)', 'p(1)', 'Bottom-up')
+            self.assertTrue(join.called)
+        run.debug_mode()
+        with mock.patch.object(policy, '_join', wraps=policy._join) as join:
+            self.check(run, 'p(x)', 'p(1)', 'Traced')
+            self.assertFalse(join.called)
@@ -18,6 +18,10 @@ from __future__ import division
 from __future__ import absolute_import
 
 import copy
+import time
+
+from oslo_log import log as logging
+from six.moves import range
 
 from congress import data_types
 from congress.datalog import analysis
@@ -29,6 +33,8 @@ from congress.policy_engines import agnostic
 from congress.tests import base
 from congress.tests import helper
 
+LOG = logging.getLogger(__name__)
+
 
 class TestParser(base.TestCase):
 
@@ -167,6 +173,104 @@ class TestParser(base.TestCase):
         self.assertRaises(exception.PolicyException, compile.parse1,
                           'insert[nonexistent[p(x)] :- q(x)]')
 
+    def test_parse_query(self):
+        query = compile.parse_query('nova:p(x, 1)')
+        self.assertEqual(compile.parse1('nova:p(x, 1)'), query)
+        self.assertIs(query, compile.parse_query('nova:p(x, 1)'))
+        self.assertEqual(
+            compile.parse1('nova:p(x, 1)', use_modules=False),
+            compile.parse_query('nova:p(x, 1)', use_modules=False))
+        self.assertEqual(compile.parse1('p(x) :- q(x)'),
+                         compile.parse_query('p(x) :- q(x)'))
+        self.assertRaises(exception.PolicyException, compile.parse_query,
+                          'p(x) q(x)')
+        self.assertRaises(exception.PolicyException, compile.parse_query,
+                          'p(x')
+
+    def test_parse_query_cache_size(self):
+        self.patch(compile, '_query_cache', type(compile._query_cache)())
+        self.patch(compile, 'QUERY_CACHE_SIZE', 2)
+        p = compile.parse_query('p(x)')
+        q = compile.parse_query('q(x)')
+        self.assertIs(p, compile.parse_query('p(x)'))
+        compile.parse_query('r(x)')
+        self.assertIs(p, compile.parse_query('p(x)'))
+        self.assertIsNot(q, compile.parse_query('q(x)'))
+        self.assertEqual(2, len(compile._query_cache))
+
+    def test_table_query(self):
+        self.assertEqual(compile.parse1('p(x0, x1)'),
+                         compile.table_query('p', 2))
+        self.assertEqual(compile.parse1('nova:p(x0)'),
+                         compile.table_query('nova:p', 1))
+        self.assertEqual(compile.parse1('execute[nova:p(x0)]'),
+                         compile.table_query('nova:p', 1, modal='execute'))
+        self.assertEqual(compile.parse1('nova:p()', use_modules=False),
+                         compile.table_query('nova:p', 0, use_modules=False))
+
+    def _antlr_parse(self, string, use_modules=True):
+        syntax = compile.DatalogSyntax(use_modules=use_modules)
+        return syntax.convert_to_congress(
+            syntax.parse_file(string, input_string=True))
+
+    def _term_locations(self, formula):
+        if isinstance(formula, compile.Event):
+            formula = formula.formula
+        if isinstance(formula, compile.Rule):
+            literals = formula.heads + formula.body
+        else:
+            literals = [formula]
+        return [(term.location.line, term.location.col)
+                for lit in literals
+                for term in (list(lit.arguments) +
+                             list(lit.named_arguments.values()))]
+
+    def check_fast_parser(self, string, use_modules=True):
+        fast = compile.FastDatalogSyntax(use_modules).parse(string)
+        antlr = self._antlr_parse(string, use_modules)
+        self.assertEqual([str(x) for x in antlr], [str(x) for x in fast],
+                         string)
+        for antlr_formula, fast_formula in zip(antlr, fast):
+            self.assertEqual(type(antlr_formula), type(fast_formula), string)
+            self.assertEqual(self._term_locations(antlr_formula),
+                             self._term_locations(fast_formula), string)
+
+    def test_fast_parser(self):
+        self.check_fast_parser('')
+        self.check_fast_parser('  // comment\n# comment\n/* comment */ ')
+        self.check_fast_parser('p(x, 1, 20, 2.5, 1e3, 0.25, "a b", \'c\')')
+        self.check_fast_parser('p(x) :- q(x), not r(x), !s(x). t(1); u')
+        self.check_fast_parser('p(x,y) :-\n  nova:servers(id=x, 1=y),\n'
+                               '  NOT neutron:ports:fixed_ips(x)')
+        self.check_fast_parser('p+(x) :- q-(x), nova:r+(x)')
+        self.check_fast_parser('execute[nova:servers.pause(x)] :- '
+                               'q(x), execute[r(x)]')
+        self.check_fast_parser('insert[p(x)] :- q(x)')
+        self.check_fast_parser('insert[p(x) :- q(x)]')
+        self.check_fast_parser('delete[p(x) :- execute[q(x)]; "policy"]')
+        self.check_fast_parser('nova:p(x)', use_modules=False)
+        self.check_fast_parser('p(a.b, "\\"q\\"") :- q(a.b)')
+
+    def test_fast_parser_unsupported(self):
+        for string in ['p(1.)', 'p(.5)', 'p(00)', "p(u'a')", "p('a' 'b')",
+                       "p('a''b')", 'p("""a""")', 'p :- q(x).r(x)', 'p(0x1f)',
+                       'p # comment', 'p(x', 'p#', 'p(1, x=1, y)',
+                       'p(x=1, x=2)', 'p(x, 0=1)', 'p(x), q(x)',
+                       'not p(x)', 'insert[p(x) :- q(x)', 'p(x) :- insert']:
+            self.assertRaises(compile.FastDatalogSyntax.Unsupported,
+                              compile.FastDatalogSyntax().parse, string)
+
+    def test_fast_parser_fallback(self):
+        self.assertEqual([str(x) for x in self._antlr_parse("p(u'a', .5)")],
+                         [str(x) for x in compile.parse("p(u'a', .5)")])
+        self.assertRaisesRegex(exception.PolicyException, 'Lex failure',
+                               compile.parse, 'p#')
+        self.assertRaisesRegex(exception.PolicyException, 'Parse failure',
+                               compile.parse, 'p(x')
+        self.assertRaisesRegex(exception.PolicyException,
+                               'multiple values for column name',
+                               compile.parse, 'p(x=1, x=2)')
+
 
 class TestColumnReferences(base.TestCase):
 
@@ -786,6 +890,34 @@ class TestCompiler(base.TestCase):
                               't(x) :- p(x)')
         self.assertFalse(compile.is_stratified(rules))
 
+    def test_reorder_for_cost(self):
+        sizes = {'big': 1000, 'medium': 200, 'small': 10, 'tiny': 1}
+
+        def estimate(lit, bound_positions):
+            if lit.table.table not in sizes:
+                return None
+            return sizes[lit.table.table] * 0.1 ** len(bound_positions)
+
+        def check(rule, bound_vars, correct):
+            rule = compile.parse1(rule)
+            body = compile.reorder_for_cost(rule.body, bound_vars, estimate)
+            self.assertEqual(compile.parse1(correct).body, body)
+
+        check('p(x) :- big(x, y), small(y)', [], 'p(x) :- small(y), big(x, y)')
+        check('p(x) :- big(x, y), medium(y)', [],
+              'p(x) :- medium(y), big(x, y)')
+        check('p(x) :- medium(y), big(x, y)', ['x'],
+              'p(x) :- big(x, y), medium(y)')
+        check('p(x) :- big(x, y), tiny(z), small(y)', [],
+              'p(x) :- tiny(z), small(y), big(x, y)')
+        # derived tables, negations and builtins stay in place
+        check('p(x) :- big(x, y), q(y), small(y)', [],
+              'p(x) :- big(x, y), q(y), small(y)')
+        check('p(x) :- big(x, y), small(y), not q(x), tiny(x), big(x, z)', [],
+              'p(x) :- small(y), big(x, y), not q(x), tiny(x), big(x, z)')
+        check('p(x) :- big(x, y), small(z), lt(y, z)', [],
+              'p(x) :- small(z), big(x, y), lt(y, z)')
+
 
 class TestDependencyGraph(base.TestCase):
 
@@ -992,3 +1124,23 @@ class TestSchema(base.TestCase):
                          test_schema.types('p'))
         self.assertEqual([(data_types.Str, True), (data_types.Scalar, False)],
                          test_schema.types('q'))
+
+
+class BenchmarkParser(base.Benchmark):
+    """Compare the Datalog parsers on a large policy."""
+
+    def test_benchmark_parse(self):
+        policy = '\n'.join(
+            'error%d(vm, "bad") :- nova:servers(id=vm, name=n, host_id=h), '
+            'not neutronv2:ports(device_id=vm), p%d(h, %d, 2.5), '
+            'execute[nova:servers.pause(vm)]' % (i, i, i)
+            for i in range(2000))
+        start = time.time()
+        fast = compile.parse(policy)
+        parsed = time.time()
+        self.patch(compile, 'FAST_PARSER', False)
+        antlr = compile.parse(policy)
+        done = time.time()
+        LOG.info("Parsed %d rules in %.3fs, and in %.3fs with ANTLR",
+                 len(fast), parsed - start, done - parsed)
+        self.assertEqual([str(x) for x in antlr], [str(x) for x in fast])
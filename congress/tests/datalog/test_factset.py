@@ -16,6 +16,7 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 
+from congress.datalog import compile
 from congress.datalog import factset
 from congress.tests import base
 
@@ -74,6 +75,29 @@ class TestFactSet(base.TestCase):
         self.assertEqual(0, len(self.factset))
         self.assertEqual(set(), self.factset.find(((1, 200),)))
 
+    def test_replace(self):
+        f1 = (1, 200, 'a')
+        f2 = (2, 200, 'a')
+        f3 = (3, 200, 'c')
+        self.factset.add(f1)
+        self.factset.add(f2)
+        self.factset.create_index((2,))
+
+        self.assertEqual((set([f3]), set([f1])),
+                         self.factset.difference([f2, f3]))
+        self.assertEqual(2, len(self.factset))
+        self.assertEqual((set([f3]), set([f1])),
+                         self.factset.replace([f2, f3, f3]))
+        self.assertEqual(set([f2, f3]), set(self.factset))
+        self.assertNotIn(f1, self.factset)
+        self.assertEqual(set([f2]), self.factset.find(((2, 'a'),)))
+        self.assertEqual(set([f3]), self.factset.find(((2, 'c'),)))
+        self.assertEqual([(2,)], self.factset.indexes())
+
+        self.assertEqual((set(), set([f2, f3])), self.factset.replace([]))
+        self.assertEqual(0, len(self.factset))
+        self.assertEqual(set(), self.factset.find(((2, 'a'),)))
+
     def test_create_index(self):
         f1 = (1, 200, 'a')
         f2 = (2, 200, 'a')
@@ -151,3 +175,81 @@ class TestFactSet(base.TestCase):
         iterations = []
         self.assertEqual(set([f1]), self.factset.find(((0, 1),), iterations))
         self.assertEqual(3, iterations[0])
+
+    def test_index_stats(self):
+        f1 = (1, 200, 'a')
+        f2 = (2, 200, 'a')
+        f3 = (3, 200, 'c')
+        self.factset.add(f1)
+        self.factset.add(f2)
+        self.factset.add(f3)
+        self.assertEqual({}, self.factset.index_stats())
+
+        self.factset.create_index((2,))
+        self.factset.find(((2, 'a'),))
+        self.factset.find(((2, 'b'),))
+        self.factset.find(((0, 1),))
+        self.assertEqual([(2,)], self.factset.indexes())
+        self.assertEqual({(2,): {'keys': 2, 'entries': 3, 'hits': 2}},
+                         self.factset.index_stats())
+
+        self.factset.remove_index((2,))
+        self.assertEqual({}, self.factset.index_stats())
+
+    def test_estimate_selectivity(self):
+        self.assertEqual(1.0, self.factset.estimate_selectivity((0,)))
+        for i in range(100):
+            self.factset.add((i, i % 2 == 0, i % 10))
+        self.assertEqual(0.01, self.factset.estimate_selectivity((0,)))
+        self.assertEqual(0.5, self.factset.estimate_selectivity((1,)))
+        self.assertEqual(0.1, self.factset.estimate_selectivity((2,)))
+        self.assertEqual(0.1, self.factset.estimate_selectivity((1, 2)))
+        self.assertEqual(
+            0.5, self.factset.estimate_selectivity((0,), sample_size=2))
+
+
+class TestArrayFactSet(TestFactSet):
+    def setUp(self):
+        super(TestArrayFactSet, self).setUp()
+        self.interner = factset.ValueInterner()
+        self.factset = factset.ArrayFactSet(self.interner)
+
+    def test_facts(self):
+        f1 = compile.Fact('p', (1, 'a'))
+        f2 = compile.Fact('p', (2, 'a'))
+        self.assertTrue(self.factset.add(f1))
+        self.assertTrue(self.factset.add(f2))
+        self.assertFalse(self.factset.add(compile.Fact('p', (1, 'a'))))
+        self.assertIn(compile.Fact('p', (2, 'a')), self.factset)
+        self.assertEqual(set([f1, f2]), set(self.factset))
+        self.assertEqual(set([f2]), self.factset.find(((0, 2),)))
+        self.assertRaises(ValueError, self.factset.add,
+                          compile.Fact('p', (1,)))
+
+    def test_typed_values(self):
+        self.factset.add((1, 'a'))
+        self.assertNotIn((1.0, 'a'), self.factset)
+        self.assertNotIn((True, 'a'), self.factset)
+        self.assertNotIn(('1', 'a'), self.factset)
+        self.assertEqual(set(), self.factset.find(((0, 1.0),)))
+        self.assertTrue(self.factset.add((1.0, 'a')))
+        self.assertEqual(set([(1.0, 'a')]), self.factset.find(((0, 1.0),)))
+
+    def test_interning(self):
+        self.factset.add((1, 'a'))
+        self.factset.add((2, 'a'))
+        self.assertEqual(3, len(self.interner))
+        self.factset.remove((1, 'a'))
+        self.assertEqual(2, len(self.interner))
+        self.assertIsNone(self.interner.lookup(1))
+        self.factset.remove((2, 'a'))
+        self.assertEqual(0, len(self.interner))
+
+        # freed rows and ids are reused
+        self.factset.create_index((1,))
+        self.factset.add((3, 'b'))
+        self.factset.add((4, 'b'))
+        self.assertEqual(set([(3, 'b'), (4, 'b')]),
+                         self.factset.find(((1, 'b'),)))
+        self.assertEqual(set([(3, 'b'), (4, 'b')]), set(self.factset))
+        self.assertEqual(3, len(self.interner))
@@ -21,6 +21,7 @@ from oslo_log import log as logging
 
 from congress.datalog import base as datalog_base
 from congress.datalog import compile
+from congress.datalog import materialized
 from congress.policy_engines import agnostic
 from congress.tests import base
 from congress.tests import helper
@@ -34,6 +35,8 @@ DB_THEORY = 'database test theory'
 class TestRuntime(base.TestCase):
     """Tests for Runtime that are not specific to any theory."""
 
+    maintenance = materialized.MaterializedViewTheory.PROOFS
+
     def prep_runtime(self, code=None, msg=None, target=None):
         # compile source
         if msg is not None:
@@ -43,6 +46,7 @@ class TestRuntime(base.TestCase):
         if target is None:
             target = MAT_THEORY
         run = agnostic.Runtime()
+        run.materialized_maintenance = self.maintenance
         run.create_policy(MAT_THEORY,
                           kind=datalog_base.MATERIALIZED_POLICY_TYPE)
         run.create_policy(DB_THEORY,
@@ -535,3 +539,69 @@ class TestRuntime(base.TestCase):
             run, 'p(2,3) p(3,4) p(4,5)'
             'q(2,3) q(3,4) q(2,4) q(4,5) q(3,5) q(2,5)',
             'Delete from recursive rules')
+
+    def test_batch_update(self):
+        """Test propagating many changes to the same table at once."""
+        code = ("q(x, z) :- p(x, y), r(y, z), not s(x) "
+                "t(x) :- q(x, z), lt(z, 5)")
+        run = self.prep_runtime(code)
+        events = [compile.Event(helper.str2form('r(%d, %d)' % (i, i + 1)))
+                  for i in range(10)]
+        events.extend(compile.Event(helper.str2form('p(%d, %d)' % (i, i)))
+                      for i in range(10))
+        events.append(compile.Event(helper.str2form('s(2)')))
+        run.update(events, MAT_THEORY)
+        self.check_class(
+            run, 'q(0, 1) q(1, 2) q(3, 4) q(4, 5) q(5, 6) q(6, 7) q(7, 8) '
+            'q(8, 9) q(9, 10) t(0) t(1) t(3)',
+            'Insert batches', tablenames=['q', 't'])
+
+        events = [compile.Event(helper.str2form('p(%d, %d)' % (i, i)),
+                                insert=False)
+                  for i in range(0, 10, 2)]
+        events.append(compile.Event(helper.str2form('s(2)'), insert=False))
+        events.append(compile.Event(helper.str2form('s(3)')))
+        run.update(events, MAT_THEORY)
+        self.check_class(
+            run, 'q(1, 2) q(5, 6) q(7, 8) q(9, 10) t(1)',
+            'Delete batches', tablenames=['q', 't'])
+
+    def test_batch_duplicates(self):
+        """Test batches that insert and delete the same rows."""
+        run = self.prep_runtime("q(x) :- p(x, y)")
+        run.update([compile.Event(helper.str2form('p(1, 2)')),
+                    compile.Event(helper.str2form('p(1, 2)')),
+                    compile.Event(helper.str2form('p(1, 3)'))], MAT_THEORY)
+        self.check_class(run, 'p(1, 2) p(1, 3) q(1)', 'Duplicate insert')
+        run.update([compile.Event(helper.str2form('p(1, 2)'), insert=False),
+                    compile.Event(helper.str2form('p(1, 2)'), insert=False)],
+                   MAT_THEORY)
+        self.check_class(run, 'p(1, 3) q(1)', 'Duplicate delete')
+        run.theory[MAT_THEORY].update(
+            [compile.Event(helper.str2form('p(1, 3)'), insert=False),
+             compile.Event(helper.str2form('p(1, 3)'))])
+        self.check_class(run, 'p(1, 3) q(1)', 'Delete then insert')
+
+
+class TestCountingRuntime(TestRuntime):
+    """Run the tests for Runtime with counting maintenance."""
+
+    maintenance = materialized.MaterializedViewTheory.COUNTING
+
+    def test_counts(self):
+        run = self.prep_runtime("q(x) :- p(x, y)")
+        run.insert('p(1, 2)', MAT_THEORY)
+        run.insert('p(1, 3)', MAT_THEORY)
+        policy = run.theory[MAT_THEORY]
+        self.assertEqual({helper.str2form('q(1)'): 2}, policy.counts)
+        run.delete('p(1, 2)', MAT_THEORY)
+        self.assertEqual({helper.str2form('q(1)'): 1}, policy.counts)
+        run.delete('p(1, 3)', MAT_THEORY)
+        self.assertEqual({}, policy.counts)
+
+    def test_recursion_error(self):
+        policy = materialized.MaterializedViewTheory(name=MAT_THEORY)
+        policy.set_maintenance(policy.COUNTING)
+        errors = policy.update_would_cause_errors(
+            [compile.Event(helper.str2form('q(x) :- q(y), p(x, y)'))])
+        self.assertEqual(1, len(errors))
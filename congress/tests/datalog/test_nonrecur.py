@@ -17,6 +17,7 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 
+import mock
 from oslo_log import log as logging
 
 from congress.datalog import base as datalog_base
@@ -65,6 +66,108 @@ class TestRuntime(base.TestCase):
         ans = 'p(5)'
         self.check_equal(run.select('p(5)', th), ans, 'Indexing')
 
+    def test_index_stats(self):
+        th = NREC_THEORY
+        run = self.prep_runtime('')
+        for i in range(10):
+            run.insert('r(%d)' % i, th)
+        run.insert('s(5)', th)
+        run.insert('p(x) :- s(x), r(x)', th)
+        self.check_equal(run.select('p(x)', th), 'p(5)', 'Indexing')
+        stats = run.policy_object(th).index_stats()
+        self.assertEqual({'facts': 10,
+                          'indexes': {(0,): {'keys': 10, 'entries': 10,
+                                             'hits': 1}}},
+                         stats['r'])
+        self.assertEqual({'facts': 1, 'indexes': {}}, stats['s'])
+
+        run.insert('r(1)', DB_THEORY)
+        self.assertEqual({'r': {'facts': 1, 'indexes': {}}},
+                         run.policy_object(DB_THEORY).index_stats())
+
+    def test_join_plan(self):
+        th = NREC_THEORY
+        run = self.prep_runtime('p(x) :- r(x, y), s(y)')
+        for i in range(20):
+            run.insert('r(%d, %d)' % (i, i % 5), th)
+        run.insert('s(3)', th)
+        run.insert('s(4)', th)
+        ans = 'p(3) p(8) p(13) p(18) p(4) p(9) p(14) p(19)'
+        self.check_equal(run.select('p(x)', th), ans, 'Join order')
+        theory = run.policy_object(th)
+        rule = compile.parse1('p(x) :- r(x, y), s(y)')
+        plan, cardinalities = theory.join_plans[rule][()]
+        self.assertEqual(compile.parse1('p(x) :- s(y), r(x, y)').body, plan)
+        self.assertEqual([20, 2], cardinalities)
+
+        # plans are per set of bound head arguments
+        self.check_equal(run.select('p(8)', th), 'p(8)', 'Bound join order')
+        plan, _ = theory.join_plans[rule][(0,)]
+        self.assertEqual(rule.body, plan)
+
+        # plans are recomputed once cardinalities shift
+        for i in range(40):
+            run.insert('s(%d)' % (i + 100), th)
+        self.check_equal(run.select('p(x)', th), ans, 'Join order')
+        plan, cardinalities = theory.join_plans[rule][()]
+        self.assertEqual(rule.body, plan)
+        self.assertEqual([20, 42], cardinalities)
+
+        # plans are dropped with their rules
+        run.delete('p(x) :- r(x, y), s(y)', th)
+        self.assertNotIn(rule, theory.join_plans)
+
+    def test_tabling(self):
+        th = NREC_THEORY
+        code = ('q(x) :- r(x, y), s(y) '
+                'p(x, z) :- t(x, y), q(y), t(y, z) '
+                'p(x, x) :- t(x, y), not q(y) '
+                'u(x) :- t(x, x), q(x) '
+                'r(1, 2) r(2, 3) r(3, 3) s(3) '
+                't(1, 1) t(2, 1) t(2, 2) t(1, 2) t(3, 3)')
+        queries = ['q(x)', 'p(x, y)', 'p(x, x)', 'p(2, y)', 'u(x)']
+        run = self.prep_runtime(code)
+        expected = [run.select(query, th) for query in queries]
+        theory = run.policy_object(th)
+        theory.tabling = True
+        with mock.patch.object(theory, '_subgoal_answers',
+                               wraps=theory._subgoal_answers) as answers:
+            for query, ans in zip(queries, expected):
+                self.check_equal(run.select(query, th), ans, query)
+            answers.reset_mock()
+            self.check_equal(run.select('p(x, y)', th), expected[1],
+                             'Tabled')
+            # each subgoal is proven once per query
+            self.assertEqual(['q(1)', 'q(2)', 'q(3)'],
+                             sorted(str(c[0][0])
+                                    for c in answers.call_args_list))
+            # answers are still found once the tables are full
+            theory.MAX_TABLED_ANSWERS = 0
+            self.check_equal(run.select('p(x, y)', th), expected[1],
+                             'Full tables')
+        self.assertEqual(
+            set(compile.parse('p(1, 2) p(2, 2) p(2, 1) p(1, 1) p(3, 3)')),
+            set(compile.parse(expected[1])))
+
+    def test_tabling_multiple_policies(self):
+        run = agnostic.Runtime()
+        run.create_policy('A')
+        run.create_policy('B')
+        run.insert('q(x) :- r(x) r(2)', 'B')
+        run.insert('q(x) :- r(x) r(1) '
+                   't(x) :- B:q(x) t(x) :- q(x) u(x) :- t(x)', 'A')
+        expected = run.select('u(x)', 'A')
+        self.check_equal(expected, 'u(1) u(2)', 'Not tabled')
+        run.policy_object('A').tabling = True
+        self.check_equal(run.select('u(x)', 'A'), expected,
+                         'Same table in two policies')
+        # the policies reached by a query only table if they are enabled
+        policy = run.policy_object('B')
+        with mock.patch.object(policy, '_top_down_tabled') as tabled:
+            self.check_equal(run.select('u(x)', 'A'), expected,
+                             'Policy without tabling')
+            self.assertFalse(tabled.called)
+
     def test_insert(self):
         """Test ability to insert/delete sentences."""
         th = NREC_THEORY
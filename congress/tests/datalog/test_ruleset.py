@@ -17,6 +17,7 @@ from __future__ import division
 from __future__ import absolute_import
 
 from congress.datalog import compile
+from congress.datalog import factset
 from congress.datalog import ruleset
 from congress.tests import base
 
@@ -197,3 +198,113 @@ class TestRuleSet(base.TestCase):
         nonequiv_rule = compile.parse1('p(x) :- r(x)')
         self.assertFalse(self.ruleset.contains('p', nonequiv_fact))
         self.assertFalse(self.ruleset.contains('p', nonequiv_rule))
+
+    def test_get_facts(self):
+        fact1 = compile.Fact('p', (1, 2, 3))
+        fact2 = compile.Fact('p', (1, 4, 5))
+        rule = compile.parse1('p(x, y, z) :- q(x, y, z)')
+        self.ruleset.add_rule('p', fact1)
+        self.ruleset.add_rule('p', fact2)
+        self.ruleset.add_rule('p', rule)
+
+        self.assertEqual(set([fact1, fact2]),
+                         set(self.ruleset.get_facts('p')))
+        self.assertEqual(
+            [fact2], self.ruleset.get_facts('p', compile.parse1('p(x, 4, z)')))
+        self.assertEqual(set([fact1, fact2]), set(
+            self.ruleset.get_facts('p', compile.parse1('p(1, y, z)'))))
+        self.assertEqual([rule], self.ruleset.get_nonfact_rules('p'))
+        self.assertEqual([], self.ruleset.get_facts('q'))
+        self.assertEqual([], self.ruleset.get_nonfact_rules('q'))
+
+    def test_index_lifecycle(self):
+        self.ruleset = ruleset.RuleSet(index_budget=250)
+        for i in range(100):
+            self.ruleset.add_rule('p', compile.Fact('p', (i, i % 2, i % 50)))
+            self.ruleset.add_rule('q', compile.Fact('q', (i, i)))
+
+        # low-selectivity index is not built
+        self.assertEqual(
+            50, len(self.ruleset.get_facts('p', compile.parse1('p(x, 1, z)'))))
+        self.assertEqual({}, self.ruleset.index_stats()['p']['indexes'])
+
+        self.ruleset.get_facts('p', compile.parse1('p(1, y, z)'))
+        self.ruleset.get_facts('p', compile.parse1('p(x, y, 3)'))
+        self.ruleset.get_facts('p', compile.parse1('p(2, y, z)'))
+        self.assertEqual(
+            {(0,): {'keys': 100, 'entries': 100, 'hits': 2},
+             (2,): {'keys': 50, 'entries': 100, 'hits': 1}},
+            self.ruleset.index_stats()['p']['indexes'])
+
+        # exceeding the budget drops the least recently used index
+        self.assertEqual(
+            [compile.Fact('q', (7, 7))],
+            self.ruleset.get_facts('q', compile.parse1('q(x, 7)')))
+        stats = self.ruleset.index_stats()
+        self.assertEqual([(0,)], list(stats['p']['indexes'].keys()))
+        self.assertEqual([(1,)], list(stats['q']['indexes'].keys()))
+        self.assertEqual(100, stats['q']['facts'])
+
+    def test_initialize_table(self):
+        fact1 = compile.Fact('p', (1, 2, 3))
+        fact2 = compile.Fact('p', (1, 4, 5))
+        fact3 = compile.Fact('p', (2, 4, 5))
+        rule = compile.parse1('p(x, y, z) :- q(x, y, z)')
+        self.ruleset.add_rule('p', fact1)
+        self.ruleset.add_rule('p', fact2)
+        self.ruleset.add_rule('p', rule)
+        self.ruleset.get_facts('p', compile.parse1('p(1, y, z)'))
+        self.assertEqual([(0,)], self.ruleset.facts['p'].indexes())
+
+        self.assertEqual((set([fact3]), set([fact1])),
+                         self.ruleset.initialize_table('p', [fact2, fact3]))
+        self.assertEqual(set([fact2, fact3]),
+                         set(self.ruleset.get_facts('p')))
+        self.assertEqual([], self.ruleset.get_nonfact_rules('p'))
+        # existing indexes are rebuilt rather than dropped
+        self.assertEqual([(0,)], self.ruleset.facts['p'].indexes())
+        self.assertEqual(
+            [fact3], self.ruleset.get_facts('p', compile.parse1('p(2, y, z)')))
+
+        self.assertEqual((set([fact1]), set()),
+                         self.ruleset.initialize_table('q', [fact1]))
+        self.assertEqual([fact1], self.ruleset.get_facts('q'))
+
+    def test_fact_storage(self):
+        fact1 = compile.Fact('p', (1, 2, 3))
+        fact2 = compile.Fact('p', (1, 4, 5))
+        rule = compile.parse1('p(x, y, z) :- q(x, y, z)')
+        self.ruleset.add_rule('p', fact1)
+        self.ruleset.add_rule('p', rule)
+
+        self.ruleset.set_fact_storage('array')
+        self.assertIsInstance(self.ruleset.facts['p'], factset.ArrayFactSet)
+        self.assertTrue(self.ruleset.add_rule('p', fact2))
+        self.assertTrue(self.ruleset.contains('p', fact1))
+        self.assertEqual(set([fact1, fact2]),
+                         set(self.ruleset.get_facts('p')))
+        self.assertEqual(
+            [fact2], self.ruleset.get_facts('p', compile.parse1('p(x, 4, z)')))
+        self.assertEqual([rule], self.ruleset.get_nonfact_rules('p'))
+        self.assertTrue(self.ruleset.discard_rule('p', fact1))
+        self.assertEqual([fact2], self.ruleset.get_facts('p'))
+
+        self.ruleset.set_fact_storage('tuple')
+        self.assertIsInstance(self.ruleset.facts['p'], factset.FactSet)
+        self.assertEqual([fact2], self.ruleset.get_facts('p'))
+        self.assertRaises(ValueError, self.ruleset.set_fact_storage, 'foo')
+
+    def test_fact_storage_clear(self):
+        self.ruleset.set_fact_storage('array')
+        for i in range(3):
+            for j in range(10):
+                self.ruleset.add_rule('p', compile.Fact('p', (i, j + 10)))
+            self.ruleset.add_rule('q', compile.Fact('q', (i + 20,)))
+            self.assertEqual(12, len(self.ruleset._interner))
+            self.ruleset.clear_table('p')
+            self.assertEqual(1, len(self.ruleset._interner))
+            self.assertEqual([], self.ruleset.get_facts('p'))
+            self.ruleset.clear()
+            self.assertEqual(0, len(self.ruleset._interner))
+            self.assertFalse(self.ruleset.contains('q', compile.Fact(
+                'q', (i + 20,))))
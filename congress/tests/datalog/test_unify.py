@@ -227,6 +227,32 @@ class TestUnify(base.TestCase):
         self.create_unify(
             "p(x)", "p(1)", "Step 3", 0, unifier1=u1, recursive_str=True)
 
+    def test_bi_unify_fact(self):
+        """Test unification of native Facts with atoms."""
+        def check(fact, atom, expected):
+            atom = compile.parse1(atom)
+            unifier = unify.BiUnifier()
+            changes = unify.bi_unify_fact(
+                compile.Fact(atom.table.table, fact), atom, unifier)
+            if expected is None:
+                self.assertIsNone(changes)
+                self.assertEqual(atom, atom.plug(unifier))
+            else:
+                self.assertIsNotNone(changes)
+                self.assertEqual(compile.parse1(expected),
+                                 atom.plug(unifier))
+                unify.undo_all(changes)
+                self.assertEqual(atom, atom.plug(unifier))
+
+        check((1, 2), 'p(x, y)', 'p(1, 2)')
+        check((1, 1), 'p(x, x)', 'p(1, 1)')
+        check((1, 2), 'p(x, x)', None)
+        check((1, 'a'), 'p(1, y)', 'p(1, "a")')
+        check((1, 'a'), 'p(2, y)', None)
+        check(('1', 'a'), 'p(1, y)', None)
+        check((1.0, 'a'), 'p(1, y)', None)
+        check((1, 2, 3), 'p(x, y)', None)
+
 
 class TestMatch(base.TestCase):
 
@@ -179,6 +179,50 @@ class TestGraph(base.TestCase):
         ])
         self.assertEqual(expected_cycle_set, actual_cycle_set)
 
+    def check_order(self, g):
+        """Check the topological order of acyclic G is up to date."""
+        self.assertFalse(g.has_cycle())
+        self.assertEqual(set(g.nodes), set(g._order))
+        for node in g.edges:
+            for edge in g.edges[node]:
+                # delete_node leaves the edges into the node
+                if edge.node in g.nodes:
+                    self.assertLess(g._order[node], g._order[edge.node])
+
+    def test_incremental_cycle(self):
+        g = utility.Graph()
+        g.add_edge('a', 'b')
+        g.add_edge('c', 'd')
+        g.add_edge('d', 'a')
+        self.check_order(g)
+        g.add_edge('b', 'c')
+        self.assertTrue(g.has_cycle())
+        g.delete_edge('d', 'a')
+        self.check_order(g)
+        g.add_edge('b', 'b')
+        self.assertTrue(g.has_cycle())
+        g.delete_node('b')
+        self.check_order(g)
+        g.add_edge('e', 'c')
+        g.add_edge('d', 'e')
+        self.assertTrue(g.has_cycle())
+        g.delete_node('e')
+        self.check_order(g)
+
+    def test_incremental_order(self):
+        g = utility.Graph()
+        for node in range(10):
+            g.add_node(node)
+        # edges against the order in which the nodes were added
+        for node in range(9, 0, -1):
+            g.add_edge(node, node - 1)
+            self.check_order(g)
+        g.add_edge(9, 5)
+        g.add_edge(2, 0)
+        self.check_order(g)
+        g.add_edge(0, 9)
+        self.assertTrue(g.has_cycle())
+
     def test_find_reachable_nodes(self):
         g1 = utility.Graph()
         self.assertEqual(g1.find_reachable_nodes([1]), set())
@@ -239,6 +283,24 @@ class TestGraph(base.TestCase):
         self.assertEqual(g1.dependencies(5), set([5, 2, 3, 4]))
         self.assertEqual(g1.dependencies(11), set([11, 12]))
 
+    def test_cycles_through_edges(self):
+        g = utility.Graph()
+        g.add_edge('p', 'q')
+        g.add_edge('q', 'r')
+        g.add_edge('r', 's')
+        g.add_edge('t', 't')
+        self.assertEqual([], g.cycles_through_edges([('p', 'q')]))
+        g.add_edge('r', 'p')
+        g.add_edge('s', 'u')
+        self.assertEqual([], g.cycles_through_edges([('s', 'u')]))
+        cycles = g.cycles_through_edges([('r', 'p'), ('s', 'u')])
+        self.assertEqual(1, len(cycles))
+        self.assertEqual(set(['p', 'q', 'r']), set(cycles[0]))
+        cycles = g.cycles_through_edges([('t', 't'), ('q', 'r')])
+        self.assertEqual(set([frozenset(['t']), frozenset(['p', 'q', 'r'])]),
+                         set(frozenset(cycle) for cycle in cycles))
+        self.assertEqual([], g.cycles_through_edges([('x', 'y')]))
+
     def test_find_dependent_nodes(self):
         g1 = utility.Graph()
         self.assertEqual(g1.find_dependent_nodes([1]), set([1]))
@@ -262,6 +324,11 @@ class TestGraph(base.TestCase):
         g1.add_edge(5, 2)  # add cycle
         self.assertEqual(g1.find_dependent_nodes([2]),
                          set([5, 0, 1, 2, 3, 10]))
+        g1.delete_edge(1, 2)
+        self.assertEqual(g1.find_dependent_nodes([2]), set([5, 2, 3, 10]))
+        g1.delete_node(3)
+        self.assertEqual(g1.find_dependent_nodes([5]), set([5, 10]))
+        self.assertEqual(g1.find_dependent_nodes([3]), set([3]))
 
 
 class TestBagGraph(base.TestCase):
@@ -438,6 +505,22 @@ class TestBagGraph(base.TestCase):
         g1.delete_edge(2, 4)
         self.assertFalse(g1.has_cycle())
 
+    def test_undo_cycle(self):
+        g = utility.BagGraph()
+        g.add_edge('p', 'q')
+        g.add_edge('q', 'r')
+        g.add_edge('q', 'r')
+        self.assertFalse(g.has_cycle())
+        g.add_edge('r', 'p')
+        self.assertTrue(g.has_cycle())
+        g.delete_edge('r', 'p')
+        self.assertFalse(g.has_cycle())
+        g.add_edge('r', 'p')
+        g.delete_edge('q', 'r')
+        self.assertTrue(g.has_cycle())
+        g.delete_edge('q', 'r')
+        self.assertFalse(g.has_cycle())
+
 
 class TestIterstr(base.TestCase):
     class X(object):
@@ -19,9 +19,11 @@ from __future__ import absolute_import
 import copy
 import hashlib
 import json
+import time
 
 import eventlet
 import mock
+from oslo_config import cfg
 from oslo_utils import uuidutils
 
 from congress import data_types
@@ -47,6 +49,23 @@ class TestDatasourceDriver(base.TestCase):
         h = hashlib.md5(s.encode('ascii')).hexdigest()
         return h
 
+    def test_compute_hash(self):
+        compute_hash = datasource_driver.DataSourceDriver._compute_hash
+        for obj in ([], ['b', 'a', None], (3, 'a', 2.5, False),
+                    [1], [1.0], [True], [('k', 1), ('k', True)]):
+            # the same ids, computed and then cached
+            self.assertEqual(self.compute_hash(obj), compute_hash(obj))
+            self.assertEqual(self.compute_hash(obj), compute_hash(obj))
+        self.assertIn(((1.0,), (float,)), datasource_driver._hash_cache)
+        self.assertEqual(compute_hash(['a', 'b']), compute_hash(['b', 'a']))
+        self.assertEqual(3, len(set([compute_hash([1]), compute_hash([1.0]),
+                                     compute_hash([True])])))
+
+        with mock.patch.object(datasource_driver, 'HASH_CACHE_SIZE', 1):
+            compute_hash(['c'])
+            self.assertEqual([(('c',), (str,))],
+                             list(datasource_driver._hash_cache))
+
     def test_translator_key_elements(self):
         """Test for keys of all translator."""
         expected_params = {
@@ -1018,6 +1037,73 @@ class TestDatasourceDriver(base.TestCase):
         self.assertIn(('testtable', (k, 'foo')), rows)
         self.assertIn(('testtable', (k, 'bar')), rows)
 
+    def test_compile_translator(self):
+        class Obj(object):
+            def __init__(self, **kwargs):
+                self.__dict__.update(kwargs)
+
+        tags_translator = {'translation-type': 'LIST', 'table-name': 'tags',
+                           'parent-key': 'id', 'val-col': 'tag',
+                           'translator': self.val_trans}
+        ips_translator = {
+            'translation-type': 'HDICT', 'table-name': 'ips',
+            'id-col': 'ip_id', 'selector-type': 'DICT_SELECTOR',
+            'field-translators':
+                ({'fieldname': 'ip', 'translator': self.val_trans},)}
+        translator = {
+            'translation-type': 'HDICT', 'table-name': 'servers',
+            'id-col': 'server_id', 'selector-type': 'DOT_SELECTOR',
+            'field-translators':
+                ({'fieldname': 'tags', 'translator': tags_translator},
+                 {'fieldname': 'id', 'translator': self.val_trans},
+                 {'fieldname': 'flavor', 'col': 'flavor_id',
+                  'translator': {'translation-type': 'VALUE',
+                                 'extract-fn': lambda x: x['id']}},
+                 {'fieldname': 'ips',
+                  'translator': {'translation-type': 'LIST',
+                                 'table-name': 'server_ips',
+                                 'id-col': 'ips_id', 'val-col': 'ip_id',
+                                 'translator': ips_translator}},
+                 {'fieldname': 'metadata',
+                  'translator': {'translation-type': 'VDICT',
+                                 'table-name': 'metadata',
+                                 'parent-key': 'id', 'key-col': 'key',
+                                 'val-col': 'value',
+                                 'translator': self.val_trans}})}
+        objs = [Obj(id=1, flavor={'id': 'small'}, tags=['a', 'b'],
+                    ips=[{'ip': '10.0.0.1'}, None, {'ip': '10.0.0.2'}],
+                    metadata={'k1': 'v1', 'k2': ['unhashable']}),
+                Obj(id=2, flavor={'id': 'large'}, tags=None, ips=None,
+                    metadata={}),
+                Obj(id=3, flavor={'id': 'large'})]
+
+        convert = datasource_driver.DataSourceDriver.compile_translator(
+            translator)
+        self.assertIs(
+            convert,
+            datasource_driver.DataSourceDriver.compile_translator(translator))
+        for obj in objs:
+            self.assertEqual(
+                datasource_driver.DataSourceDriver.convert_obj(obj,
+                                                               translator),
+                convert(obj))
+        self.assertEqual((None, None), convert(None))
+
+    def test_compile_translator_interpreted(self):
+        # translators with invalid selectors are not compiled, and fail
+        #   only when converting objects
+        translator = {'translation-type': 'HDICT', 'table-name': 'testtable',
+                      'selector-type': 'BAD_SELECTOR',
+                      'field-translators':
+                          ({'fieldname': 'id',
+                            'translator': self.val_trans},)}
+        self.assertEqual(
+            [], datasource_driver.DataSourceDriver.convert_objs([],
+                                                                translator))
+        self.assertRaises(AssertionError,
+                          datasource_driver.DataSourceDriver.convert_objs,
+                          [{'id': 1}], translator)
+
     def test_convert_bad_params(self):
         def verify_invalid_params(translator, err_msg):
             args = helper.datasource_openstack_args()
@@ -1834,6 +1920,124 @@ class TestPollingDataSourceDriver(base.TestCase):
         # update happens twice before the check. First one is in get_snapshot.
         self.assertEqual(test_driver.update_number, 2)
 
+    def _concurrent_driver(self, args, delay, fail=None):
+        class TestDriver(datasource_driver.PollingDataSourceDriver):
+            TRANSLATORS = [
+                {'translation-type': 'HDICT', 'table-name': 't%d' % i,
+                 'selector-type': 'DICT_SELECTOR',
+                 'field-translators':
+                     ({'fieldname': 'id',
+                       'translator': {'translation-type': 'VALUE'}},)}
+                for i in range(4)]
+
+            def __init__(self):
+                super(TestDriver, self).__init__('', args)
+                self.running = 0
+                self.max_running = 0
+                for translator in self.TRANSLATORS:
+                    table = translator['table-name']
+                    self.add_update_method(
+                        lambda table=table: self.update_method(table),
+                        translator)
+
+            def update_method(self, table):
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+                eventlet.sleep(delay)
+                self.running -= 1
+                if table == fail:
+                    raise ValueError(table)
+                self.state[table] = set([(table,)])
+
+        return TestDriver()
+
+    def test_update_from_datasource_concurrent(self):
+        test_driver = self._concurrent_driver({'poll_concurrency': 3}, 0.05)
+        test_driver.update_from_datasource()
+        self.assertEqual(3, test_driver.max_running)
+        self.assertEqual(dict(('t%d' % i, set([('t%d' % i,)]))
+                              for i in range(4)),
+                         test_driver.state)
+
+        cfg.CONF.set_override('datasource_poll_concurrency', 1)
+        test_driver = self._concurrent_driver({}, 0)
+        test_driver.update_from_datasource()
+        self.assertEqual(1, test_driver.max_running)
+        self.assertEqual(4, len(test_driver.state))
+
+    def test_update_from_datasource_concurrent_error(self):
+        test_driver = self._concurrent_driver({'poll_concurrency': 4}, 0.01,
+                                              fail='t1')
+        self.assertRaises(ValueError, test_driver.update_from_datasource)
+        # the other tables are still updated
+        self.assertEqual(set(['t0', 't2', 't3']),
+                         set(t for t in test_driver.state
+                             if test_driver.state[t]))
+
+        test_driver.poll()
+        self.assertIsInstance(test_driver.last_error, ValueError)
+
+    def test_adaptive_poll_times(self):
+        cfg.CONF.set_override('adaptive_polling', True)
+        test_driver = self._concurrent_driver({'poll_time': 10}, 0)
+        polls = []
+
+        def update_method(table):
+            # t0 changes at every poll, the other tables never do
+            polls.append(table)
+            test_driver.state[table] = set([(table, len(polls))
+                                            if table == 't0' else (table,)])
+
+        with mock.patch.object(test_driver, 'update_method',
+                               side_effect=update_method), \
+                mock.patch.object(test_driver, 'publish'):
+            # the first poll changes every table
+            test_driver.poll()
+            self.assertEqual({'t0': 5, 't1': 5, 't2': 5, 't3': 5},
+                             test_driver.table_poll_times)
+            for i in range(4):
+                test_driver.poll()
+            self.assertEqual({'t0': 5, 't1': 80, 't2': 80, 't3': 80},
+                             test_driver.table_poll_times)
+
+            # only the tables polled are rescheduled
+            next_polls = dict(test_driver._next_table_polls)
+            test_driver.poll(['t0'])
+            self.assertEqual('t0', polls[-1])
+            self.assertEqual(next_polls['t1'],
+                             test_driver._next_table_polls['t1'])
+            self.assertGreater(test_driver._next_table_polls['t0'],
+                               next_polls['t0'])
+
+            # poll times are kept after a failed poll
+            test_driver.update_method.side_effect = ValueError
+            test_driver.poll()
+            self.assertEqual({'t0': 5, 't1': 80, 't2': 80, 't3': 80},
+                             test_driver.table_poll_times)
+
+    @mock.patch.object(time, 'time', return_value=1000)
+    def test_poll_due_tables(self, mock_time):
+        cfg.CONF.set_override('adaptive_polling', True)
+        test_driver = self._concurrent_driver({'poll_time': 10}, 0)
+        self.assertTrue(test_driver._polls_tables_adaptively())
+        test_driver._next_table_polls = {'t0': 990, 't1': 1000, 't2': 1010,
+                                         't3': 1020}
+        with mock.patch.object(test_driver, 'poll') as mock_poll:
+            test_driver._poll_due_tables()
+            mock_poll.assert_called_once_with(['t0', 't1'])
+
+            # a refresh polls every table before they are due
+            mock_poll.reset_mock()
+            test_driver._next_table_polls = {'t0': 1010, 't1': 1010,
+                                             't2': 1010, 't3': 1010}
+            test_driver.request_refresh()
+            test_driver._poll_due_tables()
+            mock_poll.assert_called_once_with()
+
+        cfg.CONF.set_override('adaptive_polling', False)
+        test_driver = self._concurrent_driver({'poll_time': 10}, 0)
+        self.assertFalse(test_driver._polls_tables_adaptively())
+
     def test_add_update_method(self):
         class TestDriver(datasource_driver.PollingDataSourceDriver):
             test_translator = {
@@ -1931,7 +2135,7 @@ class TestPushedDriver(base.SqlTestCase):
             (2, 'column2', 'down')])
         self.assertEqual(expected_state, test_driver.state['test_translator'])
         self.assertEqual(
-            [], db_ds_table_data.get_ds_table_data(test_driver.ds_id))
+            [], list(db_ds_table_data.get_ds_table_rows(test_driver.ds_id)))
 
         # test data persisted in DB
         test_driver = TestPushedDriver.TestDriver(
@@ -1942,8 +2146,8 @@ class TestPushedDriver(base.SqlTestCase):
             (2, 'column2', 'down')])
         self.assertEqual(expected_state, test_driver.state['test_translator'])
         self.assertEqual(
-            [{'tablename': 'test_translator', 'tabledata': expected_state}],
-            db_ds_table_data.get_ds_table_data(test_driver.ds_id))
+            set(('test_translator', row) for row in expected_state),
+            set(db_ds_table_data.get_ds_table_rows(test_driver.ds_id)))
 
         # test no restoring persisted data if not enabled
         del test_driver
@@ -1958,6 +2162,55 @@ class TestPushedDriver(base.SqlTestCase):
             args={'ds_id': ds_id, 'persist_data': True})
         self.assertEqual(expected_state, test_driver.state['test_translator'])
 
+    @mock.patch.object(datasource_driver.DataSourceDriver, 'publish')
+    def test_persist_data_delta(self, mock_publish):
+        ds_id = uuidutils.generate_uuid()
+        test_driver = TestPushedDriver.TestDriver(
+            args={'ds_id': ds_id, 'persist_data': True})
+        obj = [
+            {'id': 1, 'name': 'column1', 'status': 'up'},
+            {'id': 2, 'name': 'column2', 'status': 'down'}
+            ]
+        test_driver.replace_entire_table_data('test_translator', obj)
+
+        obj[1]['status'] = 'up'
+        with mock.patch.object(db_ds_table_data, 'update_ds_table_rows',
+                               wraps=db_ds_table_data.update_ds_table_rows
+                               ) as update:
+            test_driver.replace_entire_table_data('test_translator', obj)
+            update.assert_called_once_with(
+                ds_id, 'test_translator', set([(2, 'column2', 'up')]),
+                set([(2, 'column2', 'down')]))
+
+            # a webhook handler changing the table in place
+            def handler(payload):
+                test_driver.state['test_translator'].discard(
+                    (1, 'column1', 'up'))
+                return ['test_translator']
+            update.reset_mock()
+            test_driver._webhook_handler = handler
+            test_driver.process_webhook_notification({})
+            update.assert_called_once_with(
+                ds_id, 'test_translator', set(),
+                set([(1, 'column1', 'up')]))
+
+        test_driver = TestPushedDriver.TestDriver(
+            args={'ds_id': ds_id, 'persist_data': True})
+        self.assertEqual(set([(2, 'column2', 'up')]),
+                         test_driver.state['test_translator'])
+
+    def test_restore_data_persisted_whole(self):
+        ds_id = uuidutils.generate_uuid()
+        expected_state = set([
+            (1, 'column1', 'up'),
+            (2, 'column2', 'down')])
+        db_ds_table_data.store_ds_table_data(
+            ds_id, 'test_translator', expected_state)
+        test_driver = TestPushedDriver.TestDriver(
+            args={'ds_id': ds_id, 'persist_data': True})
+        self.assertEqual(expected_state, test_driver.state['test_translator'])
+        self.assertEqual([], db_ds_table_data.get_ds_table_data(ds_id))
+
 
 class TestExecutionDriver(base.TestCase):
     class ExtendedExecutionDriver(datasource_driver.ExecutionDriver):
@@ -24,8 +24,9 @@ class TestDatasourceDriver(base.TestCase):
     def test_get_openstack_required_config(self):
         expected_required = ['auth_url', 'password', 'project_name',
                              'username']
-        expected_optional = ['endpoint', 'poll_time', 'project_domain_name',
-                             'region', 'tenant_name', 'user_domain_name']
+        expected_optional = ['endpoint', 'poll_concurrency', 'poll_time',
+                             'project_domain_name', 'region', 'tenant_name',
+                             'user_domain_name']
         config = datasource_utils.get_openstack_required_config()
         required = []
         optional = []
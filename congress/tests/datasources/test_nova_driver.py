@@ -19,13 +19,18 @@ from __future__ import absolute_import
 
 import mock
 import novaclient
+from oslo_log import log as logging
+from six.moves import range
 
 from congress.datasources import nova_driver
 from congress import exception
 from congress.tests import base
 from congress.tests.datasources import fakes
+from congress.tests.datasources import util
 from congress.tests import helper
 
+LOG = logging.getLogger(__name__)
+
 
 class TestNovaDriver(base.TestCase):
 
@@ -349,3 +354,27 @@ class TestNovaDriver(base.TestCase):
         self.assertRaises(exception.CongressException,
                           self.driver.execute,
                           'get_nova_credentials_v2', action_args)
+
+
+class BenchmarkNovaTranslators(base.Benchmark):
+    def test_benchmark_servers(self):
+        servers = [util.ResponseObj({
+            'id': 'server-%d' % i, 'name': 'vm-%d' % i,
+            'hostId': 'host-%d' % (i % 100), 'status': 'ACTIVE',
+            'tenant_id': 'tenant-%d' % (i % 20), 'user_id': 'user',
+            'image': {'id': 'image-%d' % (i % 10)},
+            'flavor': {'id': 'flavor-%d' % (i % 5)},
+            'OS-EXT-AZ:availability_zone': 'nova',
+            'OS-EXT-SRV-ATTR:hypervisor_hostname': 'hv-%d' % (i % 100),
+            'created': '2019-01-01T00:00:00Z',
+            'addresses': {'private': [
+                {'addr': '10.0.%d.%d' % (i // 250 % 250, i % 250),
+                 'version': 4, 'OS-EXT-IPS:type': 'fixed',
+                 'OS-EXT-IPS-MAC:mac_addr': 'fa:16:3e:00:00:01'}]},
+            'tags': ['tag-%d' % (i % 3)]}) for i in range(10000)]
+        rows, interpreted, compiled = util.time_translation(
+            nova_driver.NovaDriver.servers_translator, servers)
+        LOG.info("Translated %d servers to %d rows: interpreted in %.3fs, "
+                 "compiled in %.3fs", len(servers), len(rows), interpreted,
+                 compiled)
+        self.assertLess(compiled, interpreted)
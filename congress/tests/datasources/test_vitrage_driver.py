@@ -32,7 +32,7 @@ class TestVitrageDriver(base.TestCase):
         super(TestVitrageDriver, self).setUp()
         self.vitrage = vitrage_driver.VitrageDriver('test-vitrage')
 
-    @mock.patch.object(vitrage_driver.VitrageDriver, 'publish')
+    @mock.patch.object(vitrage_driver.VitrageDriver, 'publish_delta')
     def test_webhook_alarm_activate(self, mocked_publish):
         test_payload = {
             "notification": "vitrage.alarm.activate",
@@ -79,8 +79,10 @@ class TestVitrageDriver(base.TestCase):
                               u'OK',
                               u'nova.instance')])
         self.assertEqual(self.vitrage.state['alarms'], expected_rows)
+        mocked_publish.assert_called_once_with(
+            'alarms', list(expected_rows), [])
 
-    @mock.patch.object(vitrage_driver.VitrageDriver, 'publish')
+    @mock.patch.object(vitrage_driver.VitrageDriver, 'publish_delta')
     def test_webhook_alarm_deactivate(self, mocked_publish):
         test_payload = {
             "notification": "vitrage.alarm.deactivate",
@@ -102,7 +104,7 @@ class TestVitrageDriver(base.TestCase):
                 "vitrage_operational_severity": "OK",
                 "name": "Instance memory performance degraded"}}
 
-        self.vitrage.state['alarms'] = set([(
+        old_rows = set([(
             u'Instance memory performance degraded',
             u'Active',
             u'vitrage',
@@ -116,6 +118,7 @@ class TestVitrageDriver(base.TestCase):
             u'8f007e5ba0944e84baa6f2a4f2b5d03a',
             u'OK',
             u'nova.instance')])
+        self.vitrage.state['alarms'] = set(old_rows)
         self.vitrage._webhook_handler(test_payload)
 
         self.assertEqual(1, len(self.vitrage.state['alarms']))
@@ -134,8 +137,11 @@ class TestVitrageDriver(base.TestCase):
                               u'OK',
                               u'nova.instance')])
         self.assertEqual(self.vitrage.state['alarms'], expected_rows)
+        # the alarm with the same vitrage_id is replaced
+        mocked_publish.assert_called_once_with(
+            'alarms', list(expected_rows), list(old_rows))
 
-    @mock.patch.object(vitrage_driver.VitrageDriver, 'publish')
+    @mock.patch.object(vitrage_driver.VitrageDriver, 'publish_delta')
     def test_webhook_alarm_cleanup(self, mocked_publish):
         self.vitrage = vitrage_driver.VitrageDriver(
             'test-vitrage',
@@ -164,5 +170,48 @@ class TestVitrageDriver(base.TestCase):
         self.vitrage._webhook_handler(test_payload)
 
         self.assertEqual(1, len(self.vitrage.state['alarms']))
+        rows = list(self.vitrage.state['alarms'])
+        mocked_publish.assert_called_once_with('alarms', rows, [])
         time.sleep(3)
         self.assertEqual(0, len(self.vitrage.state['alarms']))
+        mocked_publish.assert_called_with('alarms', [], rows)
+
+    def test_webhook_alarm_cleanup_published(self):
+        self.vitrage = vitrage_driver.VitrageDriver(
+            'test-vitrage',
+            args={'hours_to_keep_alarm': 1 / 3600})  # set to 1 sec for test
+        self.vitrage.node = mock.MagicMock()
+
+        test_payload = {
+            "notification": "vitrage.alarm.activate",
+            "payload": {
+                "vitrage_id": "2def31e9-6d9f-4c16-b007-893caa806cd4",
+                "resource": {
+                    "vitrage_id": "437f1f4c-ccce-40a4-ac62-1c2f1fd9f6ac",
+                    "name": "app-1-server-1-jz6qvznkmnif",
+                    "update_timestamp": "2018-01-22 10:00:34.327142+00:00",
+                    "vitrage_category": "RESOURCE",
+                    "vitrage_operational_state": "OK",
+                    "vitrage_type": "nova.instance",
+                    "project_id": "8f007e5ba0944e84baa6f2a4f2b5d03a",
+                    "id": "9b7d93b9-94ec-41e1-9cec-f28d4f8d702c"},
+                "update_timestamp": "2018-01-22T10:00:34Z",
+                "vitrage_category": "ALARM",
+                "state": "Active",
+                "vitrage_type": "vitrage",
+                "vitrage_operational_severity": "WARNING",
+                "name": "Instance memory performance degraded"}}
+
+        self.vitrage._webhook_handler(test_payload)
+        rows = list(self.vitrage.state['alarms'])
+        self.assertEqual(
+            (0, rows),
+            self.vitrage.get_last_published_data_with_seqnum('alarms'))
+        time.sleep(3)
+
+        # subscribers are sent the removal of the old alarm
+        self.vitrage.node.publish_table_sequenced.assert_called_with(
+            'test-vitrage', 'alarms', [[], rows], False, 1)
+        self.assertEqual(
+            (1, []),
+            self.vitrage.get_last_published_data_with_seqnum('alarms'))
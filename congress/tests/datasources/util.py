@@ -16,6 +16,10 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 
+import time
+
+from congress.datasources import datasource_driver
+
 
 class ResponseObj(object):
     """Allows callers to use dot notation to access a dictionary."""
@@ -27,3 +31,23 @@ class ResponseObj(object):
 
     def to_dict(self):
         return self.values
+
+
+def time_translation(translator, objs):
+    """Time converting OBJS with TRANSLATOR, interpreted and compiled.
+
+    Returns the rows and the seconds each conversion took.
+    """
+    interpreted_start = time.time()
+    interpreted_rows = []
+    for obj in objs:
+        rows, _ = datasource_driver.DataSourceDriver.convert_obj(obj,
+                                                                 translator)
+        interpreted_rows.extend(rows)
+    compiled_start = time.time()
+    compiled_rows = datasource_driver.DataSourceDriver.convert_objs(
+        objs, translator)
+    end = time.time()
+    assert interpreted_rows == compiled_rows
+    return (compiled_rows, compiled_start - interpreted_start,
+            end - compiled_start)
@@ -16,6 +16,7 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 
+import mock
 from oslo_utils import uuidutils
 
 from congress.db import db_ds_table_data
@@ -111,3 +112,74 @@ class TestDbDsTableData(base.SqlTestCase):
             {'tablename': 'table2',
              'tabledata': set([('a', 0), ('b', 2)])},
             data)
+
+
+class TestDbDsTableRows(base.SqlTestCase):
+
+    def _rows(self, ds_id):
+        data = {}
+        for tablename, row in db_ds_table_data.get_ds_table_rows(ds_id):
+            data.setdefault(tablename, set()).add(row)
+        return data
+
+    def test_update_ds_table_rows(self):
+        ds_id = uuidutils.generate_uuid()
+        db_ds_table_data.update_ds_table_rows(
+            ds_id, 'table1', set([('a', 0), ('b', 1)]), set())
+        db_ds_table_data.update_ds_table_rows(
+            ds_id, 'table2', set([('a', 0)]), set())
+        self.assertEqual({'table1': set([('a', 0), ('b', 1)]),
+                          'table2': set([('a', 0)])},
+                         self._rows(ds_id))
+
+        # apply a delta, twice
+        for i in range(2):
+            db_ds_table_data.update_ds_table_rows(
+                ds_id, 'table1', set([('c', 2), ('b', 1)]), set([('a', 0)]))
+            self.assertEqual({'table1': set([('b', 1), ('c', 2)]),
+                              'table2': set([('a', 0)])},
+                             self._rows(ds_id))
+
+    def test_update_ds_table_rows_batches(self):
+        ds_id = uuidutils.generate_uuid()
+        rows = set((i, 'row') for i in range(25))
+        with mock.patch.object(db_ds_table_data, 'ROW_BATCH_SIZE', 10):
+            db_ds_table_data.update_ds_table_rows(ds_id, 'table1', rows, [])
+            self.assertEqual({'table1': rows}, self._rows(ds_id))
+            db_ds_table_data.update_ds_table_rows(
+                ds_id, 'table1', [], set((i, 'row') for i in range(20)))
+        self.assertEqual({'table1': set((i, 'row') for i in range(20, 25))},
+                         self._rows(ds_id))
+
+    def test_delete_ds_table_rows(self):
+        ds_id = uuidutils.generate_uuid()
+        ds2_id = uuidutils.generate_uuid()
+        db_ds_table_data.update_ds_table_rows(
+            ds_id, 'table1', set([('a', 0)]), set())
+        db_ds_table_data.update_ds_table_rows(
+            ds_id, 'table2', set([('b', 1)]), set())
+        db_ds_table_data.update_ds_table_rows(
+            ds2_id, 'table3', set([('c', 2)]), set())
+        self.assertTrue(db_ds_table_data.delete_ds_table_data(ds_id, 'table1'))
+        self.assertEqual({'table2': set([('b', 1)])}, self._rows(ds_id))
+        self.assertTrue(db_ds_table_data.delete_ds_table_data(ds_id))
+        self.assertEqual({}, self._rows(ds_id))
+        self.assertEqual({'table3': set([('c', 2)])}, self._rows(ds2_id))
+
+    def test_migrate_ds_table_data(self):
+        ds_id = uuidutils.generate_uuid()
+        db_ds_table_data.store_ds_table_data(
+            ds_id=ds_id,
+            tablename='table1',
+            tabledata=set([('a', 0), ('b', 1)]))
+        db_ds_table_data.update_ds_table_rows(
+            ds_id, 'table1', set([('stale', 0)]), set())
+        db_ds_table_data.update_ds_table_rows(
+            ds_id, 'table2', set([('c', 2)]), set())
+        self.assertEqual(
+            ['table1'], db_ds_table_data.migrate_ds_table_data(ds_id))
+        self.assertEqual({'table1': set([('a', 0), ('b', 1)]),
+                          'table2': set([('c', 2)])},
+                         self._rows(ds_id))
+        self.assertEqual([], db_ds_table_data.get_ds_table_data(ds_id))
+        self.assertEqual([], db_ds_table_data.migrate_ds_table_data(ds_id))
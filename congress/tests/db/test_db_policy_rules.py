@@ -126,6 +126,49 @@ class TestPolicyRulesDb(base.SqlTestCase):
         self.assertEqual(comment, rules[1].comment)
         self.assertEqual(len(db_policy_rules.get_policy_rules()), 2)
 
+    def test_add_policy_rules(self):
+        policy_name = "classification"
+        rules = [{'id': uuidutils.generate_uuid(),
+                  'original_str': "p(x) :- q(x)",
+                  'comment': "None",
+                  'name': "rule1"},
+                 {'id': uuidutils.generate_uuid(),
+                  'original_str': "z(x) :- q(x)",
+                  'comment': "",
+                  'name': ""}]
+        db_policy_rules.add_policy_rules(policy_name, rules)
+        db_policy_rules.add_policy_rules(policy_name, [])
+
+        db_rules = dict((db_rule.id, db_rule) for db_rule in
+                        db_policy_rules.get_policy_rules(policy_name))
+        self.assertEqual(len(db_rules), 2)
+        for rule in rules:
+            db_rule = db_rules[rule['id']]
+            self.assertEqual(rule['id'], db_rule.id)
+            self.assertEqual(policy_name, db_rule.policy_name)
+            self.assertEqual(rule['original_str'], db_rule.rule)
+            self.assertEqual(rule['comment'], db_rule.comment)
+            self.assertEqual(rule['name'], db_rule.name)
+
+    def test_policy_rules_revision(self):
+        self.assertEqual(0, db_policy_rules.get_policy_rules_revision())
+        id = uuidutils.generate_uuid()
+        db_policy_rules.add_policy_rule(id=id,
+                                        policy_name="classification",
+                                        rule="p(x) :- q(x)",
+                                        comment="None")
+        self.assertEqual(1, db_policy_rules.get_policy_rules_revision())
+        db_policy_rules.add_policy_rules(
+            "classification", [{'id': uuidutils.generate_uuid(),
+                                'original_str': "q(1)",
+                                'comment': "",
+                                'name': ""}])
+        self.assertEqual(2, db_policy_rules.get_policy_rules_revision())
+        db_policy_rules.delete_policy_rule(id)
+        self.assertEqual(3, db_policy_rules.get_policy_rules_revision())
+        db_policy_rules.delete_policy_rule(uuidutils.generate_uuid())
+        self.assertEqual(3, db_policy_rules.get_policy_rules_revision())
+
     def test_is_soft_deleted_not_deleted(self):
         uuid = uuidutils.generate_uuid()
         self.assertEqual('', db_policy_rules.is_soft_deleted(uuid, False))
@@ -18,6 +18,7 @@ import mock
 import time
 
 from congress.dse2 import data_service
+from congress import exception
 from congress.tests import base
 
 
@@ -102,6 +103,172 @@ class TestDataService(base.TestCase):
 
         self.assertEqual(expected_result, ds.info.to_dict())
 
+    def test_publish_unchanged(self):
+        ds = data_service.DataService("svc1")
+        ds.node = mock.MagicMock()
+        publish = ds.node.publish_table_sequenced
+        ds.publish('table1', set([(1, 'a'), (2, 'b')]))
+        self.assertEqual(1, publish.call_count)
+
+        ds.publish('table1', [(2, 'b'), (1, 'a')])
+        self.assertEqual(1, publish.call_count)
+
+        ds.publish('table1', set([(2, 'b'), (3, 'c')]))
+        publish.assert_called_with(
+            'svc1', 'table1', [[(3, 'c')], [(1, 'a')]], False, 1)
+
+    def test_publish_delta(self):
+        ds = data_service.DataService("svc1")
+        ds.node = mock.MagicMock()
+        publish = ds.node.publish_table_sequenced
+        ds.publish('table1', set([(1,), (2,)]))
+
+        ds.publish_delta('table1', [(2,), (3,)], [(1,), (4,)])
+        publish.assert_called_with(
+            'svc1', 'table1', [[(3,)], [(1,)]], False, 1)
+        seqnum, rows = ds.get_last_published_data_with_seqnum('table1')
+        self.assertEqual(1, seqnum)
+        self.assertEqual(set([(2,), (3,)]), set(rows))
+
+        # last published data is updated with the changes
+        ds.publish('table1', set([(2,), (3,)]))
+        ds.publish_delta('table1', [(2,)], [(5,)])
+        self.assertEqual(2, publish.call_count)
+
+        ds.publish('table1', set([(2,)]))
+        publish.assert_called_with('svc1', 'table1', [[], [(3,)]], False, 2)
+
+    def test_publish_delta_unpublished(self):
+        ds = data_service.DataService("svc1")
+        ds.node = mock.MagicMock()
+        ds.get_snapshot = mock.Mock(return_value=set([(1,), (2,)]))
+        ds.publish_delta('table1', [(2,)], [])
+        ds.node.publish_table_sequenced.assert_called_once_with(
+            'svc1', 'table1', [mock.ANY, []], False, 0)
+        self.assertEqual(
+            set([(1,), (2,)]),
+            set(ds.node.publish_table_sequenced.call_args[0][2][0]))
+
+    def test_send_snapshot_chunks(self):
+        ds = data_service.DataService("svc1")
+        ds.node = mock.MagicMock()
+        ds.node.encode_table_data.side_effect = (
+            lambda svc, table, data, node_id: data)
+        ds.get_snapshot = mock.Mock(
+            return_value=set([(i,) for i in range(5)]))
+        endpoints = data_service.DataServiceEndPoints(ds)
+        seqnum, rows, chunks = endpoints.get_last_published_data_with_seqnum(
+            {'node_id': 'node1'}, 'table1', chunk_size=2)
+        self.assertEqual(0, seqnum)
+        self.assertEqual(2, len(rows))
+        self.assertEqual(3, chunks['count'])
+        for index in range(1, 3):
+            rows = rows + endpoints.get_snapshot_chunk(
+                {'node_id': 'node1'}, 'table1', chunks['snapshot_id'], index)
+        self.assertEqual(sorted((i,) for i in range(5)), sorted(rows))
+
+        # the snapshot is dropped once its last chunk is sent
+        self.assertRaises(exception.NotFound, endpoints.get_snapshot_chunk,
+                          {'node_id': 'node1'}, 'table1',
+                          chunks['snapshot_id'], 1)
+        # small snapshots are sent whole
+        seqnum, rows = endpoints.get_last_published_data_with_seqnum(
+            {'node_id': 'node1'}, 'table1', chunk_size=5)
+        self.assertEqual(5, len(rows))
+
+    def test_receive_snapshot_chunks(self):
+        ds = data_service.DataService("svc1")
+        ds.node = mock.MagicMock()
+        ds.node.to_set_of_tuples.side_effect = lambda rows: set(rows)
+        ds.node.subscribe_table.return_value = [
+            3, [(1,), (2,)], {'snapshot_id': 'id', 'count': 3}]
+
+        def get_snapshot_chunk(publisher, table, snapshot_id, index):
+            # publications received meanwhile wait for the last chunk
+            ds.receive_data_sequenced('svc2', 'table1', [[(6,)], [(1,)]], 4)
+            return [[(3,), (4,)], [(5,)]][index - 1]
+        ds.node.get_snapshot_chunk.side_effect = get_snapshot_chunk
+
+        ds.subscribe('svc2', 'table1')
+        self.assertEqual(
+            [set([(1,), (2,)]),
+             (set([(3,), (4,)]), set()),
+             (set([(5,)]), set()),
+             (set([(6,)]), set([(1,)]))],
+            [msg['data'] for msg in ds.receive_data_history])
+        self.assertEqual(4, ds.receiver_seqnums['svc2']['table1'])
+
+    def test_receive_data_merged(self):
+        ds = data_service.DataService("svc1")
+        ds.receive_data = mock.Mock()
+        ds.receive_data_sequenced('svc2', 'table1', [(1,)], 0,
+                                  is_snapshot=True)
+        ds.receive_data_sequenced('svc2', 'table1', [[(2,)], [(3,)]], 3,
+                                  receipt_time=20)
+        ds.receive_data_sequenced('svc2', 'table1', [[(3,)], [(1,)]], 2,
+                                  receipt_time=10)
+        stats = ds.receive_queue_stats()['svc2']['table1']
+        self.assertEqual(2, stats['depth'])
+        self.assertGreater(stats['gap_age'], time.time() - 11)
+        self.assertEqual(1, ds.receive_data.call_count)
+
+        # the deltas in sequence are received at once
+        ds.receive_data_sequenced('svc2', 'table1', [[(4,)], []], 1)
+        self.assertEqual(2, ds.receive_data.call_count)
+        publisher, table, data, is_snapshot = ds.receive_data.call_args[0]
+        self.assertFalse(is_snapshot)
+        self.assertEqual([[(2,), (4,)], [(1,)]],
+                         [sorted(data[0]), sorted(data[1])])
+        self.assertEqual(3, ds.receiver_seqnums['svc2']['table1'])
+        self.assertEqual({'depth': 0, 'gap_age': None},
+                         ds.receive_queue_stats()['svc2']['table1'])
+
+    def test_receive_data_snapshot_in_sequence(self):
+        ds = data_service.DataService("svc1")
+        ds.receive_data = mock.Mock()
+        ds.receive_data_sequenced('svc2', 'table1', [[(4,)], []], 4)
+        ds.receive_data_sequenced('svc2', 'table1', [[(6,)], []], 6)
+        ds.receive_data_sequenced('svc2', 'table1', [(5,)], 5,
+                                  is_snapshot=True)
+        ds.receive_data_sequenced('svc2', 'table1', [(8,)], 8,
+                                  is_snapshot=True)
+        ds.receive_data_sequenced('svc2', 'table1', [[(9,)], []], 9)
+        ds.receive_data_sequenced('svc2', 'table1', [[(7,)], []], 7)
+        # the queued delta older than the first snapshot is dropped
+        self.assertEqual(
+            [mock.call('svc2', 'table1', [(5,)], True),
+             mock.call('svc2', 'table1', [[(6,)], []], False),
+             mock.call('svc2', 'table1', [[(7,)], []], False),
+             mock.call('svc2', 'table1', [(8,)], True),
+             mock.call('svc2', 'table1', [[(9,)], []], False)],
+            ds.receive_data.call_args_list)
+        self.assertEqual(0, ds.receive_queue_stats()['svc2']['table1'][
+            'depth'])
+
+
+class TestReorderBuffer(base.TestCase):
+    def test_put_pop(self):
+        queue = data_service.ReorderBuffer()
+        queue.put(3, False, 'c', 30)
+        queue.put(1, True, 'a', 20)
+        queue.put(1, False, 'duplicate', 10)
+        queue.put(2, False, 'b', 40)
+        self.assertEqual(3, len(queue))
+        self.assertEqual(20, queue.oldest_time())
+        self.assertEqual((True, 'a'), queue.pop(1))
+        self.assertIsNone(queue.pop(1))
+        self.assertEqual(30, queue.oldest_time())
+        queue.discard_through(3)
+        self.assertEqual(0, len(queue))
+        self.assertIsNone(queue.oldest_time())
+
+    def test_merge_deltas(self):
+        delta = [[(1,)], [(2,)]]
+        self.assertIs(delta, data_service.merge_deltas([delta]))
+        data = data_service.merge_deltas(
+            [[[[1]], [[2]]], [[(2,), (3,)], [(1,)]], [[(4,)], [(3,), (5,)]]])
+        self.assertEqual([[(4,)], [(5,)]], data)
+
 
 # TODO(pballand): replace with congress unit test framework when convenient
 if __name__ == '__main__':
@@ -131,6 +131,101 @@ class TestDSE(base.TestCase):
         node1.stop()
         node2.stop()
 
+    def test_internode_pubsub_msgpack(self):
+        cfg.CONF.set_override('wire_format', 'msgpack', 'dse')
+        node1 = helper.make_dsenode_new_partition('testnode1')
+        test1 = fake_datasource.FakeDataSource('test1')
+        node1.register_service(test1)
+        node2 = helper.make_dsenode_same_partition(node1, 'testnode2')
+        test2 = fake_datasource.FakeDataSource('test2')
+        node2.register_service(test2)
+
+        test1.subscribe('test2', 'p')
+        helper.retry_check_function_return_value(
+            lambda: hasattr(test1, 'last_msg'), True)
+        self.assertEqual(
+            'msgpack', node2.wire_formats['test2']['p']['testnode1'][0])
+        test2.publish('p', set([(1, 'a'), (2, 'b')]))
+        helper.retry_check_function_return_value(
+            lambda: test1.last_msg['data'],
+            (set([(1, 'a'), (2, 'b')]), set()))
+        test2.publish('p', set([(2, 'b')]))
+        helper.retry_check_function_return_value(
+            lambda: test1.last_msg['data'], (set(), set([(1, 'a')])))
+        node1.stop()
+        node2.stop()
+
+    def test_internode_pubsub_mixed_wire_formats(self):
+        node1 = helper.make_dsenode_new_partition('testnode1')
+        test1 = fake_datasource.FakeDataSource('test1')
+        node1.register_service(test1)
+        node2 = helper.make_dsenode_same_partition(node1, 'testnode2')
+        test2 = fake_datasource.FakeDataSource('test2')
+        node2.register_service(test2)
+        node3 = helper.make_dsenode_same_partition(node1, 'testnode3')
+        test3 = fake_datasource.FakeDataSource('test3')
+        node3.register_service(test3)
+
+        cfg.CONF.set_override('wire_format', 'msgpack', 'dse')
+        test1.subscribe('test2', 'p')
+        cfg.CONF.set_override('wire_format', 'json', 'dse')
+        test3.subscribe('test2', 'p')
+        helper.retry_check_function_return_value(
+            lambda: hasattr(test1, 'last_msg') and hasattr(test3, 'last_msg'),
+            True)
+        self.assertEqual(
+            {'testnode1': 'msgpack', 'testnode3': 'json'},
+            dict((node_id, wire_format) for node_id, (wire_format, _)
+                 in node2.wire_formats['test2']['p'].items()))
+
+        # updates are broadcast as JSON while a subscriber asked for it
+        data = [[[1, 'a']], []]
+        self.assertEqual(
+            data, node2.encode_table_data('test2', 'p', data))
+        test2.publish('p', set([(1, 'a'), (2, 'b')]))
+        helper.retry_check_function_return_value(
+            lambda: test1.last_msg['data'],
+            (set([(1, 'a'), (2, 'b')]), set()))
+        helper.retry_check_function_return_value(
+            lambda: test3.last_msg['data'],
+            (set([(1, 'a'), (2, 'b')]), set()))
+
+        # and in msgpack once it unsubscribed
+        test3.unsubscribe('test2', 'p')
+        helper.retry_check_function_return_value(
+            lambda: sorted(node2.wire_formats['test2']['p']), ['testnode1'])
+        self.assertNotEqual(
+            data, node2.encode_table_data('test2', 'p', data))
+        test2.publish('p', set([(2, 'b')]))
+        helper.retry_check_function_return_value(
+            lambda: test1.last_msg['data'], (set(), set([(1, 'a')])))
+        node1.stop()
+        node2.stop()
+        node3.stop()
+
+    def test_subscribe_snapshot_chunks(self):
+        cfg.CONF.set_override('snapshot_chunk_size', 1, 'dse')
+        node1 = helper.make_dsenode_new_partition('testnode1')
+        test1 = fake_datasource.FakeDataSource('test1')
+        node1.register_service(test1)
+        node2 = helper.make_dsenode_same_partition(node1, 'testnode2')
+        test2 = fake_datasource.FakeDataSource('test2')
+        node2.register_service(test2)
+        test2.state['fake_table'] = set([(1, 'a'), (2, 'b'), (3, 'c')])
+
+        test1.subscribe('test2', 'fake_table')
+        helper.retry_check_function_return_value(
+            lambda: len(getattr(test1, 'receive_data_history', [])) >= 3,
+            True)
+        first = test1.receive_data_history[0]['data']
+        rows = set(first).union(*(msg['data'][0] for msg in
+                                  test1.receive_data_history[1:3]))
+        self.assertEqual(1, len(first))
+        self.assertEqual(test2.state['fake_table'], rows)
+        self.assertEqual(0, test1.receiver_seqnums['test2']['fake_table'])
+        node1.stop()
+        node2.stop()
+
     def test_internode_partial_unsub(self):
         node1 = helper.make_dsenode_new_partition('testnode1')
         node2 = helper.make_dsenode_same_partition(node1, 'testnode2')
@@ -0,0 +1,92 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import json
+import time
+
+from oslo_log import log as logging
+from six.moves import range
+
+from congress.dse2 import wire
+from congress.tests import base
+
+LOG = logging.getLogger(__name__)
+
+ROWS = [(1, 'a', None), (2, u'é', 1.5), (3, 'c', True)]
+
+
+class TestWire(base.TestCase):
+    def test_json(self):
+        self.assertIs(ROWS, wire.encode(ROWS, wire.JSON))
+        self.assertIs(ROWS, wire.decode(ROWS))
+
+    def test_snapshot(self):
+        data = wire.encode(ROWS, wire.MSGPACK)
+        self.assertTrue(wire.is_encoded(data))
+        self.assertIsNone(data['compression'])
+        # encoded data fits in JSON messages
+        data = json.loads(json.dumps(data))
+        self.assertEqual(ROWS, wire.decode(data))
+        self.assertEqual(set(ROWS),
+                         set(wire.decode(wire.encode(set(ROWS),
+                                                     wire.MSGPACK))))
+
+    def test_delta(self):
+        data = wire.encode([ROWS[:2], ROWS[2:]], wire.MSGPACK)
+        self.assertEqual([ROWS[:2], ROWS[2:]],
+                         wire.decode(data, is_snapshot=False))
+        data = wire.encode([[], []], wire.MSGPACK)
+        self.assertEqual([[], []], wire.decode(data, is_snapshot=False))
+
+    def test_compression(self):
+        rows = [(i, 'name', 'status') for i in range(1000)]
+        data = wire.encode(rows, wire.MSGPACK)
+        self.assertEqual('zlib', data['compression'])
+        self.assertEqual(rows, wire.decode(data))
+        data = wire.encode(rows, wire.MSGPACK, compress=False)
+        self.assertIsNone(data['compression'])
+        self.assertEqual(rows, wire.decode(data))
+
+    def test_unknown_format(self):
+        data = wire.encode(ROWS, wire.MSGPACK)
+        data['wire_format'] = 'unknown'
+        self.assertRaises(ValueError, wire.decode, data)
+
+
+class BenchmarkWire(base.Benchmark):
+    """Compare the wire formats on a snapshot of a large table."""
+
+    def _time(self, wire_format, rows):
+        start = time.time()
+        message = json.dumps(wire.encode(rows, wire_format))
+        encoded = time.time()
+        snapshot = set(tuple(row) for row in
+                       wire.decode(json.loads(message)))
+        done = time.time()
+        LOG.info("%s wire format: %d bytes, encoded in %.3fs, decoded in "
+                 "%.3fs", wire_format, len(message), encoded - start,
+                 done - encoded)
+        self.assertEqual(set(rows), snapshot)
+        return len(message)
+
+    def test_benchmark_snapshot(self):
+        rows = [('id-%d' % i, 'ACTIVE' if i % 3 else 'ERROR',
+                 'tenant-%d' % (i % 50), i % 7, 'host-%d' % (i % 200), None)
+                for i in range(200000)]
+        json_size = self._time(wire.JSON, rows)
+        msgpack_size = self._time(wire.MSGPACK, rows)
+        self.assertLess(msgpack_size, json_size)
@@ -24,6 +24,7 @@ from oslo_log import log as logging
 from congress.datalog import base as datalog_base
 from congress.datalog import compile
 from congress.datalog import database
+from congress.datalog import factset
 from congress.datalog import materialized
 from congress.datalog import nonrecursive
 from congress.datalog import utility
@@ -96,6 +97,62 @@ class TestRuntime(base.TestCase):
         e = helper.datalog_equal(run.select('p(x)'), 'p(3) p(4)')
         self.assertTrue(e)
 
+    def test_array_fact_storage(self):
+        """Test policies storing facts in the array backend."""
+        run = agnostic.Runtime()
+        run.fact_storage = 'array'
+        run.create_policy('test')
+        run.insert('p(1) p(2) q(2, "a") r(x, y) :- p(x), q(x, y)')
+        facts = [compile.Fact('p', (3,)), compile.Fact('p', (2,))]
+        run.initialize_tables(['p'], facts)
+        self.check_equal(run.select('p(x)'), 'p(2) p(3)', 'Array facts')
+        self.check_equal(run.select('r(x, y)'), 'r(2, "a")', 'Array join')
+        self.assertIsInstance(run.policy_object('test').rules.facts['p'],
+                              factset.ArrayFactSet)
+        run.delete('q(2, "a")')
+        self.check_equal(run.select('r(x, y)'), '', 'Array delete')
+
+    def test_table_rows_cache(self):
+        """Test caching the rows returned by get_row_data."""
+        run = agnostic.Runtime()
+        run.cache_table_rows = True
+        run.create_policy('data')
+        run.create_policy('test')
+        run.insert('q(1) r(2)', 'data')
+        run.insert('p(x) :- data:q(x) s(x) :- data:r(x) '
+                   't(x) :- data:q(y), now(x)', 'test')
+
+        def rows(table):
+            return sorted(row['data'][0]
+                          for row in run.get_row_data(table, 'test'))
+
+        with mock.patch.object(run, 'select', wraps=run.select) as select:
+            self.assertEqual([1], rows('p'))
+            self.assertEqual([2], rows('s'))
+            self.assertEqual([1], rows('p'))
+            self.assertEqual(2, select.call_count)
+            self.assertEqual(set([('p', 'test', None), ('s', 'test', None)]),
+                             set(run.table_rows))
+
+            # only the rows depending on the changed table are dropped
+            run.insert('q(3)', 'data')
+            self.assertEqual(set([('s', 'test', None)]), set(run.table_rows))
+            self.assertEqual([1, 3], rows('p'))
+            self.assertEqual([2], rows('s'))
+            self.assertEqual(3, select.call_count)
+
+            run.initialize_tables(['r'], [compile.Fact('r', (4,))], 'data')
+            self.assertEqual([4], rows('s'))
+            self.assertEqual(4, select.call_count)
+
+            # rule changes drop all the rows
+            run.insert('u(x) :- data:r(x)', 'test')
+            self.assertEqual({}, run.table_rows)
+
+            # rows depending on builtins without inputs are not cached
+            rows('t')
+            self.assertNotIn(('t', 'test', None), run.table_rows)
+
     def test_single_policy(self):
         """Test ability to create/delete single policies."""
         # single policy
@@ -269,7 +326,7 @@ class TestRuntime(base.TestCase):
     mock_db_policy_obj = lambda: None
     setattr(mock_db_policy_obj, 'name', 'test_policy')
 
-    @mock.patch.object(db_policy_rules, 'add_policy_rule')
+    @mock.patch.object(db_policy_rules, 'add_policy_rules')
     @mock.patch.object(db_policy_rules, 'policy_name',
                        side_effect=lambda x, session: x)
     @mock.patch.object(
@@ -783,6 +840,142 @@ class TestTriggers(base.TestCase):
         self.assertEqual(obj.value, 1)
 
 
+class TestIncrementalTriggers(TestTriggers):
+    """Rerun the trigger tests with incremental trigger evaluation."""
+
+    def setUp(self):
+        super(TestIncrementalTriggers, self).setUp()
+        runtime_init = agnostic.Runtime.__init__
+
+        def incremental_init(runtime):
+            runtime_init(runtime)
+            runtime.incremental_triggers = True
+
+        patcher = mock.patch.object(agnostic.Runtime, '__init__',
+                                    incremental_init)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _check_incremental(self, policy, updates, table='p'):
+        """Check incremental and full trigger evaluation agree."""
+        results = []
+        for incremental in (False, True):
+            run = agnostic.Runtime()
+            run.incremental_triggers = incremental
+            run.create_policy('test')
+            run.insert(policy)
+            calls = []
+            run.register_trigger(
+                table, lambda tbl, old, new: calls.append((old, new)))
+            # prime the cached contents
+            run.insert('dummy(1)')
+            for update in updates:
+                run.update([compile.Event(compile.parse1(atom),
+                                          insert=insert, target='test')
+                            for insert, atom in update])
+            results.append(calls)
+        self.assertEqual(results[0], results[1])
+        return results[1]
+
+    def test_cached_contents(self):
+        run = agnostic.Runtime()
+        run.create_policy('test')
+        run.insert('p(x) :- q(x)')
+        run.register_trigger('p', lambda tbl, old, new: None)
+        run.insert('q(1)')
+        self.assertEqual(
+            set(compile.parse('p(1)')),
+            run.trigger_registry.contents[('p', 'test', None)])
+        run.insert('q(2)')
+        self.assertEqual(
+            set(compile.parse('p(1) p(2)')),
+            run.trigger_registry.contents[('p', 'test', None)])
+        # rule changes recompute the contents from scratch
+        run.insert('r(3)')
+        run.insert('p(x) :- r(x)')
+        self.assertEqual(
+            set(compile.parse('p(1) p(2) p(3)')),
+            run.trigger_registry.contents[('p', 'test', None)])
+
+    def test_initialize_tables(self):
+        results = []
+        for incremental in (False, True):
+            run = agnostic.Runtime()
+            run.incremental_triggers = incremental
+            run.create_policy('test')
+            run.create_policy('data')
+            run.insert('p(x, z) :- data:q(x, y), data:r(y, z)', 'test')
+            run.insert('q(1, 2) r(2, 3)', 'data')
+            calls = []
+            run.register_trigger(
+                'p', lambda tbl, old, new: calls.append((old, new)), 'test')
+            run.initialize_tables(
+                ['q'], [compile.Fact('q', (1, 2)), compile.Fact('q', (4, 2))],
+                'data')
+            run.initialize_tables(
+                ['q', 'r'], [compile.Fact('q', (1, 2)),
+                             compile.Fact('r', (2, 5))], 'data')
+            run.initialize_tables(
+                ['r'], [compile.Fact('r', (2, 5))], 'data')
+            results.append(calls)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(2, len(results[1]))
+        self.assertEqual(set(compile.parse('p(1, 3) p(4, 3)')),
+                         results[1][0][1])
+        self.assertEqual(set(compile.parse('p(1, 5)')),
+                         results[1][1][1])
+
+    def test_join(self):
+        calls = self._check_incremental(
+            'p(x, z) :- q(x, y), r(y, z) '
+            'q(1, 2) q(2, 3) r(2, 4) r(3, 5)',
+            [[(True, 'r(2, 6)')],
+             [(False, 'q(1, 2)'), (True, 'q(1, 3)')],
+             [(False, 'r(3, 5)'), (False, 'r(2, 4)')]])
+        self.assertEqual(3, len(calls))
+
+    def test_negation_of_derived_table(self):
+        calls = self._check_incremental(
+            'p(x) :- q(x), not s(x) '
+            's(x) :- r(x, y), t(y) '
+            'q(1) q(2) q(3) r(1, 1) r(2, 2) t(1)',
+            [[(True, 't(2)')],
+             [(False, 't(1)')],
+             [(False, 'r(2, 2)'), (True, 'r(3, 2)')],
+             [(True, 'q(4)'), (False, 'q(3)')]])
+        self.assertEqual(4, len(calls))
+
+    def test_multiple_levels(self):
+        self._check_incremental(
+            'p(x) :- q(x, y), not u(y) '
+            'q(x, y) :- r(x, y), not s(x) '
+            'u(y) :- v(y, z), w(z) '
+            'r(1, 1) r(2, 2) r(3, 1) v(1, 1) v(2, 2)',
+            [[(True, 'w(1)')],
+             [(True, 's(2)'), (True, 'w(2)')],
+             [(False, 'w(1)'), (False, 's(2)')],
+             [(False, 'v(2, 2)'), (True, 'r(4, 3)')]])
+
+    def test_cross_policy(self):
+        results = []
+        for incremental in (False, True):
+            run = agnostic.Runtime()
+            run.incremental_triggers = incremental
+            run.create_policy('alice')
+            run.create_policy('bob')
+            run.insert('p(x) :- bob:q(x), not bob:r(x)', target='alice')
+            calls = []
+            run.register_trigger(
+                'p', lambda tbl, old, new: calls.append((old, new)), 'alice')
+            run.insert('q(1) q(2)', target='bob')
+            run.insert('r(1)', target='bob')
+            run.initialize_tables(['q'], [compile.Fact('q', [2]),
+                                          compile.Fact('q', [3])], 'bob')
+            run.delete('r(1)', target='bob')
+            results.append(calls)
+        self.assertEqual(results[0], results[1])
+
+
 class TestMultipolicyRules(base.TestCase):
     def test_external(self):
         """Test ability to write rules that span multiple policies."""
@@ -954,6 +1147,22 @@ class TestMultipolicyRules(base.TestCase):
         self.assertEqual(len(errors), 1)
         self.assertIn("Rules are recursive", str(errors[0]))
 
+    def test_recursion_in_batch(self):
+        """Test a batch of rules is rejected as a whole if recursive."""
+        run = agnostic.Runtime()
+        run.create_policy('test1')
+        run.insert('p(x) :- q(x)', target='test1')
+        (permit, errors) = run.insert(
+            'r(x) :- s(x) q(x) :- r(x) s(x) :- p(x)', target='test1')
+        self.assertFalse(permit, "Recursive batch should fail")
+        self.assertEqual(len(errors), 1)
+        self.assertIn("Rules are recursive", str(errors[0]))
+        self.assertEqual(1, len(run.policy_object('test1').content()))
+        (permit, errors) = run.insert(
+            'r(x) :- s(x) q(x) :- r(x) s(x) :- t(x)', target='test1')
+        self.assertTrue(permit)
+        self.assertEqual(4, len(run.policy_object('test1').content()))
+
     def test_multipolicy_action_errors(self):
         """Test errors arising from rules in action policies."""
         run = agnostic.Runtime()
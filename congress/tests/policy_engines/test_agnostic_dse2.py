@@ -15,6 +15,7 @@
 
 import sys
 
+import eventlet
 import mock
 
 from congress.api import base as api_base
@@ -339,3 +340,65 @@ class TestAgnostic(base.TestCase):
         self.assertTrue(helper.db_equal(actual, correct))
 
     # TODO(ekcs): receive data multiple publishers
+
+    def test_receive_data_batched(self):
+        '''Test batching data updates from multiple publishers'''
+        run = agnostic.DseRuntime(api_base.ENGINE_SERVICE_ID)
+        run.update_batch_window = 60
+        run.create_policy('datasource1')
+        run.create_policy('datasource2')
+        run.receive_data_sequenced(
+            publisher='datasource1', table='p',
+            data=[[1], [2]], seqnum=0, is_snapshot=True)
+
+        run.receive_data_sequenced(
+            publisher='datasource1', table='p',
+            data=[[[3], [4]], [[1]]], seqnum=1, is_snapshot=False)
+        run.receive_data_sequenced(
+            publisher='datasource1', table='p',
+            data=[[[1]], [[3]]], seqnum=2, is_snapshot=False)
+        run.receive_data_sequenced(
+            publisher='datasource2', table='q',
+            data=[[[5]], []], seqnum=None, is_snapshot=False)
+        # nothing applied until the end of the batch window
+        self.assertTrue(helper.db_equal(
+            run.select('p(x)', 'datasource1'), 'p(1) p(2)'))
+        self.assertTrue(helper.db_equal(
+            run.select('q(x)', 'datasource2'), ''))
+
+        # insertions and deletions of the same rows cancel
+        with mock.patch.object(run, '_update_obj_datalog',
+                               wraps=run._update_obj_datalog) as update:
+            run.flush_data_updates()
+            self.assertEqual(1, update.call_count)
+            self.assertEqual(2, len(update.call_args[0][0]))
+        self.assertTrue(helper.db_equal(
+            run.select('p(x)', 'datasource1'), 'p(1) p(2) p(4)'))
+        self.assertTrue(helper.db_equal(
+            run.select('q(x)', 'datasource2'), 'q(5)'))
+
+    def test_receive_data_batch_bounds(self):
+        '''Test applying batched data updates when the batch ends'''
+        run = agnostic.DseRuntime(api_base.ENGINE_SERVICE_ID)
+        run.update_batch_window = 0.01
+        run.update_batch_size = 3
+        run.create_policy('datasource1')
+        run.receive_data('datasource1', 'p', [[[1], [2]], []])
+        self.assertTrue(helper.db_equal(run.select('p(x)'), ''))
+
+        # the window ends
+        eventlet.sleep(0.1)
+        self.assertTrue(helper.db_equal(
+            run.select('p(x)'), 'p(1) p(2)'))
+
+        # the batch reaches its size
+        run.receive_data('datasource1', 'p', [[[3], [4], [5]], []])
+        self.assertTrue(helper.db_equal(
+            run.select('p(x)'), 'p(1) p(2) p(3) p(4) p(5)'))
+
+        # a snapshot applies the batch before it
+        run.receive_data('datasource1', 'p', [[[6]], []])
+        run.receive_data('datasource1', 'q', [[7]], is_snapshot=True)
+        self.assertTrue(helper.db_equal(
+            run.select('p(6)'), 'p(6)'))
+        self.assertIsNone(run._update_batch_timer)
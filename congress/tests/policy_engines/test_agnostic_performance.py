@@ -35,6 +35,7 @@ LOG = logging.getLogger(__name__)
 NREC_THEORY = 'non-recursive theory'
 DB_THEORY = 'database'
 ACTION_THEORY = 'action'
+MAT_THEORY = 'materialized'
 
 
 class TestRuntimePerformance(testbase.TestCase):
@@ -104,6 +105,33 @@ class TestRuntimePerformance(testbase.TestCase):
                    for i in range(MAX)]
         self._agnostic.update(updates)
 
+    def test_update_materialized(self):
+        MAX = 10000
+        self._agnostic.create_policy(MAT_THEORY,
+                                     kind=base.MATERIALIZED_POLICY_TYPE)
+        rules = ('q(x) :- p(x, y), not r(y) '
+                 'r(y) :- s(y, "on") '
+                 't(x) :- q(x), lt(x, 100)')
+        for th in (MAT_THEORY, NREC_THEORY):
+            self._agnostic.insert(rules, th)
+            updates = [self._create_event('s', (i, 'on' if i % 2 else 'off'),
+                                          True, th)
+                       for i in range(100)]
+            self._agnostic.update(updates)
+            # the materialized theory propagates these updates in one batch
+            updates = [self._create_event('p', (i, i % 100), True, th)
+                       for i in range(MAX)]
+            self._agnostic.update(updates)
+            updates = [self._create_event('p', (i, i % 100), False, th)
+                       for i in range(0, MAX, 4)]
+            self._agnostic.update(updates)
+
+        # the views must match what the non-recursive theory computes
+        for query in ('q(x)', 't(x)'):
+            self.assertEqual(
+                set(self._agnostic.select(query, MAT_THEORY).split()),
+                set(self._agnostic.select(query, NREC_THEORY).split()))
+
     def test_indexing(self):
         MAX = 100
         th = NREC_THEORY
@@ -0,0 +1,91 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import mock
+from oslo_utils import uuidutils
+
+from congress.db import db_policy_rules
+from congress.policy_engines import agnostic
+from congress.synchronizer import policy_rule_synchronizer
+from congress.tests import base
+from congress.tests import helper
+
+
+class TestPolicyRuleSynchronizer(base.SqlTestCase):
+
+    def setUp(self):
+        super(TestPolicyRuleSynchronizer, self).setUp()
+        self.engine = agnostic.Runtime()
+        self.engine.create_policy('test')
+        self.synchronizer = policy_rule_synchronizer.PolicyRuleSynchronizer(
+            self.engine, mock.Mock())
+
+    def add_rule(self, rule):
+        id_ = uuidutils.generate_uuid()
+        db_policy_rules.add_policy_rule(id_, 'test', rule, '')
+        return id_
+
+    def check(self, correct, msg):
+        self.assertTrue(helper.datalog_equal(
+            self.engine.select('p(x)', 'test'), correct, msg))
+
+    def test_synchronize_rules(self):
+        self.add_rule('q(1)')
+        self.add_rule('q( 2 )')
+        id_ = self.add_rule('p(x) :- q(x)')
+        self.synchronizer.synchronize_rules()
+        self.check('p(1) p(2)', 'Rules added')
+        self.engine.insert('q(3) p(x) :- q(x), q(x)', 'test')
+        db_policy_rules.delete_policy_rule(id_)
+        self.add_rule('p(x) :- q(x), q(x)')
+        self.synchronizer.synchronize_rules()
+        self.check('p(1) p(2)', 'Rules and facts replaced')
+
+    def test_synchronize_rules_unchanged(self):
+        self.add_rule('q(1)')
+        self.add_rule('p(x) :- q(x)')
+        self.synchronizer.synchronize_rules()
+        with mock.patch.object(db_policy_rules, 'get_policy_rules',
+                               wraps=db_policy_rules.get_policy_rules) as get:
+            self.synchronizer.synchronize_rules()
+            self.assertFalse(get.called)
+            self.check('p(1)', 'Nothing changed')
+
+            self.add_rule('q(2)')
+            self.synchronizer.synchronize_rules()
+            self.assertEqual(1, get.call_count)
+            self.check('p(1) p(2)', 'Rule added in DB')
+
+            self.engine.delete('q(1)', 'test')
+            self.synchronizer.synchronize_rules()
+            self.assertEqual(2, get.call_count)
+            self.check('p(1) p(2)', 'Rule deleted in engine')
+
+            self.engine.delete_policy('test')
+            self.engine.create_policy('test')
+            self.synchronizer.synchronize_rules()
+            self.assertEqual(3, get.call_count)
+            self.check('p(1) p(2)', 'Policy recreated in engine')
+
+    def test_synchronize_rules_not_permitted(self):
+        self.add_rule('p(x) :- q(x)')
+        self.add_rule('q(x) :- p(x)')
+        with mock.patch.object(db_policy_rules, 'get_policy_rules',
+                               wraps=db_policy_rules.get_policy_rules) as get:
+            self.synchronizer.synchronize_rules()
+            self.synchronizer.synchronize_rules()
+            self.assertEqual(2, get.call_count)